@@ -0,0 +1,240 @@
+"""Concurrent connection capacity of one worker: WSGI threads versus ASGI.
+
+    python -m benchmarks.concurrency --connections 64 --threads 8 --out concurrency.json
+
+Opens ``--connections`` simultaneous downloads of one PDF from slow clients
+(each waits ``--client-delay-ms`` per 64 KiB received) against a single
+in-process worker:
+
+* ``wsgi``: Django's WSGIHandler and the DRF ``download`` view on a pool of
+  ``--threads`` threads, like a gthread worker. A connection holds its thread
+  until the client has read the whole file.
+* ``asgi``: Django's ASGIHandler and ``documents.async_views.download`` on one
+  event loop.
+
+For each it reports how many connections were in flight at once, latency
+percentiles (from the moment all connections are opened, so waiting for a
+free thread counts) and throughput. The network is not involved; the numbers
+show how many slow clients one worker can serve concurrently, not raw speed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import io
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+READ_UNIT = 64 * 1024
+
+
+class InFlight:
+    """Counts concurrently open connections and remembers the maximum."""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.current -= 1
+
+
+def _environ(path: str, token: str) -> Dict[str, object]:
+    return {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "SERVER_NAME": "testserver",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "testserver",
+        "HTTP_AUTHORIZATION": f"Token {token}",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.url_scheme": "http",
+        "wsgi.version": (1, 0),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+
+
+def run_wsgi(path: str, token: str, connections: int, threads: int, delay: float) -> Dict[str, float]:
+    from django.core.handlers.wsgi import WSGIHandler
+
+    from .harness import summarize
+
+    handler = WSGIHandler()
+    in_flight = InFlight()
+    statuses: List[str] = []
+
+    def connection(_):
+        with in_flight:
+            body = handler(_environ(path, token), lambda status, headers, exc_info=None: statuses.append(status))
+            received = 0
+            try:
+                for chunk in body:
+                    # Slow client: the thread is blocked while it reads
+                    for _ in range((received + len(chunk)) // READ_UNIT - received // READ_UNIT):
+                        time.sleep(delay)
+                    received += len(chunk)
+            finally:
+                body.close()
+        # All connections are opened at wall_start; queueing for a thread counts
+        return time.perf_counter() - wall_start
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        samples = list(pool.map(connection, range(connections)))
+    result = summarize(samples, time.perf_counter() - wall_start)
+    result["peak_in_flight"] = in_flight.peak
+    result["errors"] = sum(not status.startswith("200") for status in statuses)
+    return result
+
+
+async def _asgi_connections(path: str, token: str, connections: int, delay: float) -> Dict[str, float]:
+    from django.core.handlers.asgi import ASGIHandler
+
+    from .harness import summarize
+
+    handler = ASGIHandler()
+    in_flight = InFlight()
+    statuses: List[int] = []
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"testserver"), (b"authorization", f"Token {token}".encode())],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 40000),
+    }
+
+    async def connection():
+        received = 0
+        request_sent = False
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Event().wait()  # the client never disconnects early
+
+        async def send(message):
+            nonlocal received
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                for _ in range((received + len(chunk)) // READ_UNIT - received // READ_UNIT):
+                    await asyncio.sleep(delay)
+                received += len(chunk)
+
+        with in_flight:
+            await handler(dict(scope), receive, send)
+        return time.perf_counter() - wall_start
+
+    wall_start = time.perf_counter()
+    samples = await asyncio.gather(*(connection() for _ in range(connections)))
+    result = summarize(list(samples), time.perf_counter() - wall_start)
+    result["peak_in_flight"] = in_flight.peak
+    result["errors"] = sum(status != 200 for status in statuses)
+    return result
+
+
+def _mount_async_views(enabled: bool) -> None:
+    from django.conf import settings
+    from django.urls import clear_url_caches
+
+    import pdfvault.urls
+
+    settings.ASYNC_VIEWS = enabled
+    importlib.reload(pdfvault.urls)
+    clear_url_caches()
+
+
+def run(options: argparse.Namespace) -> Dict[str, Dict]:
+    from django.core.files.base import ContentFile
+
+    from documents.models import Document
+
+    from .corpus import make_pdf
+    from .seed import seed
+
+    data = seed(users=1, documents=0, tags=0, folders=0, audit_rows=0)
+    pdf = make_pdf(options.pages, seed=0)
+    document = Document(owner=data.user, original_filename="bench.pdf")
+    document.file.save("bench.pdf", ContentFile(pdf), save=True)
+    path = f"/api/documents/{document.pk}/download/"
+    delay = options.client_delay_ms / 1000
+
+    results = {}
+    _mount_async_views(False)
+    results["wsgi"] = run_wsgi(path, data.token, options.connections, options.threads, delay)
+    print(f"{'wsgi':>6}: {results['wsgi']}", file=sys.stderr)
+    _mount_async_views(True)
+    try:
+        results["asgi"] = asyncio.run(_asgi_connections(path, data.token, options.connections, delay))
+    finally:
+        _mount_async_views(False)
+    print(f"{'asgi':>6}: {results['asgi']}", file=sys.stderr)
+    for result in results.values():
+        result["bytes_per_download"] = len(pdf)
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=64, help="simultaneous downloads")
+    parser.add_argument("--threads", type=int, default=8, help="threads of the WSGI worker")
+    parser.add_argument("--client-delay-ms", type=float, default=10.0, help="client pause per 64 KiB read")
+    parser.add_argument("--pages", type=int, default=200, help="pages of the downloaded PDF")
+    parser.add_argument("--out", type=Path, help="write results JSON here")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .run import bench_environment
+
+    options = build_parser().parse_args(argv)
+    with bench_environment() as database:
+        results = run(options)
+
+    import django
+
+    report = {
+        "meta": {
+            "django": django.get_version(),
+            "database": database,
+            "options": {key: str(value) if isinstance(value, Path) else value
+                        for key, value in vars(options).items()},
+        },
+        "results": results,
+    }
+    if options.out:
+        options.out.write_text(json.dumps(report, indent=2))
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Synthetic, reproducible PDF corpora for benchmarks.
+
+The PDFs are written by hand (one Helvetica font, one content stream per page)
+so that they carry real extractable text without any extra dependency.
+"""
+from __future__ import annotations
+
+import random
+from pathlib import Path
+from typing import List
+
+VOCABULARY = (
+    "invoice contract payment amount total customer supplier agreement clause term "
+    "delivery service report quarter annual revenue expense budget tax account balance "
+    "order shipment product price discount period signature party liability notice "
+    "schedule appendix section table summary review approval policy insurance claim"
+).split()
+
+
+def random_words(rng: random.Random, count: int) -> List[str]:
+    return [rng.choice(VOCABULARY) for _ in range(count)]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: int = 1, words_per_page: int = 250, seed: int = 0,
+             title: str = "Benchmark document", author: str = "pdfvault") -> bytes:
+    """Return the bytes of a ``pages``-page PDF with seeded pseudo-random text."""
+    rng = random.Random(seed)
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # filled in once the page tree id is known
+    pages_id = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    info = add(f"<< /Title ({_escape(title)}) /Author ({_escape(author)}) >>".encode("latin-1"))
+    page_ids = []
+    for _ in range(pages):
+        words = random_words(rng, words_per_page)
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        ops = ["BT", "/F1 10 Tf", "14 TL", "50 760 Td"]
+        ops += [f"({_escape(line)}) '" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font, content)
+        ))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog, info, xref)
+    return bytes(out)
+
+
+def write_corpus(directory: Path, count: int, pages: int = 1, words_per_page: int = 250) -> List[Path]:
+    """Write ``count`` distinct PDFs into ``directory`` and return their paths."""
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = directory / f"bench_{index:05d}.pdf"
+        path.write_bytes(make_pdf(pages, words_per_page, seed=index, title=f"Benchmark {index}"))
+        paths.append(path)
+    return paths
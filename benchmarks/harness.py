@@ -0,0 +1,55 @@
+"""Timing helpers and baseline comparison for the benchmark runner."""
+from __future__ import annotations
+
+import math
+import time
+from typing import Callable, Dict, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples`` (``pct`` in 0..100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: List[float], wall: float) -> Dict[str, float]:
+    """Latency percentiles in milliseconds and throughput in operations/second."""
+    return {
+        "n": len(samples),
+        "rps": round(len(samples) / wall, 2) if wall > 0 else 0.0,
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+def measure(operation: Callable[[int], object], iterations: int, warmup: int = 2) -> Dict[str, float]:
+    """Call ``operation(i)`` ``iterations`` times after ``warmup`` untimed calls."""
+    for i in range(warmup):
+        operation(i)
+    samples = []
+    wall_start = time.perf_counter()
+    for i in range(iterations):
+        start = time.perf_counter()
+        operation(i)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, time.perf_counter() - wall_start)
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], metric: str = "p95_ms",
+            max_regression: float = 0.2) -> List[str]:
+    """Return a line per scenario whose ``metric`` grew by more than ``max_regression``."""
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name, {}).get(metric)
+        after = current.get(metric)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        if change > max_regression:
+            regressions.append(f"{name}: {metric} {before} -> {after} (+{change:.0%})")
+    return regressions
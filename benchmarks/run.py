@@ -0,0 +1,304 @@
+"""Benchmark runner for the document API.
+
+    python -m benchmarks.run --documents 5000 --out bench.json
+    python -m benchmarks.run --scenarios search,tag_filter --baseline bench.json
+
+Every run builds a throw-away test database (file-backed, also for SQLite)
+and media directory, seeds it, runs the selected scenarios through the DRF
+test client (in process, so the numbers cover Django + DRF + ORM + extractor
+but not the network) and writes latency percentiles and throughput as JSON. With ``--baseline`` the run exits
+non-zero when a scenario's p95 regressed by more than ``--max-regression``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+SCENARIOS: Dict[str, Callable[["Context"], Dict]] = {}
+
+
+def scenario(name: str):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+
+    return register
+
+
+@dataclass
+class Context:
+    options: argparse.Namespace
+    client: object
+    data: object
+    corpus: List[bytes]
+    rng: random.Random
+    uploaded: List[int] = field(default_factory=list)
+
+
+@scenario("upload")
+def bench_upload(ctx: Context) -> Dict:
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    from .harness import measure
+
+    def upload(i):
+        pdf = SimpleUploadedFile(f"upload_{i}.pdf", ctx.corpus[i % len(ctx.corpus)], content_type="application/pdf")
+        resp = ctx.client.post("/api/documents/", {"file": pdf})
+        assert resp.status_code == 201, resp.status_code
+        ctx.uploaded.append(resp.data["id"])
+
+    result = measure(upload, ctx.options.iterations)
+    result["bytes_per_file"] = sum(map(len, ctx.corpus)) // len(ctx.corpus)
+    return result
+
+
+@scenario("extract")
+def bench_extract(ctx: Context) -> Dict:
+    from .harness import measure
+
+    if not ctx.uploaded:
+        bench_upload(ctx)
+    ids = ctx.uploaded
+
+    def extract(i):
+        resp = ctx.client.post(f"/api/documents/{ids[i % len(ids)]}/extract/?force=true")
+        assert resp.status_code == 200, resp.status_code
+
+    def reextract_unchanged(i):
+        resp = ctx.client.post(f"/api/documents/{ids[i % len(ids)]}/extract/")
+        assert resp.status_code == 200, resp.status_code
+
+    def extract_structured(i):
+        resp = ctx.client.post(f"/api/documents/{ids[i % len(ids)]}/extract/?force=true&structured=true")
+        assert resp.status_code == 200, resp.status_code
+
+    result = measure(extract, ctx.options.iterations)
+    result["pages_per_document"] = ctx.options.pages
+    # Backfill case: file, extractor version and options unchanged
+    result["unchanged_p50_ms"] = measure(reextract_unchanged, ctx.options.iterations)["p50_ms"]
+    # Opt-in word boxes and tables on top of the text
+    result["structured_p50_ms"] = measure(extract_structured, ctx.options.iterations)["p50_ms"]
+    return result
+
+
+@scenario("search")
+def bench_search(ctx: Context) -> Dict:
+    from .corpus import VOCABULARY
+    from .harness import measure
+
+    def search(i):
+        resp = ctx.client.get("/api/documents/", {"q": ctx.rng.choice(VOCABULARY)})
+        assert resp.status_code == 200, resp.status_code
+
+    return measure(search, ctx.options.iterations)
+
+
+@scenario("tag_filter")
+def bench_tag_filter(ctx: Context) -> Dict:
+    from .harness import measure
+
+    def tag_filter(i):
+        resp = ctx.client.get("/api/documents/", {"tag": ctx.rng.choice(ctx.data.tag_names)})
+        assert resp.status_code == 200, resp.status_code
+
+    return measure(tag_filter, ctx.options.iterations)
+
+
+@scenario("list")
+def bench_list(ctx: Context) -> Dict:
+    """Owner listing. The API does not paginate unless a DRF pagination class is
+    configured; when one is, the first, a middle and the last page are requested.
+
+    The result is for the default serializer; ``compact`` and ``sparse``
+    (``fields=id,title,tags``) are the ``values()`` representations, each with
+    its ``rows_per_s`` and speedup over the serializer."""
+    from rest_framework.settings import api_settings
+
+    from .harness import measure
+
+    params: List[Dict] = [{}]
+    if api_settings.DEFAULT_PAGINATION_CLASS and api_settings.PAGE_SIZE:
+        last = max(1, len(ctx.data.document_ids) // api_settings.PAGE_SIZE)
+        params = [{"page": 1}, {"page": max(1, last // 2)}, {"page": last}]
+    variants = {"serializer": {}, "compact": {"view": "compact"}, "sparse": {"fields": "id,title,tags"}}
+
+    results = {}
+    for label, extra in variants.items():
+        rows = []
+
+        def list_documents(i):
+            resp = ctx.client.get("/api/documents/", {**params[i % len(params)], **extra})
+            assert resp.status_code == 200, resp.status_code
+            body = resp.data["results"] if isinstance(resp.data, dict) else resp.data
+            rows.append(len(body))
+
+        results[label] = measure(list_documents, ctx.options.iterations)
+        results[label]["rows_per_s"] = round(sum(rows) / len(rows) * results[label]["rps"], 1)
+    result = dict(results.pop("serializer"))
+    for label, variant in results.items():
+        variant["speedup"] = round(variant["rows_per_s"] / result["rows_per_s"], 2) if result["rows_per_s"] else None
+        result[label] = variant
+    return result
+
+
+@scenario("auth")
+def bench_auth(ctx: Context) -> Dict:
+    """Requests per second of a cheap authenticated endpoint with DRF's
+    TokenAuthentication versus the cached token authentication."""
+    from rest_framework.authentication import TokenAuthentication
+    from rest_framework.views import APIView
+
+    from documents.authentication import CachedTokenAuthentication, get_local_cache
+
+    from .harness import measure
+
+    def poll(i):
+        resp = ctx.client.get("/api/jobs/")
+        assert resp.status_code == 200, resp.status_code
+
+    original = APIView.authentication_classes
+    results = {}
+    try:
+        for label, auth_class in (("uncached", TokenAuthentication), ("cached", CachedTokenAuthentication)):
+            APIView.authentication_classes = [auth_class]
+            get_local_cache().clear()
+            results[label] = measure(poll, ctx.options.iterations)
+    finally:
+        APIView.authentication_classes = original
+    result = dict(results["cached"])
+    result["uncached_rps"] = results["uncached"]["rps"]
+    result["speedup"] = round(result["rps"] / results["uncached"]["rps"], 2) if results["uncached"]["rps"] else None
+    return result
+
+
+def run(options: argparse.Namespace) -> Dict[str, Dict]:
+    """Seed the (already configured) database and run the selected scenarios."""
+    from rest_framework.test import APIClient
+
+    from .corpus import make_pdf
+    from .seed import seed
+
+    data = seed(
+        users=options.users,
+        documents=options.documents,
+        tags=options.tags,
+        audit_rows=options.audit_rows,
+        words=options.words,
+    )
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {data.token}")
+    corpus = [make_pdf(options.pages, seed=i, title=f"Upload {i}") for i in range(options.corpus_size)]
+    ctx = Context(options=options, client=client, data=data, corpus=corpus, rng=random.Random(0))
+
+    results = {}
+    for name in options.scenarios:
+        results[name] = SCENARIOS[name](ctx)
+        print(f"{name:>12}: {results[name]}", file=sys.stderr)
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        type=lambda value: [name for name in value.split(",") if name])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--documents", type=int, default=1000, help="documents of the benchmark user")
+    parser.add_argument("--tags", type=int, default=20)
+    parser.add_argument("--audit-rows", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=500, help="words of content_text per seeded document")
+    parser.add_argument("--pages", type=int, default=3, help="pages per uploaded PDF")
+    parser.add_argument("--corpus-size", type=int, default=10, help="distinct PDFs used for upload/extract")
+    parser.add_argument("--out", type=Path, help="write results JSON here")
+    parser.add_argument("--baseline", type=Path, help="results JSON of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed relative p95 growth")
+    return parser
+
+
+@contextmanager
+def bench_environment() -> Iterator[Dict[str, str]]:
+    """Set up Django with a throw-away file-backed database and media root.
+
+    Yields the database description recorded in the report's ``meta``.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pdfvault.settings")
+    import django
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import setup_databases, setup_test_environment, teardown_databases
+
+    django.setup()
+    with tempfile.TemporaryDirectory(prefix="pdfvault-bench-") as media_root:
+        settings.MEDIA_ROOT = media_root
+        settings.PREVIEW_ROOT = Path(media_root) / "previews"
+        # Scenarios fire far more requests per user than the production rate limits allow
+        settings.THROTTLE_RATES = {}
+        settings.EXTRACTION_MAX_IN_FLIGHT = 0
+        if connection.vendor == "sqlite":
+            # Django's default test database for SQLite is in memory, which
+            # would skip WAL, fsync and the rest of the real file-backed setup.
+            settings.DATABASES["default"].setdefault("TEST", {})["NAME"] = os.path.join(media_root, "bench.sqlite3")
+        setup_test_environment()
+        db_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            database = {
+                "engine": settings.DATABASES["default"]["ENGINE"],
+                "name": str(connection.settings_dict["NAME"]),
+            }
+            if connection.vendor == "sqlite":
+                with connection.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    database["journal_mode"] = cursor.fetchone()[0]
+            yield database
+        finally:
+            teardown_databases(db_config, verbosity=0)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = build_parser().parse_args(argv)
+    unknown = set(options.scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    with bench_environment() as database:
+        results = run(options)
+
+    import django
+
+    from .harness import compare
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": database,
+            "options": {key: str(value) if isinstance(value, Path) else value
+                        for key, value in vars(options).items()},
+        },
+        "scenarios": results,
+    }
+    if options.out:
+        options.out.write_text(json.dumps(report, indent=2))
+    else:
+        print(json.dumps(report, indent=2))
+
+    if options.baseline:
+        baseline = json.loads(options.baseline.read_text())["scenarios"]
+        regressions = compare(results, baseline, max_regression=options.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Bulk seeding of users, documents, tags and audit rows for benchmarks."""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from typing import List
+
+from django.contrib.auth.models import User
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+from rest_framework.authtoken.models import Token
+
+from documents.models import AuditLog, Document, Folder, Tag
+
+from .corpus import random_words
+
+BATCH_SIZE = 1000
+
+
+@dataclass
+class SeededData:
+    user: User
+    token: str
+    tag_names: List[str] = field(default_factory=list)
+    folder_ids: List[int] = field(default_factory=list)
+    document_ids: List[int] = field(default_factory=list)
+
+
+def seed(users: int = 10, documents: int = 1000, tags: int = 20, folders: int = 10,
+         audit_rows: int = 5000, words: int = 500, seed: int = 0) -> SeededData:
+    """Seed ``documents`` rows for a benchmark user plus the same amount spread
+    over ``users`` other owners, so owner scoping is exercised as well."""
+    rng = random.Random(seed)
+    bench = User.objects.create_user(username="bench", password="bench")
+    token = Token.objects.create(user=bench)
+    others = User.objects.bulk_create([User(username=f"bench_other_{i}") for i in range(users)])
+
+    tag_objs = Tag.objects.bulk_create([Tag(owner=bench, name=f"tag-{i}") for i in range(tags)])
+    folder_objs = Folder.objects.bulk_create([Folder(owner=bench, name=f"folder-{i}") for i in range(folders)])
+    # bulk_create skips Folder.save(), which sets the materialized path
+    Folder.objects.filter(owner=bench).update(path=Concat(Value("/"), Cast("id", CharField()), Value("/")))
+
+    def make(owner: User, index: int) -> Document:
+        return Document(
+            owner=owner,
+            file=f"documents/user_{owner.id}/bench_{index}.pdf",
+            original_filename=f"bench_{index}.pdf",
+            title=" ".join(random_words(rng, 4)).title(),
+            author="pdfvault",
+            content_text=" ".join(random_words(rng, words)),
+            page_count=rng.randint(1, 50),
+            md5=f"{rng.getrandbits(128):032x}",
+            folder=rng.choice(folder_objs) if owner is bench and folder_objs else None,
+            is_processed=True,
+        )
+
+    owners = [bench] * documents + [others[i % len(others)] for i in range(documents if others else 0)]
+    docs: List[Document] = []
+    for start in range(0, len(owners), BATCH_SIZE):
+        chunk = [make(owner, start + i) for i, owner in enumerate(owners[start:start + BATCH_SIZE])]
+        docs += Document.objects.bulk_create(chunk)
+    bench_docs = [d for d in docs if d.owner_id == bench.id]
+
+    Through = Document.tags.through
+    links = [
+        Through(document_id=doc.id, tag_id=tag.id)
+        for doc in bench_docs
+        for tag in rng.sample(tag_objs, k=min(3, len(tag_objs)))
+    ]
+    Through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+
+    actions = AuditLog.Action.values
+    AuditLog.objects.bulk_create(
+        [
+            AuditLog(
+                owner=bench,
+                action=rng.choice(actions),
+                target_type=AuditLog.TargetType.DOCUMENT,
+                target_id=str(rng.choice(bench_docs).id) if bench_docs else "0",
+                meta={},
+            )
+            for _ in range(audit_rows)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    return SeededData(
+        user=bench,
+        token=token.key,
+        tag_names=[t.name for t in tag_objs],
+        folder_ids=[f.id for f in folder_objs],
+        document_ids=[d.id for d in bench_docs],
+    )
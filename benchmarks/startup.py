@@ -0,0 +1,111 @@
+"""Start-up time and memory of the processes the app runs as.
+
+    python -m benchmarks.startup --runs 5 --out startup.json
+
+Each scenario is run ``--runs`` times in a fresh interpreter and reports the
+median and minimum wall time and the peak RSS (``ru_maxrss`` of the child):
+
+* ``check``: ``manage.py check``, standing in for any management command;
+* ``web_boot``: what a web worker does before its first request, i.e. load
+  the WSGI application and import the URLconf with all views;
+* ``extractor_load``: ``web_boot`` plus importing the PDF stack, which the
+  extraction worker's parent does once before forking.
+
+``web_boot`` also lists which of the heavy optional modules (``HEAVY``) were
+imported, so a change that pulls the PDF stack back into web workers shows up.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY = ["pdfplumber", "pdfminer", "PyPDF2", "pypdfium2", "pyarrow", "numpy"]
+
+BOOT = """
+import json, os, sys
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pdfvault.settings")
+from pdfvault.wsgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+{extra}
+print(json.dumps([name for name in {heavy!r} if name in sys.modules]))
+"""
+
+SCENARIOS = {
+    "check": [sys.executable, "manage.py", "check"],
+    "web_boot": [sys.executable, "-c", BOOT.format(extra="", heavy=HEAVY)],
+    "extractor_load": [sys.executable, "-c", BOOT.format(
+        extra="from documents.services import pdf_extractor; pdf_extractor.load()", heavy=HEAVY,
+    )],
+}
+
+
+def run_once(command: List[str]) -> Dict[str, object]:
+    """Wall seconds, peak RSS in KiB and output of one run of ``command``."""
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = process.stdout.read()
+    # wait4 rather than wait(), for the rusage of exactly this child
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.stdout.close()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        raise RuntimeError(f"{command[1:]} failed:\n{output.decode(errors='replace')}")
+    return {"seconds": elapsed, "max_rss_kb": usage.ru_maxrss, "output": output.decode(errors="replace")}
+
+
+def run(scenarios: List[str], runs: int) -> Dict[str, Dict[str, object]]:
+    results = {}
+    for name in scenarios:
+        command = SCENARIOS[name]
+        samples = [run_once(command) for _ in range(runs)]
+        seconds = [sample["seconds"] for sample in samples]
+        result: Dict[str, object] = {
+            "runs": runs,
+            "median_ms": round(statistics.median(seconds) * 1000, 1),
+            "min_ms": round(min(seconds) * 1000, 1),
+            "max_rss_kb": max(sample["max_rss_kb"] for sample in samples),
+        }
+        if name != "check":
+            result["heavy_modules"] = json.loads(samples[-1]["output"].strip().splitlines()[-1])
+        results[name] = result
+        print(f"{name:>15}: {result}", file=sys.stderr)
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        type=lambda value: [name for name in value.split(",") if name])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--out", type=Path, help="write results JSON here")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = build_parser().parse_args(argv)
+    unknown = set(options.scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    report = {
+        "meta": {"python": sys.version.split()[0], "runs": options.runs},
+        "results": run(options.scenarios, options.runs),
+    }
+    if options.out:
+        options.out.write_text(json.dumps(report, indent=2))
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""Size and read latency of stored extracted text per compression method.
+
+    python -m benchmarks.text_storage --documents 300 --out text_storage.json
+    python -m benchmarks.text_storage --source ~/contracts   # real PDFs / .txt files
+
+Stores the same corpus as document and page blobs with every method of
+``documents.services.textstore`` (``raw``, ``zlib``, ``zstd`` and ``zstd``
+with a dictionary trained on the corpus's pages) in a temporary SQLite
+database and reports per method:
+
+* ``document_bytes`` / ``page_bytes``: stored blob sizes, and ``ratio``
+  against the UTF-8 text;
+* ``write_mb_s``: compression throughput;
+* ``read``: latency of loading one document by primary key and reading its
+  ``content_text`` (query plus decompression);
+* ``page_read``: the same for one page.
+
+``search_text_bytes`` is the size of the separate search column, which is
+the same for every method. Without ``--source`` the corpus is synthetic:
+Zipf-distributed words from an 8000-word vocabulary with numbers and dates,
+which compresses far less than the benchmark corpus's 40-word vocabulary.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import string
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+METHODS = ["raw", "zlib", "zstd", "zstd+dict"]
+
+
+def synthetic_corpus(documents: int, pages: int, words_per_page: int, seed: int = 0) -> List[List[str]]:
+    """Page texts of ``documents`` documents with a Zipf word distribution."""
+    rng = random.Random(seed)
+    vocabulary = [
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 11)))
+        for _ in range(8000)
+    ]
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    corpus = []
+    for _ in range(documents):
+        doc_pages = []
+        for _ in range(pages):
+            words = rng.choices(vocabulary, weights, k=words_per_page)
+            for i in range(0, len(words), 9):
+                words[i] = words[i].capitalize()
+            for i in rng.sample(range(len(words)), len(words) // 20):
+                words[i] = rng.choice([
+                    f"{rng.randint(1, 99999)}",
+                    f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(1990, 2030)}",
+                    f"{rng.randint(1, 9999)},{rng.randint(0, 99):02d}",
+                ])
+            lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+            doc_pages.append("\n".join(lines))
+        corpus.append(doc_pages)
+    return corpus
+
+
+def load_corpus(source: Path, limit: int) -> List[List[str]]:
+    """Page texts of the PDFs (extracted) and .txt files (form feeds split pages) under ``source``."""
+    from documents.services.pdf_extractor import extract_metadata_and_text
+
+    corpus = []
+    for path in sorted(source.rglob("*")):
+        if len(corpus) >= limit:
+            break
+        if path.suffix.lower() == ".pdf":
+            try:
+                pages = [text for _, text, _ in extract_metadata_and_text(str(path))["pages"]]
+            except Exception as exc:
+                print(f"skipping {path}: {exc}", file=sys.stderr)
+                continue
+        elif path.suffix.lower() == ".txt":
+            pages = path.read_text(errors="replace").split("\f")
+        else:
+            continue
+        if any(pages):
+            corpus.append(pages)
+    return corpus
+
+
+def _compress(textstore, text: str, method: str, dictionary_id: int) -> bytes:
+    if method == "raw":
+        return bytes([textstore.RAW]) + text.encode()
+    if method == "zstd+dict":
+        return textstore.compress(text, method="zstd", dictionary_id=dictionary_id)
+    return textstore.compress(text, method=method, dictionary_id=0)
+
+
+def run(corpus: List[List[str]], iterations: int) -> Dict[str, object]:
+    from django.contrib.auth.models import User
+    from django.db.models import Sum
+    from django.db.models.functions import Length
+
+    from documents.models import CompressionDictionary, Document, DocumentPage
+    from documents.services import textstore
+
+    from .harness import measure
+
+    owner = User.objects.create(username="bench_text")
+    texts = ["\n".join(pages) for pages in corpus]
+    page_texts = [text for pages in corpus for text in pages]
+    text_bytes = sum(len(text.encode()) for text in texts)
+    methods = list(METHODS) if textstore.zstandard else ["raw", "zlib"]
+    dictionary_id = 0
+    if "zstd+dict" in methods:
+        rng = random.Random(0)
+        samples = [text.encode() for text in rng.sample(page_texts, min(len(page_texts), 5000)) if text]
+        trained = textstore.zstandard.train_dictionary(112 * 1024, samples)
+        dictionary_id = CompressionDictionary.objects.create(data=trained.as_bytes(), samples=len(samples)).pk
+
+    results: Dict[str, object] = {
+        "documents": len(texts),
+        "pages": len(page_texts),
+        "text_bytes": text_bytes,
+        "search_text_bytes": sum(len(textstore.search_terms(text).encode()) for text in texts),
+    }
+    for method in methods:
+        start = time.perf_counter()
+        blobs = [_compress(textstore, text, method, dictionary_id) for text in texts]
+        page_blobs = [[_compress(textstore, text, method, dictionary_id) for text in pages] for pages in corpus]
+        elapsed = time.perf_counter() - start
+        docs = Document.objects.bulk_create([
+            Document(owner=owner, original_filename=f"{method}-{i}.pdf", content_blob=blob)
+            for i, blob in enumerate(blobs)
+        ])
+        DocumentPage.objects.bulk_create([
+            DocumentPage(document=doc, number=number, fingerprint="", text_blob=blob)
+            for doc, doc_blobs in zip(docs, page_blobs)
+            for number, blob in enumerate(doc_blobs, start=1)
+        ], batch_size=1000)
+        ids = [doc.pk for doc in docs]
+        stored = Document.objects.filter(pk__in=ids).aggregate(size=Sum(Length("content_blob")))["size"]
+        page_stored = DocumentPage.objects.filter(document_id__in=ids).aggregate(size=Sum(Length("text_blob")))["size"]
+        page_ids = list(DocumentPage.objects.filter(document_id__in=ids).values_list("pk", flat=True))
+        textstore.reset()  # cold dictionary cache for the first read
+        results[method] = {
+            "document_bytes": stored,
+            "page_bytes": page_stored,
+            "ratio": round(text_bytes / stored, 2),
+            "write_mb_s": round(2 * text_bytes / elapsed / 1e6, 1),
+            "read": measure(lambda i: Document.objects.get(pk=ids[i % len(ids)]).content_text, iterations),
+            "page_read": measure(lambda i: DocumentPage.objects.get(pk=page_ids[i * 7 % len(page_ids)]).text,
+                                 iterations),
+        }
+        print(f"{method:>10}: ratio {results[method]['ratio']}, "
+              f"read p50 {results[method]['read']['p50_ms']} ms", file=sys.stderr)
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", type=Path, help="directory of PDFs / .txt files to use instead of synthetic text")
+    parser.add_argument("--documents", type=int, default=300)
+    parser.add_argument("--pages", type=int, default=8, help="pages per synthetic document")
+    parser.add_argument("--words-per-page", type=int, default=350)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--out", type=Path, help="write results JSON here")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .run import bench_environment
+
+    options = build_parser().parse_args(argv)
+    with bench_environment() as database:
+        if options.source:
+            corpus = load_corpus(options.source, options.documents)
+        else:
+            corpus = synthetic_corpus(options.documents, options.pages, options.words_per_page)
+        results = run(corpus, options.iterations)
+
+    import django
+
+    report = {
+        "meta": {
+            "django": django.get_version(),
+            "database": database,
+            "corpus": str(options.source) if options.source else "synthetic",
+            "options": {key: str(value) if isinstance(value, Path) else value
+                        for key, value in vars(options).items()},
+        },
+        "results": results,
+    }
+    if options.out:
+        options.out.write_text(json.dumps(report, indent=2))
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+"""Routes of ``documents.async_views``; mounted ahead of ``documents.urls`` when ``ASYNC_VIEWS`` is set."""
+from django.urls import path
+
+from . import async_views
+
+urlpatterns = [
+    path('documents/search/', async_views.search, name='document-search'),
+    path('documents/<int:pk>/download/', async_views.download, name='document-download'),
+    path('jobs/<int:pk>/', async_views.job_detail, name='job-detail'),
+]
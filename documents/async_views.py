@@ -0,0 +1,135 @@
+"""Async views for the I/O-bound endpoints: file download, job polling and search.
+
+Under ASGI these run on the event loop, so a slow download or a client polling
+a job does not hold a worker thread. ORM and cache calls use Django's async
+APIs and file reads go through ``asyncio.to_thread`` in chunks. They answer
+the same URLs as the DRF viewsets and are mounted in front of them when
+``ASYNC_VIEWS`` is set (see ``pdfvault/asgi.py``); under WSGI the DRF views
+are used, since every async view would need its own event loop there.
+
+DRF is synchronous, so authentication (token only) and error responses are
+handled here with the same status codes and bodies.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import AsyncIterator
+
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from django.views.decorators.http import require_GET
+
+from . import throttling
+from .authentication import aauthenticate_token
+from .filters import DocumentFilter
+from .models import AuditLog, Document, ExtractionJob
+from .serializers import ExtractionJobSerializer
+from .services import lifecycle
+
+CHUNK_SIZE = 64 * 1024
+SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 200
+SEARCH_FIELDS = ["id", "original_filename", "title", "author", "page_count", "is_processed", "folder_id", "created_at"]
+
+
+def _error(detail: str, status: int) -> JsonResponse:
+    response = JsonResponse({"detail": detail}, status=status)
+    if status == 401:
+        response["WWW-Authenticate"] = "Token"
+    return response
+
+
+def _throttled(wait: float) -> JsonResponse:
+    seconds = throttling.retry_after(wait)
+    response = _error(f"Request was throttled. Expected available in {seconds} seconds.", 429)
+    response["Retry-After"] = seconds
+    return response
+
+
+async def _authenticate(request):
+    keyword, _, key = request.headers.get("Authorization", "").partition(" ")
+    if keyword != "Token" or not key.strip():
+        return None
+    return await aauthenticate_token(key.strip())
+
+
+async def _read_chunks(path: str) -> AsyncIterator[bytes]:
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        while True:
+            chunk = await asyncio.to_thread(f.read, CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+@require_GET
+async def download(request, pk: int):
+    user = await _authenticate(request)
+    if user is None:
+        return _error("Authentication credentials were not provided or are invalid.", 401)
+    wait = await throttling.acheck("download", user.pk)
+    if wait:
+        return _throttled(wait)
+    try:
+        document = await Document.objects.aget(pk=pk, owner=user)
+    except Document.DoesNotExist:
+        return _error("No Document matches the given query.", 404)
+    if not document.file:
+        return _error("Not found.", 404)
+    path = document.file.path
+    try:
+        size = await asyncio.to_thread(os.path.getsize, path)
+    except FileNotFoundError:
+        return _error("Not found.", 404)
+    await AuditLog.objects.acreate(
+        owner=user,
+        action=AuditLog.Action.DOWNLOAD,
+        target_type=AuditLog.TargetType.DOCUMENT,
+        target_id=str(document.id),
+        meta={"filename": document.original_filename},
+    )
+    await lifecycle.arecord_access(document.pk)
+    response = StreamingHttpResponse(_read_chunks(path), content_type="application/pdf")
+    response["Content-Length"] = str(size)
+    response["Content-Disposition"] = content_disposition_header(True, document.original_filename)
+    return response
+
+
+@require_GET
+async def job_detail(request, pk: int):
+    user = await _authenticate(request)
+    if user is None:
+        return _error("Authentication credentials were not provided or are invalid.", 401)
+    try:
+        job = await ExtractionJob.objects.aget(pk=pk, document__owner=user)
+    except ExtractionJob.DoesNotExist:
+        return _error("No ExtractionJob matches the given query.", 404)
+    return JsonResponse(ExtractionJobSerializer(job).data)
+
+
+@require_GET
+async def search(request):
+    """``GET documents/search/?q=...`` with the DocumentFilter parameters.
+
+    Returns at most ``limit`` (default 50, max 200) compact rows, newest first.
+    """
+    user = await _authenticate(request)
+    if user is None:
+        return _error("Authentication credentials were not provided or are invalid.", 401)
+    wait = await throttling.acheck("search", user.pk)
+    if wait:
+        return _throttled(wait)
+    try:
+        limit = min(int(request.GET.get("limit", SEARCH_LIMIT)), MAX_SEARCH_LIMIT)
+    except ValueError:
+        return _error("limit must be an integer", 400)
+    filterset = DocumentFilter(data=request.GET, queryset=Document.objects.filter(owner=user), request=request)
+    # Building the queryset only validates the parameters; nothing is queried yet
+    if not filterset.is_valid():
+        return JsonResponse(filterset.errors, status=400)
+    rows = filterset.qs.order_by("-created_at", "id").values(*SEARCH_FIELDS)[:max(limit, 0)]
+    return JsonResponse([row async for row in rows], safe=False)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from . import metrics
+
+DEFAULTS = {
+    # Seconds a resolved token stays in the process-local cache. Other worker
+    # processes only notice a revoked token or deactivated user after this.
+    "TTL": 30,
+    "MAX_ENTRIES": 10000,
+    # Optional django cache alias shared by all workers, e.g. "default" with Redis.
+    # When set, the process-local cache is not used, so revocations take effect
+    # in every worker at once.
+    "SHARED_CACHE": None,
+    "SHARED_TTL": 300,
+}
+
+
+def _config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "TOKEN_AUTH_CACHE", {})}
+
+
+def _user_fields() -> List[str]:
+    # Never cached: the password hash. It stays deferred on cached users.
+    return [field.attname for field in get_user_model()._meta.concrete_fields if field.attname != "password"]
+
+
+def _snapshot(user) -> Dict[str, object]:
+    return {name: getattr(user, name) for name in _user_fields()}
+
+
+def _build_user(snapshot: Dict[str, object]):
+    """A new user instance per request, so requests never share (and mutate) one object.
+
+    Fields missing from the snapshot, i.e. the password, are deferred: they are
+    loaded on access and ``save()`` only writes the loaded fields.
+    """
+    User = get_user_model()
+    names = [name for name in _user_fields() if name in snapshot]
+    return User.from_db(router.db_for_read(User), names, [snapshot[name] for name in names])
+
+
+class TokenUserCache:
+    """Thread-safe LRU of token key -> user field values with a per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[object, float]]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            snapshot, expires_at = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return snapshot
+
+    def set(self, key: str, snapshot: Dict[str, object]) -> None:
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (snapshot, time.monotonic() + self.ttl)
+            self._keys_by_user.setdefault(snapshot["id"], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_key(self, key: str) -> None:
+        with self._lock:
+            self._drop(key)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[0]["id"]
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+
+_local_cache: Optional[TokenUserCache] = None
+
+
+def get_local_cache() -> TokenUserCache:
+    global _local_cache
+    if _local_cache is None:
+        config = _config()
+        _local_cache = TokenUserCache(config["MAX_ENTRIES"], config["TTL"])
+    return _local_cache
+
+
+def _shared_key(key: str) -> str:
+    return f"pdfvault:token-user:{key}"
+
+
+def invalidate_token(key: str) -> None:
+    get_local_cache().invalidate_key(key)
+    alias = _config()["SHARED_CACHE"]
+    if alias:
+        caches[alias].delete(_shared_key(key))
+
+
+def invalidate_user(user_id: int) -> None:
+    get_local_cache().invalidate_user(user_id)
+    alias = _config()["SHARED_CACHE"]
+    if alias:
+        keys = Token.objects.filter(user_id=user_id).values_list("key", flat=True)
+        caches[alias].delete_many([_shared_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that memoizes token -> user resolution.
+
+    Lookups hit the shared cache when ``SHARED_CACHE`` is configured, otherwise
+    a process-local LRU, and only then the database. Only user field values
+    without the password hash are cached; every request gets its own user
+    instance. Entries are dropped when the token is deleted or the user is
+    saved or deleted (see ``documents.signals``).
+    """
+
+    def authenticate_credentials(self, key):
+        alias = _config()["SHARED_CACHE"]
+        shared = caches[alias] if alias else None
+        if shared is not None:
+            snapshot = shared.get(_shared_key(key))
+        else:
+            snapshot = get_local_cache().get(key)
+        metrics.record_cache("token_auth", snapshot is not None)
+        if snapshot is None:
+            user, token = super().authenticate_credentials(key)
+            if shared is not None:
+                shared.set(_shared_key(key), _snapshot(user), _config()["SHARED_TTL"])
+            else:
+                get_local_cache().set(key, _snapshot(user))
+            return user, token
+        user = _build_user(snapshot)
+        # The Token row is not loaded on a cache hit; request.auth still carries the key.
+        return user, Token(key=key, user=user)
+
+
+async def aauthenticate_token(key: str):
+    """Async counterpart of ``CachedTokenAuthentication.authenticate_credentials``.
+
+    Returns the user, or None for an unknown token or inactive user. Uses the
+    async cache and ORM APIs, so it does not hand the request to a thread.
+    """
+    alias = _config()["SHARED_CACHE"]
+    shared = caches[alias] if alias else None
+    if shared is not None:
+        snapshot = await shared.aget(_shared_key(key))
+    else:
+        snapshot = get_local_cache().get(key)
+    metrics.record_cache("token_auth", snapshot is not None)
+    if snapshot is not None:
+        return _build_user(snapshot)
+    try:
+        token = await Token.objects.select_related("user").aget(key=key)
+    except Token.DoesNotExist:
+        return None
+    if not token.user.is_active:
+        return None
+    if shared is not None:
+        await shared.aset(_shared_key(key), _snapshot(token.user), _config()["SHARED_TTL"])
+    else:
+        get_local_cache().set(key, _snapshot(token.user))
+    return token.user
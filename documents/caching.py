@@ -0,0 +1,117 @@
+"""Owner-scoped response caching for document reads.
+
+Every owner has a version counter in the cache. Any write that can change what
+the owner sees (documents, tags, folders) bumps it, which makes every cached
+response and ETag of that owner unreachable at once, so invalidation is a
+single ``incr``. Cache keys always contain the owner id, so a response can
+never be served to another user.
+
+The counters only work when every worker process sees the same cache. With a
+process-local backend (LocMemCache, DummyCache) a write in one worker would
+leave the others serving stale bodies and 304s, so unless
+``RESPONSE_CACHE_ENABLED`` says otherwise the mixin is bypassed for them.
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import metrics
+
+
+def _cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def response_cache_enabled() -> bool:
+    enabled = getattr(settings, "RESPONSE_CACHE_ENABLED", None)
+    if enabled is None:
+        return not isinstance(_cache(), (LocMemCache, DummyCache))
+    return bool(enabled)
+
+
+def _version_key(owner_id: int) -> str:
+    return f"pdfvault:owner-version:{owner_id}"
+
+
+def owner_version(owner_id: int) -> int:
+    cache = _cache()
+    version = cache.get(_version_key(owner_id))
+    if version is None:
+        # Seeded from the clock rather than 1: if the counter is evicted, it
+        # must not fall back to a version whose responses are still cached.
+        cache.add(_version_key(owner_id), time.time_ns(), None)
+        version = cache.get(_version_key(owner_id))
+    return version
+
+
+def bump_owner_version(owner_id: int) -> None:
+    """Invalidate all cached responses of ``owner_id``.
+
+    The counter is bumped right away and again when the current transaction
+    commits, so a concurrent read that cached pre-commit rows under the first
+    bump is discarded as well.
+    """
+
+    def bump():
+        cache = _cache()
+        try:
+            cache.incr(_version_key(owner_id))
+        except ValueError:
+            cache.add(_version_key(owner_id), time.time_ns(), None)
+
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
+
+
+class OwnerCachedResponseMixin:
+    """Caches ``list``/``retrieve`` payloads per owner and answers ``If-None-Match`` with 304."""
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        if not response_cache_enabled():
+            return handler(request, *args, **kwargs)
+        owner_id = request.user.pk
+        seed = "|".join([
+            str(owner_id),
+            str(owner_version(owner_id)),
+            request.get_host(),
+            request.get_full_path(),
+            request.accepted_renderer.format,
+        ])
+        digest = hashlib.sha1(seed.encode()).hexdigest()
+        etag = f'W/"{digest}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if_none_match = request.headers.get("If-None-Match", "")
+        if etag in (tag.strip() for tag in if_none_match.split(",")):
+            metrics.record_cache("response", True)
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        cache = _cache()
+        key = f"pdfvault:response:{owner_id}:{digest}"
+        data = cache.get(key)
+        metrics.record_cache("response", data is not None)
+        if data is not None:
+            return Response(data, headers=headers)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300))
+            for name, value in headers.items():
+                response[name] = value
+        return response
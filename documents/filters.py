@@ -1,33 +1,71 @@
-from django.db.models import Q
+from django.db.models import Q, Subquery, Value
+from django.db.models.functions import Concat, Left, Length
 from django_filters import rest_framework as filters
 
-from .models import Document
+from .models import Document, Folder
+from .services import textstore
 
 
 class DocumentFilter(filters.FilterSet):
     q = filters.CharFilter(method="filter_q")
     tag = filters.CharFilter(method="filter_tag")  # supports multiple tag params
-    folder = filters.NumberFilter(field_name="folder_id")
-    processed = filters.BooleanFilter(field_name="is_processed")
+    folder = filters.NumberFilter(method="filter_folder")
+    # With folder=<id>: also documents in all subfolders of that folder
+    include_descendants = filters.BooleanFilter(method="filter_include_descendants")
+    processed = filters.BooleanFilter(method="filter_processed")
     created_after = filters.DateFilter(field_name="created_at", lookup_expr="gte")
     created_before = filters.DateFilter(field_name="created_at", lookup_expr="lte")
 
     class Meta:
         model = Document
-        fields = ["q", "tag", "folder", "processed", "created_after", "created_before"]
+        fields = ["q", "tag", "folder", "include_descendants", "processed", "created_after", "created_before"]
 
     def filter_q(self, queryset, name, value):
         if not value:
             return queryset
+        # The text itself is compressed; every word of the query must occur
+        # in the document's search terms (distinct lowercased words)
+        words = Q()
+        for word in textstore.search_terms(value).split():
+            words &= Q(search_text__contains=word)
         return queryset.filter(
             Q(title__icontains=value)
             | Q(original_filename__icontains=value)
-            | Q(content_text__icontains=value)
+            | (words if words else Q(pk__in=[]))
         )
 
+    def filter_folder(self, queryset, name, value):
+        if value is None:
+            return queryset
+        if not self.form.cleaned_data.get("include_descendants"):
+            return queryset.filter(folder_id=value)
+        # One statement: the root's path bounds an (owner, path) index range
+        # (see models.subtree_q), resolved in scalar subqueries.
+        root = Folder.objects.filter(pk=value)
+        lower = Subquery(root.values("path")[:1])
+        upper = Subquery(root.annotate(
+            upper=Concat(Left("path", Length("path") - 1), Value("0"))
+        ).values("upper")[:1])
+        return queryset.filter(
+            folder__owner_id=Subquery(root.values("owner_id")[:1]),
+            folder__path__gte=lower,
+            folder__path__lt=upper,
+        )
+
+    def filter_include_descendants(self, queryset, name, value):
+        # Applied by filter_folder
+        return queryset
+
+    def filter_processed(self, queryset, name, value):
+        if value is None:
+            return queryset
+        # `__in` instead of `=`: Django renders boolean equality as a bare
+        # column, which SQLite cannot match against idx_doc_owner_proc_created.
+        return queryset.filter(is_processed__in=[value])
+
     def filter_tag(self, queryset, name, value):
         # value is handled one at a time; allow repeated 'tag' params
-        values = self.request.query_params.getlist("tag") if hasattr(self.request, "query_params") else [value]
+        values = self.data.getlist("tag") if hasattr(self.data, "getlist") else [value]
         if not values:
             return queryset
         return queryset.filter(tags__name__in=values).distinct()
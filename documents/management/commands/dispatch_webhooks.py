@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from documents.services import webhooks
+
+# Seconds between purges of delivered events
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = "Deliver queued webhook events (see documents.services.webhooks)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="deliver what is due now and exit")
+        parser.add_argument("--interval", type=float, default=1.0, help="seconds to wait when nothing is due")
+        parser.add_argument("--batch-size", type=int, default=None, help="events per request (WEBHOOK_BATCH_SIZE)")
+
+    def handle(self, *args, **options):
+        dispatcher = webhooks.Dispatcher(batch_size=options["batch_size"])
+        retention = getattr(settings, "WEBHOOK_RETENTION_DAYS", 7)
+        try:
+            if options["once"]:
+                self.stdout.write(f"made {dispatcher.run_once()} requests")
+                return
+            last_purge = 0.0
+            while True:
+                close_old_connections()
+                if not dispatcher.run_once():
+                    time.sleep(options["interval"])
+                if time.monotonic() - last_purge > PURGE_INTERVAL:
+                    webhooks.purge(retention)
+                    last_purge = time.monotonic()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            dispatcher.close()
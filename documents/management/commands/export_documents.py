@@ -0,0 +1,52 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+
+from documents.filters import DocumentFilter
+from documents.models import Document
+from documents.services import export
+
+
+class Command(BaseCommand):
+    help = "Stream a user's documents as NDJSON, Parquet or a ZIP of the PDFs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", required=True, help="username")
+        parser.add_argument("--output", choices=sorted(export.FORMATS), default="ndjson")
+        parser.add_argument("--out", help="file to write (default: stdout)")
+        parser.add_argument("--chunk-size", type=int, default=export.CHUNK_SIZE)
+        parser.add_argument(
+            "--filter", action="append", default=[], metavar="NAME=VALUE",
+            help="DocumentFilter parameter, e.g. --filter processed=true --filter tag=invoices (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            owner = get_user_model().objects.get(username=options["owner"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"unknown user {options['owner']!r}")
+        if options["output"] == "parquet" and not export.PARQUET_AVAILABLE:
+            raise CommandError("pyarrow is not installed")
+
+        data = QueryDict(mutable=True)
+        for item in options["filter"]:
+            name, sep, value = item.partition("=")
+            if not sep:
+                raise CommandError(f"--filter expects NAME=VALUE, got {item!r}")
+            data.appendlist(name, value)
+        filterset = DocumentFilter(data=data, queryset=Document.objects.filter(owner=owner))
+        if not filterset.is_valid():
+            raise CommandError(f"invalid filter: {filterset.errors.as_json()}")
+
+        chunks = export.export_chunks(filterset.qs, options["output"], options["chunk_size"])
+        target = open(options["out"], "wb") if options["out"] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                target.write(chunk)
+        finally:
+            if options["out"]:
+                target.close()
+            else:
+                target.flush()
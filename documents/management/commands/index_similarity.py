@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.models import Document
+from documents.services import similarity
+
+
+class Command(BaseCommand):
+    help = "Compute MinHash signatures and LSH buckets of extracted documents that have none."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="recompute every extracted document")
+        parser.add_argument("--chunk-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        if similarity.numpy is None:
+            raise CommandError("numpy is not installed")
+        documents = Document.objects.filter(is_processed=True).only("id", "owner_id", "content_blob")
+        if not options["all"]:
+            documents = documents.filter(minhash__isnull=True)
+        count = 0
+        for document in documents.order_by("id").iterator(chunk_size=options["chunk_size"]):
+            similarity.index_document(document)
+            count += 1
+        self.stdout.write(f"indexed {count} documents")
@@ -0,0 +1,43 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from documents.services import lifecycle
+from documents.storage import cold_root
+
+
+class Command(BaseCommand):
+    help = ("Report (or with --delete remove) media files no document refers to, "
+            "and documents whose file is missing.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--delete", action="store_true", help="delete orphaned files instead of listing them")
+        parser.add_argument("--min-age", type=int, default=3600,
+                            help="ignore files modified in the last N seconds (uploads in progress)")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--recount", action="store_true", help="also rebuild the per-owner usage counters")
+
+    def handle(self, *args, **options):
+        roots = [os.fspath(settings.MEDIA_ROOT)]
+        if cold_root():
+            roots.append(cold_root())
+        orphans = orphan_bytes = 0
+        for path, name, size in lifecycle.find_orphans(roots, options["batch_size"], options["min_age"]):
+            orphans += 1
+            orphan_bytes += size
+            if options["delete"]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            else:
+                self.stdout.write(f"orphan {path} ({size} bytes)")
+        missing = 0
+        for document in lifecycle.find_missing(options["batch_size"]):
+            missing += 1
+            self.stdout.write(f"missing document #{document.pk} {document.file.name}")
+        verb = "deleted" if options["delete"] else "found"
+        self.stdout.write(f"{verb} {orphans} orphaned files ({orphan_bytes} bytes), {missing} documents without a file")
+        if options["recount"]:
+            self.stdout.write(f"recounted usage of {lifecycle.recount_usage()} owners")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.services import worker
+
+
+class Command(BaseCommand):
+    help = ("Run queued extraction jobs. With --workers N the PDF stack is imported once and N "
+            "processes are forked from it; --workers 0 runs jobs in this process.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--poll-interval", type=float, default=worker.POLL_INTERVAL,
+                            help="seconds to wait when the queue is empty")
+        parser.add_argument("--drain", action="store_true",
+                            help="exit once the queue is empty (only with --workers 0)")
+
+    def handle(self, *args, **options):
+        if options["workers"] < 0:
+            raise CommandError("--workers must be 0 or more")
+        if options["workers"] == 0:
+            done = worker.work(drain=options["drain"], poll_interval=options["poll_interval"])
+            self.stdout.write(f"ran {done} jobs")
+            return
+        if options["drain"]:
+            raise CommandError("--drain needs --workers 0")
+        worker.serve(options["workers"], options["poll_interval"])
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.services import lifecycle
+from documents.storage import COLD, HOT, cold_root
+
+
+class Command(BaseCommand):
+    help = ("Move files of documents not downloaded or previewed for --days days to COLD_STORAGE_ROOT, "
+            "and files of cold documents accessed since back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="default: COLD_TIER_AFTER_DAYS")
+        parser.add_argument("--limit", type=int, default=None, help="move at most N documents each way")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        if not cold_root():
+            raise CommandError("COLD_STORAGE_ROOT is not configured")
+        days = options["days"] if options["days"] is not None else settings.COLD_TIER_AFTER_DAYS
+        demote, promote = lifecycle.tier_candidates(days)
+        for tier, documents in ((COLD, demote), (HOT, promote)):
+            moved = missing = 0
+            for document in documents:
+                if options["limit"] is not None and moved >= options["limit"]:
+                    break
+                if options["dry_run"]:
+                    self.stdout.write(f"would move document #{document.pk} to {tier}")
+                    moved += 1
+                elif lifecycle.move_document(document, tier):
+                    moved += 1
+                else:
+                    missing += 1
+            self.stdout.write(f"{tier}: {'would move' if options['dry_run'] else 'moved'} {moved} documents"
+                              + (f", {missing} files missing" if missing else ""))
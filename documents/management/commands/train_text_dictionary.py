@@ -0,0 +1,51 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.models import CompressionDictionary, Document, DocumentPage
+from documents.services import textstore
+
+
+class Command(BaseCommand):
+    help = "Train a zstd dictionary on stored page texts; new text is compressed with it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--samples", type=int, default=5000, help="page texts to train on")
+        parser.add_argument("--size", type=int, default=112 * 1024, help="dictionary size in bytes")
+        parser.add_argument("--recompress", action="store_true",
+                            help="also rewrite all stored document and page texts with the new dictionary")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if textstore.zstandard is None:
+            raise CommandError("zstandard is not installed")
+        ids = list(DocumentPage.objects.values_list("id", flat=True))
+        chosen = random.sample(ids, min(len(ids), options["samples"]))
+        samples = [
+            page.text.encode()
+            for page in DocumentPage.objects.filter(id__in=chosen).only("id", "text_blob").iterator()
+            if page.text
+        ]
+        if len(samples) < 10:
+            raise CommandError(f"need at least 10 non-empty page texts, found {len(samples)}")
+        trained = textstore.zstandard.train_dictionary(options["size"], samples)
+        dictionary = CompressionDictionary.objects.create(data=trained.as_bytes(), samples=len(samples))
+        textstore.reset()
+        self.stdout.write(f"dictionary {dictionary.pk}: {len(trained.as_bytes())} bytes from {len(samples)} pages")
+
+        if options["recompress"]:
+            chunk = options["chunk_size"]
+            for model, blob_field, text_field in ((Document, "content_blob", "content_text"),
+                                                  (DocumentPage, "text_blob", "text")):
+                batch, count = [], 0
+                for row in model.objects.only("id", blob_field).iterator(chunk_size=chunk):
+                    text = getattr(row, text_field)
+                    setattr(row, blob_field, textstore.compress(text, method="zstd", dictionary_id=dictionary.pk))
+                    batch.append(row)
+                    if len(batch) >= chunk:
+                        model.objects.bulk_update(batch, [blob_field])
+                        count += len(batch)
+                        batch = []
+                model.objects.bulk_update(batch, [blob_field])
+                count += len(batch)
+                self.stdout.write(f"recompressed {count} {model._meta.verbose_name_plural}")
@@ -0,0 +1,144 @@
+"""Prometheus metrics for the API and the extraction pipeline.
+
+``prometheus_client`` is optional. Without it every metric below is a no-op and
+``/metrics`` answers 503. When running several gunicorn workers, point
+``PROMETHEUS_MULTIPROC_DIR`` at an empty writable directory before start-up and
+add ``child_exit`` from this module to the gunicorn config so that every worker
+writes its samples to mmap'ed files that the scraping worker aggregates.
+
+``/metrics`` is only served to clients whose address is in
+``METRICS_ALLOWED_IPS`` (addresses or networks, loopback by default) or that
+send ``Authorization: Bearer <METRICS_TOKEN>``. ``REMOTE_ADDR`` is used as is,
+so behind a reverse proxy either block the path there or rely on the token.
+"""
+from __future__ import annotations
+
+import hmac
+import ipaddress
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.http import HttpResponse
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:  # pragma: no cover - optional dependency
+    prometheus_client = None
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def observe(self, amount: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+
+def _histogram(name: str, documentation: str, labelnames=(), buckets=None):
+    if prometheus_client is None:
+        return _NoopMetric()
+    kwargs = {"buckets": buckets} if buckets else {}
+    return prometheus_client.Histogram(name, documentation, labelnames, **kwargs)
+
+
+def _counter(name: str, documentation: str, labelnames=()):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return prometheus_client.Counter(name, documentation, labelnames)
+
+
+REQUEST_LATENCY = _histogram(
+    "pdfvault_http_request_duration_seconds",
+    "Request latency by URL name (viewset basename and action).",
+    ["route", "method", "status"],
+)
+UPLOAD_BYTES = _histogram(
+    "pdfvault_upload_bytes",
+    "Size of uploaded PDF files.",
+    buckets=[2 ** exp for exp in range(14, 26)],  # 16KB .. 32MB
+)
+EXTRACTION_DURATION = _histogram(
+    "pdfvault_extraction_duration_seconds",
+    "Wall time of a document extraction.",
+    ["status"],
+    buckets=[0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300],
+)
+EXTRACTION_PAGES_PER_SECOND = _histogram(
+    "pdfvault_extraction_pages_per_second",
+    "Extraction throughput of successful jobs.",
+    buckets=[1, 2, 5, 10, 20, 50, 100, 200, 500],
+)
+CACHE_REQUESTS = _counter(
+    "pdfvault_cache_requests_total",
+    "Cache lookups by cache name and result (hit or miss).",
+    ["cache", "result"],
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+class JobQueueCollector:
+    """Reports ExtractionJob counts per status, read from the database at scrape time."""
+
+    def collect(self):
+        from .models import ExtractionJob
+
+        family = GaugeMetricFamily(
+            "pdfvault_extraction_jobs", "Extraction jobs by status.", labels=["status"]
+        )
+        # Scrapers poll every few seconds; the GROUP BY does not need to run each time
+        counts = cache.get_or_set(
+            "pdfvault:metrics:job-counts",
+            lambda: dict(ExtractionJob.objects.order_by().values_list("status").annotate(n=Count("id"))),
+            getattr(settings, "METRICS_QUEUE_CACHE_SECONDS", 15),
+        )
+        for status in ExtractionJob.Status.values:
+            family.add_metric([status], counts.get(status, 0))
+        yield family
+
+
+def _metrics_allowed(request) -> bool:
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        supplied = request.headers.get("Authorization", "")
+        if hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+            return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in getattr(settings, "METRICS_ALLOWED_IPS", ["127.0.0.1", "::1"])
+    )
+
+
+def metrics_view(request):
+    if not _metrics_allowed(request):
+        return HttpResponse("forbidden\n", status=403, content_type="text/plain")
+    if prometheus_client is None:
+        return HttpResponse("prometheus_client is not installed\n", status=503, content_type="text/plain")
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    queue = prometheus_client.CollectorRegistry()
+    queue.register(JobQueueCollector())
+    body = prometheus_client.generate_latest(registry) + prometheus_client.generate_latest(queue)
+    return HttpResponse(body, content_type=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def child_exit(server, worker) -> None:
+    """gunicorn ``child_exit`` hook: drop the live gauges of a dead worker."""
+    if prometheus_client is not None and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
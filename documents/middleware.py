@@ -0,0 +1,204 @@
+import cProfile
+import functools
+import hmac
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from rest_framework import serializers
+
+from . import metrics
+
+logger = logging.getLogger("pdfvault.profiling")
+
+
+class MetricsMiddleware:
+    """Observes request latency per URL name, e.g. ``document-list`` or ``document-extract``.
+
+    Sync and async capable, so it does not force async views onto a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, response, start)
+        return response
+
+    @staticmethod
+    def _observe(request, response, start: float) -> None:
+        match = getattr(request, "resolver_match", None)
+        route = (match.url_name or match.route) if match else "unmatched"
+        metrics.REQUEST_LATENCY.labels(
+            route=route, method=request.method, status=str(response.status_code)
+        ).observe(time.perf_counter() - start)
+
+
+class _Trace:
+    __slots__ = ("sql_count", "sql_time", "serialize_time", "serializing")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+        self.serializing = False
+
+    def sql(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.perf_counter() - start
+
+
+_active_trace: ContextVar[Optional[_Trace]] = ContextVar("pdfvault_profiling_trace", default=None)
+_serializers_instrumented = False
+
+
+def _timed_representation(to_representation):
+    @functools.wraps(to_representation)
+    def wrapper(self, *args, **kwargs):
+        trace = _active_trace.get()
+        # Only the outermost serializer is timed; nested ones are part of it
+        if trace is None or trace.serializing:
+            return to_representation(self, *args, **kwargs)
+        trace.serializing = True
+        start = time.perf_counter()
+        try:
+            return to_representation(self, *args, **kwargs)
+        finally:
+            trace.serializing = False
+            trace.serialize_time += time.perf_counter() - start
+
+    return wrapper
+
+
+def _instrument_serializers() -> None:
+    global _serializers_instrumented
+    if _serializers_instrumented:
+        return
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        cls.to_representation = _timed_representation(cls.to_representation)
+    _serializers_instrumented = True
+
+
+class ProfilingMiddleware:
+    """Profiles a sample of requests: SQL count/time, DRF serialization time and
+    optionally a cProfile or pyinstrument profile written to ``PROFILING_DIR``.
+
+    Unless ``PROFILING_SAMPLE_RATE`` or ``PROFILING_HEADER_TOKEN`` is set the
+    middleware removes itself from the stack at start-up. A request sending
+    ``X-Profile: <PROFILING_HEADER_TOKEN>`` is always profiled. Results go to the
+    ``pdfvault.profiling`` logger and the ``Server-Timing`` response header.
+
+    Sync only: while it is enabled, async views run in a thread under ASGI.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = float(getattr(settings, "PROFILING_SAMPLE_RATE", 0) or 0)
+        self.header_token = getattr(settings, "PROFILING_HEADER_TOKEN", "") or ""
+        if self.sample_rate <= 0 and not self.header_token:
+            raise MiddlewareNotUsed
+        self.profiler = getattr(settings, "PROFILING_PROFILER", "") or ""
+        self.profile_dir = Path(getattr(settings, "PROFILING_DIR", "profiles"))
+        _instrument_serializers()
+
+    def _sampled(self, request) -> bool:
+        if self.header_token:
+            sent = request.headers.get("X-Profile", "")
+            if sent and hmac.compare_digest(sent, self.header_token):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self._sampled(request):
+            return self.get_response(request)
+
+        trace = _Trace()
+        token = _active_trace.set(trace)
+        profiler = self._start_profiler()
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(trace.sql):
+                response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - start
+            _active_trace.reset(token)
+            profile_path = self._stop_profiler(profiler, request)
+
+        response["Server-Timing"] = ", ".join([
+            f'sql;dur={trace.sql_time * 1000:.1f};desc="{trace.sql_count} queries"',
+            f"serialize;dur={trace.serialize_time * 1000:.1f}",
+            # Everything but serialization: view code, ORM (incl. sql), other middleware
+            f"view;dur={(total - trace.serialize_time) * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+        logger.info(
+            "%s %s %s total=%.1fms sql=%d/%.1fms serialize=%.1fms profile=%s",
+            request.method,
+            request.get_full_path(),
+            response.status_code,
+            total * 1000,
+            trace.sql_count,
+            trace.sql_time * 1000,
+            trace.serialize_time * 1000,
+            profile_path or "-",
+        )
+        return response
+
+    def _start_profiler(self):
+        if self.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        if self.profiler == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        return None
+
+    def _stop_profiler(self, profiler, request) -> Optional[Path]:
+        if profiler is None:
+            return None
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", request.path).strip("-") or "root"
+        # uuid suffix: the same path is often profiled several times per second
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{slug}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            path = self.profile_dir / f"{stem}.prof"
+            profiler.dump_stats(path)
+        else:
+            profiler.stop()
+            path = self.profile_dir / f"{stem}.html"
+            path.write_text(profiler.output_html(), encoding="utf-8")
+        return path
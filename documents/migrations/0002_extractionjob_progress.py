@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='extractionjob',
+            name='pages_done',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='extractionjob',
+            name='pages_total',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='extractionjob',
+            name='stats',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
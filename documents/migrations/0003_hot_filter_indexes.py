@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0002_extractionjob_progress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['owner', 'created_at'], name='idx_audit_owner_created'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['owner', 'is_processed', 'created_at'], name='idx_doc_owner_proc_created'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['owner', 'folder', 'created_at'], name='idx_doc_owner_folder_created'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['owner', 'title'], name='idx_doc_owner_title'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['owner', 'page_count'], name='idx_doc_owner_pages'),
+        ),
+        migrations.AddIndex(
+            model_name='extractionjob',
+            index=models.Index(fields=['document', 'created_at'], name='idx_job_document_created'),
+        ),
+        migrations.AddIndex(
+            model_name='extractionjob',
+            index=models.Index(fields=['status', 'created_at'], name='idx_job_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='folder',
+            index=models.Index(fields=['owner', 'created_at'], name='idx_folder_owner_created'),
+        ),
+    ]
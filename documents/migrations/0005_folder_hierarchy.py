@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+
+
+def set_root_paths(apps, schema_editor):
+    # Every existing folder is a root folder
+    Folder = apps.get_model('documents', 'Folder')
+    Folder.objects.update(path=Concat(Value('/'), Cast('id', CharField()), Value('/')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0004_incremental_extraction'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='folder',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='documents.folder'),
+        ),
+        migrations.AddField(
+            model_name='folder',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=512),
+        ),
+        migrations.RunPython(set_root_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='folder',
+            index=models.Index(fields=['owner', 'path'], name='idx_folder_owner_path'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0006_near_duplicates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentpage',
+            name='layout',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:05
+
+from django.db import migrations, models
+
+from documents.services import textstore
+
+BATCH_SIZE = 500
+
+
+def compress_texts(apps, schema_editor):
+    # zlib is always available; train_text_dictionary --recompress can switch to zstd later
+    Document = apps.get_model('documents', 'Document')
+    DocumentPage = apps.get_model('documents', 'DocumentPage')
+    batch = []
+    for document in Document.objects.only('id', 'content_text').iterator(chunk_size=BATCH_SIZE):
+        document.content_blob = textstore.compress(document.content_text, method='zlib')
+        document.search_text = textstore.search_terms(document.content_text)
+        batch.append(document)
+        if len(batch) >= BATCH_SIZE:
+            Document.objects.bulk_update(batch, ['content_blob', 'search_text'])
+            batch = []
+    Document.objects.bulk_update(batch, ['content_blob', 'search_text'])
+    batch = []
+    for page in DocumentPage.objects.only('id', 'text').iterator(chunk_size=BATCH_SIZE):
+        page.text_blob = textstore.compress(page.text, method='zlib')
+        batch.append(page)
+        if len(batch) >= BATCH_SIZE:
+            DocumentPage.objects.bulk_update(batch, ['text_blob'])
+            batch = []
+    DocumentPage.objects.bulk_update(batch, ['text_blob'])
+
+
+def decompress_texts(apps, schema_editor):
+    Document = apps.get_model('documents', 'Document')
+    DocumentPage = apps.get_model('documents', 'DocumentPage')
+    for model, blob_field, text_field in ((Document, 'content_blob', 'content_text'),
+                                          (DocumentPage, 'text_blob', 'text')):
+        batch = []
+        for row in model.objects.only('id', blob_field).iterator(chunk_size=BATCH_SIZE):
+            setattr(row, text_field, textstore.decompress(getattr(row, blob_field)))
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_update(batch, [text_field])
+                batch = []
+        model.objects.bulk_update(batch, [text_field])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0007_page_layout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompressionDictionary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField()),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='content_blob',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='documentpage',
+            name='text_blob',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.RunPython(compress_texts, decompress_texts),
+        migrations.RemoveField(
+            model_name='document',
+            name='content_text',
+        ),
+        migrations.RemoveField(
+            model_name='documentpage',
+            name='text',
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+BATCH_SIZE = 500
+
+
+def backfill(apps, schema_editor):
+    Document = apps.get_model('documents', 'Document')
+    StorageUsage = apps.get_model('documents', 'StorageUsage')
+    Document.objects.update(last_accessed_at=F('created_at'))
+    batch = []
+    for document in Document.objects.only('id', 'file').iterator(chunk_size=BATCH_SIZE):
+        try:
+            document.file_size = default_storage.size(document.file.name) if document.file else 0
+        except OSError:
+            continue
+        batch.append(document)
+        if len(batch) >= BATCH_SIZE:
+            Document.objects.bulk_update(batch, ['file_size'])
+            batch = []
+    Document.objects.bulk_update(batch, ['file_size'])
+    totals = Document.objects.values('owner_id').annotate(size=Sum('file_size'), count=Count('id'))
+    StorageUsage.objects.bulk_create([
+        StorageUsage(owner_id=row['owner_id'], bytes=row['size'] or 0, documents=row['count'])
+        for row in totals
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('documents', '0008_compressed_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='storage_usage', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('bytes', models.BigIntegerField(default=0)),
+                ('documents', models.IntegerField(default=0)),
+                ('quota_bytes', models.BigIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='file_size',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='last_accessed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='tier',
+            field=models.CharField(choices=[('hot', 'Hot'), ('cold', 'Cold')], default='hot', editable=False, max_length=8),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['tier', 'last_accessed_at'], name='idx_doc_tier_accessed'),
+        ),
+    ]
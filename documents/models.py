@@ -1,25 +1,77 @@
+import secrets
+import uuid
+
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Concat, Substr
 from django.utils import timezone
 from django.core.validators import FileExtensionValidator
 
+from .services.textstore import compressed_text
+
 
 def document_upload_to(instance: "Document", filename: str) -> str:
     owner_part = f"user_{instance.owner_id}" if instance.owner_id else "anonymous"
     return f"documents/{owner_part}/{filename}"
 
 
+def subtree_q(path: str, field: str = "path") -> Q:
+    """Folders whose materialized path starts with ``path``, as an index range.
+
+    Paths end with "/", and "0" is the character after "/", so the subtree is
+    exactly ``path <= p < path[:-1] + "0"``. Unlike ``startswith`` (LIKE), a
+    range can use the (owner, path) index on every backend.
+    """
+    return Q(**{f"{field}__gte": path, f"{field}__lt": path[:-1] + "0"})
+
+
 class Folder(models.Model):
     name = models.CharField(max_length=255)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="folders")
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name="children")
+    # Materialized path of ids from the root, e.g. "/1/5/" for folder 5 inside folder 1
+    path = models.CharField(max_length=512, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        indexes = [
+            models.Index(fields=["owner", "created_at"], name="idx_folder_owner_created"),
+            models.Index(fields=["owner", "path"], name="idx_folder_owner_path"),
+        ]
         ordering = ["-created_at", "id"]
 
     def __str__(self) -> str:
         return f"{self.name} (#{self.pk})"
 
+    def _expected_path(self) -> str:
+        return f"{self.parent.path if self.parent_id else '/'}{self.pk}/"
+
+    def save(self, *args, **kwargs):
+        """Keep ``path`` in sync with ``parent``.
+
+        Moving a folder rewrites the paths of its whole subtree with a single
+        UPDATE; documents reference folders by id and are not touched.
+        """
+        if self.pk is None:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                self.path = self._expected_path()
+                Folder.objects.filter(pk=self.pk).update(path=self.path)
+            return
+        old_path, new_path = self.path, self._expected_path()
+        if old_path == new_path:
+            super().save(*args, **kwargs)
+            return
+        if self.parent_id and self.parent.path.startswith(old_path):
+            raise ValueError("a folder cannot be moved into its own subtree")
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Folder.objects.filter(subtree_q(old_path), owner_id=self.owner_id).update(
+                path=Concat(Value(new_path), Substr("path", len(old_path) + 1))
+            )
+        self.path = new_path
+
 
 class Tag(models.Model):
     name = models.CharField(max_length=100)
@@ -41,7 +93,10 @@ class Document(models.Model):
     file = models.FileField(upload_to=document_upload_to,
                             validators=[FileExtensionValidator(allowed_extensions=["pdf"])])
     original_filename = models.CharField(max_length=255)
-    content_text = models.TextField(blank=True)
+    # Extracted text, compressed (services.textstore); read and set it as content_text
+    content_blob = models.BinaryField(default=b"", blank=True)
+    # Distinct lowercased words of content_text, matched by q= and search=
+    search_text = models.TextField(blank=True, default="", editable=False)
     title = models.CharField(max_length=255, blank=True)
     author = models.CharField(max_length=255, blank=True)
     page_count = models.IntegerField(null=True, blank=True)
@@ -50,18 +105,115 @@ class Document(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_processed = models.BooleanField(default=False)
+    # Storage lifecycle (services.lifecycle): size counted in StorageUsage,
+    # last download/preview (refreshed at most hourly) and storage tier
+    file_size = models.BigIntegerField(default=0, editable=False)
+    last_accessed_at = models.DateTimeField(default=timezone.now, editable=False)
+    tier = models.CharField(max_length=8, choices=[("hot", "Hot"), ("cold", "Cold")], default="hot",
+                            editable=False)
+    # What produced the extracted fields; see services.jobs.run_extraction
+    extractor_version = models.CharField(max_length=32, blank=True)
+    extraction_options = models.JSONField(default=dict, blank=True)
+    # MinHash signature of content_text (services.similarity), None until computed
+    minhash = models.BinaryField(null=True, blank=True, editable=False)
 
     tags = models.ManyToManyField('Tag', related_name='documents', blank=True)
 
+    content_text = compressed_text("content_blob", search_field="search_text")
+
     class Meta:
         indexes = [
             models.Index(fields=["owner", "created_at"], name="idx_doc_owner_created"),
+            # DocumentFilter: processed=, folder= (both ordered by created_at)
+            models.Index(fields=["owner", "is_processed", "created_at"], name="idx_doc_owner_proc_created"),
+            models.Index(fields=["owner", "folder", "created_at"], name="idx_doc_owner_folder_created"),
+            # ordering=title / ordering=page_count
+            models.Index(fields=["owner", "title"], name="idx_doc_owner_title"),
+            models.Index(fields=["owner", "page_count"], name="idx_doc_owner_pages"),
+            # tier_storage: least recently accessed documents of a tier
+            models.Index(fields=["tier", "last_accessed_at"], name="idx_doc_tier_accessed"),
         ]
         ordering = ["-created_at", "id"]
 
     def __str__(self) -> str:
         return self.original_filename
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.file and not self.file_size:
+            self.file_size = self.file.size
+        super().save(*args, **kwargs)
+
+
+class DocumentPage(models.Model):
+    """Text of one page, with the fingerprint it was extracted from.
+
+    ``text`` is stored compressed in ``text_blob`` (services.textstore).
+    ``layout`` holds the word boxes and tables of structured extractions
+    (``pdf_extractor.page_layout``, zlib-compressed JSON), else None.
+    """
+    document = models.ForeignKey('Document', on_delete=models.CASCADE, related_name='pages')
+    number = models.PositiveIntegerField()
+    fingerprint = models.CharField(max_length=64)
+    text_blob = models.BinaryField(default=b"", blank=True)
+    layout = models.BinaryField(null=True, blank=True)
+
+    text = compressed_text("text_blob")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["document", "number"], name="uniq_document_page_number"),
+        ]
+        ordering = ["document", "number"]
+
+    def __str__(self) -> str:
+        return f"Document #{self.document_id} page {self.number}"
+
+
+class DocumentLSHBand(models.Model):
+    """One LSH bucket of a document's MinHash signature (services.similarity)."""
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    document = models.ForeignKey('Document', on_delete=models.CASCADE, related_name='lsh_bands')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "band", "bucket"], name="idx_lsh_owner_band_bucket"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Document #{self.document_id} band {self.band}"
+
+
+class StorageUsage(models.Model):
+    """Bytes and documents stored per owner, kept current by signals with F() updates.
+
+    ``quota_bytes`` overrides ``STORAGE_QUOTA_BYTES`` for this owner (0 = unlimited).
+    """
+    owner = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+                                 related_name="storage_usage")
+    bytes = models.BigIntegerField(default=0)
+    documents = models.IntegerField(default=0)
+    quota_bytes = models.BigIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"{self.owner_id}: {self.bytes} bytes"
+
+
+class CompressionDictionary(models.Model):
+    """zstd dictionary trained on stored texts (manage.py train_text_dictionary).
+
+    Blobs name the dictionary they were compressed with, so rows are never
+    changed or deleted while text refers to them.
+    """
+    data = models.BinaryField()
+    samples = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"Dictionary #{self.pk} ({len(self.data)} bytes)"
+
 
 class ExtractionJob(models.Model):
     class Status(models.TextChoices):
@@ -75,10 +227,22 @@ class ExtractionJob(models.Model):
     error_message = models.TextField(null=True, blank=True)
     started_at = models.DateTimeField(null=True, blank=True)
     finished_at = models.DateTimeField(null=True, blank=True)
+    pages_done = models.IntegerField(default=0)
+    pages_total = models.IntegerField(null=True, blank=True)
+    # Re-extract every page even if file, extractor version and options are unchanged
+    force = models.BooleanField(default=False)
+    # Extraction options, e.g. {"structured": true} to capture tables and word boxes
+    options = models.JSONField(default=dict, blank=True)
+    # {"stages": {stage: seconds}, "page_seconds": [...], "peak_traced_kb": int | None}
+    stats = models.JSONField(default=dict, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        indexes = [
+            models.Index(fields=["document", "created_at"], name="idx_job_document_created"),
+            models.Index(fields=["status", "created_at"], name="idx_job_status_created"),
+        ]
         ordering = ["-created_at", "id"]
 
     def __str__(self) -> str:
@@ -106,10 +270,73 @@ class AuditLog(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        indexes = [
+            models.Index(fields=["owner", "created_at"], name="idx_audit_owner_created"),
+        ]
         ordering = ["-created_at", "id"]
 
     def __str__(self) -> str:
         return f"{self.owner_id} {self.action} {self.target_type} {self.target_id}"
 
 
+def _webhook_secret() -> str:
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    """URL that receives the owner's events; requests are signed with ``secret`` (see services.webhooks)."""
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="webhook_endpoints")
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64, default=_webhook_secret, editable=False)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "created_at"], name="idx_webhook_owner_created"),
+        ]
+        ordering = ["-created_at", "id"]
+
+    def __str__(self) -> str:
+        return self.url
+
+
+class OutboxEvent(models.Model):
+    """An event waiting to be delivered to one endpoint (transactional outbox).
+
+    Rows are written in the transaction that makes the event true, e.g. the
+    job status update, so an event is delivered if and only if that commits.
+    ``event_id`` is the same for every endpoint's copy and lets receivers
+    drop redeliveries.
+    """
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        DELIVERED = "DELIVERED", "Delivered"
+        FAILED = "FAILED", "Failed"
+
+    endpoint = models.ForeignKey(WebhookEndpoint, on_delete=models.CASCADE, related_name="events")
+    event_id = models.UUIDField(default=uuid.uuid4)
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Set by the dispatcher that is currently sending the row
+    lease = models.UUIDField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Due rows, and the due rows of one endpoint in order
+            models.Index(fields=["status", "next_attempt_at"], name="idx_outbox_status_due"),
+            models.Index(fields=["endpoint", "status", "id"], name="idx_outbox_endpoint_status"),
+        ]
+        ordering = ["id"]
+
+    def __str__(self) -> str:
+        return f"{self.event_type} {self.event_id} -> endpoint #{self.endpoint_id} [{self.status}]"
+
+
 # Create your models here.
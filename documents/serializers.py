@@ -4,14 +4,27 @@ from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
-from .models import Folder, Tag, Document, ExtractionJob, AuditLog
+from .models import Folder, Tag, Document, ExtractionJob, AuditLog, WebhookEndpoint
+from .services import lifecycle
 
 
 class FolderSerializer(serializers.ModelSerializer):
+    parent = serializers.PrimaryKeyRelatedField(queryset=Folder.objects.all(), required=False, allow_null=True)
+
     class Meta:
         model = Folder
-        fields = ["id", "name", "created_at"]
-        read_only_fields = ["id", "created_at"]
+        fields = ["id", "name", "parent", "path", "created_at"]
+        read_only_fields = ["id", "path", "created_at"]
+
+    def validate_parent(self, value):
+        if value is None:
+            return value
+        request = self.context.get("request")
+        if request is not None and value.owner_id != request.user.pk:
+            raise serializers.ValidationError(_("Folder not found."))
+        if self.instance is not None and value.path.startswith(self.instance.path):
+            raise serializers.ValidationError(_("A folder cannot be moved into itself or its subfolders."))
+        return value
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -37,6 +50,9 @@ class DocumentUploadSerializer(serializers.ModelSerializer):
         size = getattr(value, 'size', 0)
         if size and size > MAX_UPLOAD_SIZE:
             raise serializers.ValidationError(_("File too large. Max 20MB."))
+        request = self.context.get("request")
+        if request is not None and lifecycle.would_exceed_quota(request.user.pk, size):
+            raise serializers.ValidationError(_("Storage quota exceeded."))
         # Quick signature check: PDF files start with %PDF
         try:
             pos = value.tell()
@@ -106,7 +122,9 @@ class DocumentDetailSerializer(serializers.ModelSerializer):
             "author",
             "page_count",
             "md5",
+            "file_size",
             "is_processed",
+            "extractor_version",
             "created_at",
             "updated_at",
             "folder",
@@ -132,7 +150,20 @@ class DocumentUpdateSerializer(serializers.ModelSerializer):
 class ExtractionJobSerializer(serializers.ModelSerializer):
     class Meta:
         model = ExtractionJob
-        fields = ["id", "document", "status", "error_message", "started_at", "finished_at", "created_at"]
+        fields = [
+            "id",
+            "document",
+            "status",
+            "error_message",
+            "started_at",
+            "finished_at",
+            "pages_done",
+            "pages_total",
+            "force",
+            "options",
+            "stats",
+            "created_at",
+        ]
         read_only_fields = fields
 
 
@@ -143,3 +174,17 @@ class AuditLogSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+
+
+class WebhookEndpointSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookEndpoint
+        fields = ["id", "url", "secret", "is_active", "created_at"]
+        read_only_fields = ["id", "secret", "created_at"]
+        # Form posts omit unchecked booleans, which DRF would otherwise read as False
+        extra_kwargs = {"is_active": {"default": True}}
+
+    def validate_url(self, value):
+        if not value.lower().startswith(("http://", "https://")):
+            raise serializers.ValidationError(_("Only http and https URLs are supported."))
+        return value
@@ -0,0 +1,204 @@
+"""Streaming export of documents: NDJSON or Parquet records, or a ZIP of the PDFs.
+
+All writers take a queryset and yield ``bytes`` chunks, so they can feed a
+``StreamingHttpResponse`` or a file alike. Rows are read with
+``.values().iterator(chunk_size=...)`` and tags are fetched with one query per
+chunk, so memory stays bounded by the chunk size rather than the export size.
+Parquet needs ``pyarrow`` (optional dependency), which is imported only when
+a Parquet export runs since it takes longer to import than the rest of the app.
+"""
+from __future__ import annotations
+
+import importlib.util
+import io
+import json
+import re
+import zipfile
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List
+
+from ..models import Document
+from . import textstore
+
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+CHUNK_SIZE = 500
+# NDJSON lines are buffered up to this many bytes per yielded chunk
+BUFFER_BYTES = 64 * 1024
+
+RECORD_FIELDS = [
+    "id",
+    "original_filename",
+    "title",
+    "author",
+    "page_count",
+    "md5",
+    "is_processed",
+    "folder_id",
+    "created_at",
+    "updated_at",
+    "content_text",
+]
+
+# content_text is stored compressed and decompressed batch by batch
+QUERY_FIELDS = ["content_blob" if name == "content_text" else name for name in RECORD_FIELDS]
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "zip": ("application/zip", "zip"),
+}
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, non-seekable buffer that hands out what was written so far."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _batches(queryset, fields: List[str], chunk_size: int) -> Iterator[List[Dict[str, object]]]:
+    batch: List[Dict[str, object]] = []
+    # Exports are in id order; the viewset's tag prefetch does not apply to values()
+    rows = queryset.prefetch_related(None).order_by("id").values(*fields)
+    for row in rows.iterator(chunk_size=chunk_size):
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_record_batches(queryset, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Dict[str, object]]]:
+    """Export records (``RECORD_FIELDS`` plus ``tags``) in batches of ``chunk_size``."""
+    through = Document.tags.through
+    for batch in _batches(queryset, QUERY_FIELDS, chunk_size):
+        tags: Dict[int, List[str]] = {row["id"]: [] for row in batch}
+        pairs = (
+            through.objects.filter(document_id__in=list(tags))
+            .order_by("document_id", "tag__name")
+            .values_list("document_id", "tag__name")
+        )
+        for document_id, name in pairs:
+            tags[document_id].append(name)
+        for row in batch:
+            row["content_text"] = textstore.decompress(row.pop("content_blob"))
+            row["tags"] = tags[row["id"]]
+        yield batch
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def ndjson_chunks(queryset, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    buffer: List[bytes] = []
+    size = 0
+    for batch in iter_record_batches(queryset, chunk_size):
+        for row in batch:
+            line = json.dumps(row, default=_json_default, ensure_ascii=False).encode() + b"\n"
+            buffer.append(line)
+            size += len(line)
+            if size >= BUFFER_BYTES:
+                yield b"".join(buffer)
+                buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def parquet_chunks(queryset, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """One Parquet row group per batch, streamed as it is written."""
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("pyarrow is not installed")
+    import pyarrow
+    import pyarrow.parquet
+
+    schema = pyarrow.schema([
+        ("id", pyarrow.int64()),
+        ("original_filename", pyarrow.string()),
+        ("title", pyarrow.string()),
+        ("author", pyarrow.string()),
+        ("page_count", pyarrow.int32()),
+        ("md5", pyarrow.string()),
+        ("is_processed", pyarrow.bool_()),
+        ("folder_id", pyarrow.int64()),
+        ("created_at", pyarrow.timestamp("us", tz="UTC")),
+        ("updated_at", pyarrow.timestamp("us", tz="UTC")),
+        ("content_text", pyarrow.string()),
+        ("tags", pyarrow.list_(pyarrow.string())),
+    ])
+    sink = _Sink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for batch in iter_record_batches(queryset, chunk_size):
+            writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _arcname(row: Dict[str, object]) -> str:
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", str(row["original_filename"]).rsplit("/", 1)[-1]) or "document.pdf"
+    return f"{row['id']}-{name}"
+
+
+def zip_chunks(queryset, chunk_size: int = CHUNK_SIZE, file_chunk: int = 1024 * 1024) -> Iterator[bytes]:
+    """The PDFs of ``queryset`` as a ZIP, written without seeking (data descriptors).
+
+    PDFs are already compressed, so entries are stored. A ``manifest.ndjson``
+    with the metadata (without text) of every exported file closes the archive.
+    """
+    sink = _Sink()
+    manifest: List[bytes] = []
+    fields = [name for name in RECORD_FIELDS if name != "content_text"] + ["file"]
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for batch in _batches(queryset, fields, chunk_size):
+            for row in batch:
+                if not row["file"]:
+                    continue
+                arcname = _arcname(row)
+                try:
+                    source = Document.file.field.storage.open(row["file"], "rb")
+                except FileNotFoundError:
+                    continue
+                with source, archive.open(arcname, "w", force_zip64=True) as target:
+                    for data in iter(lambda: source.read(file_chunk), b""):
+                        target.write(data)
+                        yield sink.drain()
+                yield sink.drain()
+                row["path"] = arcname
+                del row["file"]
+                manifest.append(json.dumps(row, default=_json_default, ensure_ascii=False).encode() + b"\n")
+        archive.writestr("manifest.ndjson", b"".join(manifest))
+    yield sink.drain()
+
+
+def export_chunks(queryset, output: str, chunk_size: int = CHUNK_SIZE) -> Iterable[bytes]:
+    if output == "ndjson":
+        return ndjson_chunks(queryset, chunk_size)
+    if output == "parquet":
+        return parquet_chunks(queryset, chunk_size)
+    if output == "zip":
+        return zip_chunks(queryset, chunk_size)
+    raise ValueError(f"unknown export format {output!r}")
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .. import metrics
+from ..models import Document, DocumentPage, ExtractionJob
+from . import previews, similarity, webhooks
+from .pdf_extractor import EXTRACTOR_VERSION, extract_metadata_and_text, file_md5
+
+# Minimum seconds between two progress writes to the job row
+PROGRESS_INTERVAL = 0.5
+
+DOCUMENT_FIELDS = [
+    "title", "author", "page_count", "content_blob", "search_text", "md5", "is_processed",
+    "extractor_version", "extraction_options", "updated_at",
+]
+
+
+_trace_lock = threading.Lock()
+_trace_users = 0
+_trace_owned = False
+
+
+@contextmanager
+def _traced_peak(result: Dict[str, Optional[int]]) -> Iterator[None]:
+    """Store the peak of Python heap allocations inside the block in ``result["kb"]``.
+
+    tracemalloc is process-wide: it is started for the first concurrent job and
+    stopped after the last one. Overlapping jobs in one process reset each
+    other's peak, so their numbers are approximate. Memory allocated by C
+    libraries outside the Python allocator (pdfium) is not included.
+    """
+    global _trace_users, _trace_owned
+    result["kb"] = None
+    if not getattr(settings, "EXTRACTION_TRACE_MEMORY", True):
+        yield
+        return
+    with _trace_lock:
+        if _trace_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _trace_owned = True
+        _trace_users += 1
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        with _trace_lock:
+            peak = tracemalloc.get_traced_memory()[1]
+            _trace_users -= 1
+            if _trace_users == 0 and _trace_owned:
+                tracemalloc.stop()
+                _trace_owned = False
+        result["kb"] = max(0, peak - baseline) // 1024
+
+
+def _stats(timings: Dict[str, object], peak_traced_kb: Optional[int], **extra) -> Dict[str, object]:
+    page_seconds = timings.pop("page_seconds", [])
+    return {
+        "stages": {stage: round(seconds, 4) for stage, seconds in timings.items()},
+        "page_seconds": [round(seconds, 4) for seconds in page_seconds],
+        "peak_traced_kb": peak_traced_kb,
+        **extra,
+    }
+
+
+def _is_current(document: Document, md5: str, options: Dict[str, object]) -> bool:
+    """True when the stored extraction came from the same bytes, extractor and options."""
+    return (
+        document.is_processed
+        and document.md5 == md5
+        and document.extractor_version == EXTRACTOR_VERSION
+        and document.extraction_options == options
+    )
+
+
+def _bytes(value) -> Optional[bytes]:
+    # BinaryField values come back as memoryview on some backends
+    return None if value is None else bytes(value)
+
+
+def _store_pages(
+    document: Document, existing: Dict[int, DocumentPage], pages: List[Tuple[str, str, Optional[bytes]]],
+) -> None:
+    """Write the per-page fingerprints, texts and layouts, touching only rows that changed."""
+    create, update = [], []
+    for number, (fingerprint, text, layout) in enumerate(pages, start=1):
+        row = existing.get(number)
+        if row is None:
+            create.append(DocumentPage(
+                document=document, number=number, fingerprint=fingerprint, text=text, layout=layout,
+            ))
+        elif row.fingerprint != fingerprint or row.text != text or _bytes(row.layout) != layout:
+            row.fingerprint, row.text, row.layout = fingerprint, text, layout
+            update.append(row)
+    DocumentPage.objects.bulk_create(create, batch_size=500)
+    DocumentPage.objects.bulk_update(update, ["fingerprint", "text_blob", "layout"], batch_size=500)
+    stale = [row.pk for number, row in existing.items() if number > len(pages)]
+    if stale:
+        DocumentPage.objects.filter(pk__in=stale).delete()
+
+
+def _finish(job: ExtractionJob, update_fields: List[str]) -> None:
+    """Save the job's final status together with its webhook events (transactional outbox)."""
+    with transaction.atomic():
+        job.save(update_fields=update_fields)
+        webhooks.record_job(job)
+
+
+def run_extraction(job: ExtractionJob) -> Document:
+    """Extract ``job.document`` and record progress and stage timings on ``job``.
+
+    Unless ``job.force`` is set, a document whose file, extractor version and
+    options are unchanged since the last extraction is not parsed at all, and
+    otherwise only pages with a new fingerprint are extracted again.
+
+    The job is marked SUCCESS or FAILED; extractor errors are re-raised after
+    the failure has been saved.
+    """
+    document = job.document
+    options = job.options or {}
+    timings: Dict[str, object] = {}
+    peak: Dict[str, Optional[int]] = {}
+    last_write = 0.0
+    started = time.perf_counter()
+
+    def progress(done: int, total: int) -> None:
+        nonlocal last_write
+        job.pages_done, job.pages_total = done, total
+        now = time.monotonic()
+        if done == total or now - last_write >= PROGRESS_INTERVAL:
+            last_write = now
+            job.save(update_fields=["pages_done", "pages_total"])
+
+    try:
+        start = time.perf_counter()
+        md5 = file_md5(document.file.path)
+        timings["hash"] = time.perf_counter() - start
+        if not job.force and _is_current(document, md5, options):
+            job.pages_done = job.pages_total = document.page_count or 0
+            job.status = ExtractionJob.Status.SUCCESS
+            job.finished_at = timezone.now()
+            if document.minhash is None and similarity.numpy is not None:
+                # Extracted before signatures existed
+                similarity.index_document(document)
+            job.stats = _stats(timings, None, skipped=True, pages_reused=document.page_count or 0)
+            _finish(job, ["pages_done", "pages_total", "status", "finished_at", "stats"])
+            metrics.EXTRACTION_DURATION.labels(status=job.status).observe(time.perf_counter() - started)
+            return document
+
+        existing = {page.number: page for page in document.pages.all()}
+        reusable = not job.force and (
+            document.extractor_version == EXTRACTOR_VERSION and document.extraction_options == options
+        )
+        previous = {
+            number: (page.fingerprint, page.text, _bytes(page.layout)) for number, page in existing.items()
+        } if reusable else {}
+        with _traced_peak(peak):
+            data = extract_metadata_and_text(
+                document.file.path, progress=progress, timings=timings, previous_pages=previous, md5=md5,
+                structured=bool(options.get("structured")),
+            )
+        pages = data.pop("pages")
+        pages_reused = data.pop("pages_reused")
+        sig = None
+        if similarity.numpy is not None:
+            start = time.perf_counter()
+            sig = similarity.signature(data["content_text"] or "")
+            timings["minhash"] = time.perf_counter() - start
+        start = time.perf_counter()
+        for field, value in data.items():
+            setattr(document, field, value)
+        document.is_processed = True
+        document.extractor_version = EXTRACTOR_VERSION
+        document.extraction_options = options
+        with transaction.atomic():
+            document.save(update_fields=DOCUMENT_FIELDS)
+            _store_pages(document, existing, pages)
+            if similarity.numpy is not None:
+                similarity.store_signature(document, sig)
+        timings["db_write"] = time.perf_counter() - start
+    except Exception as exc:
+        job.status = ExtractionJob.Status.FAILED
+        job.error_message = str(exc)
+        job.finished_at = timezone.now()
+        job.stats = _stats(timings, peak.get("kb"))
+        _finish(job, ["status", "error_message", "finished_at", "stats"])
+        metrics.EXTRACTION_DURATION.labels(status=job.status).observe(time.perf_counter() - started)
+        raise
+    job.status = ExtractionJob.Status.SUCCESS
+    job.finished_at = timezone.now()
+    job.stats = _stats(timings, peak.get("kb"), skipped=False, pages_reused=pages_reused)
+    _finish(job, ["status", "finished_at", "stats"])
+    elapsed = time.perf_counter() - started
+    metrics.EXTRACTION_DURATION.labels(status=job.status).observe(elapsed)
+    if document.page_count and elapsed > 0:
+        metrics.EXTRACTION_PAGES_PER_SECOND.observe(document.page_count / elapsed)
+    if document.page_count:
+        previews.pregenerate(document)
+    return document
@@ -0,0 +1,162 @@
+"""Storage lifecycle: per-owner usage counters and quotas, access times, tiering and reconciliation.
+
+``StorageUsage`` rows are adjusted with ``F()`` updates on every upload and
+delete (see ``signals``), so reading an owner's usage is a primary-key
+lookup. Counters can drift if rows are changed behind the ORM's back;
+``reconcile_storage --recount`` recomputes them.
+"""
+from __future__ import annotations
+
+import os
+from datetime import timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from ..models import Document, StorageUsage
+from ..storage import COLD, HOT
+
+# last_accessed_at is written at most this often per document
+ACCESS_RESOLUTION = timedelta(hours=1)
+
+
+def _storage():
+    # storage.TieredStorage unless STORAGES was changed
+    return Document.file.field.storage
+
+
+def add_usage(owner_id: int, size: int, documents: int, create: bool = True) -> None:
+    """Add ``size`` bytes and ``documents`` to the owner's counters.
+
+    Without ``create`` a missing row is left alone: it is being deleted
+    together with its owner, or ``reconcile_storage --recount`` will rebuild it.
+    """
+    changes = {"bytes": F("bytes") + size, "documents": F("documents") + documents, "updated_at": timezone.now()}
+    if StorageUsage.objects.filter(owner_id=owner_id).update(**changes) or not create:
+        return
+    try:
+        with transaction.atomic():
+            StorageUsage.objects.create(owner_id=owner_id, bytes=size, documents=documents)
+    except IntegrityError:  # created concurrently
+        StorageUsage.objects.filter(owner_id=owner_id).update(**changes)
+
+
+def usage(owner_id: int) -> Dict[str, Optional[int]]:
+    row = StorageUsage.objects.filter(owner_id=owner_id).values("bytes", "documents", "quota_bytes").first()
+    row = row or {"bytes": 0, "documents": 0, "quota_bytes": None}
+    quota = row.pop("quota_bytes")
+    if quota is None:
+        quota = getattr(settings, "STORAGE_QUOTA_BYTES", 0)
+    row["quota_bytes"] = quota or None
+    return row
+
+
+def would_exceed_quota(owner_id: int, size: int) -> bool:
+    """True if storing ``size`` more bytes would take the owner past their quota."""
+    current = usage(owner_id)
+    return current["quota_bytes"] is not None and current["bytes"] + size > current["quota_bytes"]
+
+
+def _stale_access() -> Q:
+    return Q(last_accessed_at__lt=timezone.now() - ACCESS_RESOLUTION)
+
+
+def record_access(document_id: int) -> None:
+    """Refresh ``last_accessed_at``; a no-op UPDATE if it was refreshed within the hour."""
+    Document.objects.filter(_stale_access(), pk=document_id).update(last_accessed_at=timezone.now())
+
+
+async def arecord_access(document_id: int) -> None:
+    await Document.objects.filter(_stale_access(), pk=document_id).aupdate(last_accessed_at=timezone.now())
+
+
+def recount_usage() -> int:
+    """Rebuild every owner's counters from ``Document.file_size``; returns the owners updated."""
+    totals = Document.objects.values("owner_id").annotate(size=Sum("file_size"), count=Count("id"))
+    now = timezone.now()
+    seen = []
+    with transaction.atomic():
+        for row in totals.iterator():
+            StorageUsage.objects.update_or_create(
+                owner_id=row["owner_id"],
+                defaults={"bytes": row["size"] or 0, "documents": row["count"], "updated_at": now},
+            )
+            seen.append(row["owner_id"])
+        StorageUsage.objects.exclude(owner_id__in=seen).update(bytes=0, documents=0, updated_at=now)
+    return len(seen)
+
+
+def tier_candidates(days: int) -> Tuple[Iterator[Document], Iterator[Document]]:
+    """Hot documents not accessed for ``days`` days, and cold ones accessed since."""
+    cutoff = timezone.now() - timedelta(days=days)
+    fields = ("id", "owner_id", "file", "tier")
+    demote = (Document.objects.filter(tier=HOT, last_accessed_at__lt=cutoff)
+              .order_by("last_accessed_at").only(*fields))
+    promote = Document.objects.filter(tier=COLD, last_accessed_at__gte=cutoff).only(*fields)
+    return demote.iterator(chunk_size=500), promote.iterator(chunk_size=500)
+
+
+def move_document(document: Document, tier: str) -> bool:
+    """Move the document's file to ``tier`` and record it; False if the file was not found."""
+    moved = _storage().move(document.file.name, tier)
+    if moved or _storage().tier_of(document.file.name) == tier:
+        Document.objects.filter(pk=document.pk).update(tier=tier)
+        document.tier = tier
+        return True
+    return False
+
+
+def _walk_files(root: str) -> Iterator[Tuple[str, os.DirEntry]]:
+    """``(name relative to root, entry)`` of the files below ``root``/documents, depth first."""
+    stack = [os.path.join(root, "documents")]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield os.path.relpath(entry.path, root).replace(os.sep, "/"), entry
+        except FileNotFoundError:
+            continue
+
+
+def _unreferenced(batch: List[Tuple[str, os.DirEntry]], newest: float) -> Iterator[Tuple[str, str, int]]:
+    known = set(Document.objects.filter(file__in=[name for name, _ in batch]).values_list("file", flat=True))
+    for name, entry in batch:
+        if name not in known:
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime <= newest:
+                yield entry.path, name, stat.st_size
+
+
+def find_orphans(roots: List[str], batch_size: int = 1000,
+                 min_age: float = 3600) -> Iterator[Tuple[str, str, int]]:
+    """Files under ``roots`` that no document refers to, as ``(path, name, size)``.
+
+    The tree is checked in batches of ``batch_size`` names with one query each,
+    so memory does not grow with the number of files. Files modified in the
+    last ``min_age`` seconds are skipped: an upload writes its file before the
+    row is committed.
+    """
+    newest = timezone.now().timestamp() - min_age
+    for root in roots:
+        batch: List[Tuple[str, os.DirEntry]] = []
+        for item in _walk_files(root):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield from _unreferenced(batch, newest)
+                batch = []
+        if batch:
+            yield from _unreferenced(batch, newest)
+
+
+def find_missing(chunk_size: int = 1000) -> Iterator[Document]:
+    """Documents whose file is in neither tier."""
+    for document in Document.objects.only("id", "owner_id", "file").order_by("id").iterator(chunk_size=chunk_size):
+        if not document.file or _storage().tier_of(document.file.name) is None:
+            yield document
@@ -0,0 +1,123 @@
+"""Document list rows from ``.values()``: sparse fieldsets and the compact view.
+
+``DocumentDetailSerializer`` builds a model instance, nested tag and folder
+serializers and an absolute file URL per row, which dominates list latency
+at a thousand rows and more. With ``?fields=`` and/or ``?view=compact`` the
+list is instead read with ``.values()`` of just the requested columns, tags
+are fetched with one query per ``CHUNK_SIZE`` documents and the media URL
+prefix is built once. The full view produces the same values as the
+serializer; the compact one has the folder and tag ids instead of nested
+objects.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+
+from ..models import Document, Tag
+
+# DocumentDetailSerializer's fields, in its order
+FIELDS = [
+    "id",
+    "original_filename",
+    "title",
+    "author",
+    "page_count",
+    "md5",
+    "file_size",
+    "is_processed",
+    "extractor_version",
+    "created_at",
+    "updated_at",
+    "folder",
+    "tags",
+    "file_url",
+]
+VIEWS = ("full", "compact")
+DATETIME_FIELDS = ("created_at", "updated_at")
+CHUNK_SIZE = 500
+
+
+def parse(params) -> Optional[Tuple[List[str], bool]]:
+    """``(fields, compact)`` from ``fields``/``view`` query parameters; None if neither is given.
+
+    Raises ``ValueError`` for an unknown view or field.
+    """
+    spec, view = params.get("fields"), params.get("view")
+    if not spec and not view:
+        return None
+    if view and view not in VIEWS:
+        raise ValueError(f"view must be one of {', '.join(VIEWS)}")
+    if not spec:
+        return list(FIELDS), view == "compact"
+    requested = {name.strip() for name in spec.split(",") if name.strip()}
+    unknown = requested - set(FIELDS)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    return [name for name in FIELDS if name in requested], view == "compact"
+
+
+def _columns(fields: List[str], compact: bool) -> List[str]:
+    columns = ["id"]
+    for name in fields:
+        if name == "folder":
+            columns += ["folder_id"] if compact else ["folder_id", "folder__name"]
+        elif name == "file_url":
+            columns.append("file")
+        elif name not in ("id", "tags"):
+            columns.append(name)
+    return columns
+
+
+def _tags(ids: List[int], compact: bool) -> Dict[int, list]:
+    """Tags per document id, in ``Tag.Meta.ordering`` like the nested serializer."""
+    tags: Dict[int, list] = {pk: [] for pk in ids}
+    through = Document.tags.through
+    ordering = [f"tag__{name}" for name in Tag._meta.ordering]
+    for start in range(0, len(ids), CHUNK_SIZE):
+        pairs = (
+            through.objects.filter(document_id__in=ids[start:start + CHUNK_SIZE])
+            .order_by("document_id", *ordering)
+            .values_list("document_id", "tag_id", "tag__name")
+        )
+        for document_id, tag_id, name in pairs:
+            tags[document_id].append(tag_id if compact else {"id": tag_id, "name": name})
+    return tags
+
+
+def values(queryset, fields: List[str], compact: bool):
+    """``queryset`` as ``.values()`` of the columns ``render`` needs for ``fields``."""
+    return queryset.prefetch_related(None).values(*_columns(fields, compact))
+
+
+def render(rows, fields: List[str], compact: bool, request=None) -> List[Dict[str, object]]:
+    """Representations of ``values()`` rows with only ``fields``."""
+    rows = list(rows)
+    tags = _tags([row["id"] for row in rows], compact) if "tags" in fields else {}
+    datetime_field = serializers.DateTimeField()
+    url_prefix = None
+    if "file_url" in fields and request is not None:
+        url_prefix = request.build_absolute_uri(Document.file.field.storage.base_url)
+
+    out = []
+    for row in rows:
+        item = {}
+        for name in fields:
+            if name in DATETIME_FIELDS:
+                item[name] = datetime_field.to_representation(row[name])
+            elif name == "folder":
+                folder_id = row["folder_id"]
+                if compact or folder_id is None:
+                    item[name] = folder_id
+                else:
+                    item[name] = {"id": folder_id, "name": row["folder__name"]}
+            elif name == "tags":
+                item[name] = tags[row["id"]]
+            elif name == "file_url":
+                item[name] = url_prefix + filepath_to_uri(row["file"]) if url_prefix and row["file"] else None
+            else:
+                item[name] = row[name]
+        out.append(item)
+    return out
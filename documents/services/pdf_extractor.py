@@ -1,10 +1,42 @@
 from __future__ import annotations
 
 import hashlib
-from typing import Dict
+import json
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
-import pdfplumber
-from PyPDF2 import PdfReader
+# Bump whenever a change to this module can change the extracted text; stored
+# documents of an older version are then re-extracted in full.
+EXTRACTOR_VERSION = "2"
+
+# progress(pages_done, pages_total)
+ProgressCallback = Callable[[int, int], None]
+# page number -> (fingerprint, text, layout) of an earlier extraction
+PreviousPages = Dict[int, Tuple[str, str, Optional[bytes]]]
+
+
+def load():
+    """Import the PDF stack (PyPDF2, pdfplumber and pdfminer) and return ``(PdfReader, pdfplumber)``.
+
+    They are imported on first use rather than with this module, so web
+    workers and management commands that never extract do not pay for them;
+    ``run_extraction_worker`` calls this before forking.
+    """
+    import pdfplumber
+    from PyPDF2 import PdfReader
+
+    return PdfReader, pdfplumber
+
+
+@contextmanager
+def _timed(timings: Dict[str, object], stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - start)
 
 
 def _normalize_text(text: str) -> str:
@@ -15,32 +47,153 @@ def _normalize_text(text: str) -> str:
     return "\n".join(line.strip() for line in cleaned.splitlines())
 
 
-def extract_metadata_and_text(path: str) -> Dict[str, object]:
-    # Metadata via PyPDF2
-    reader = PdfReader(path)
-    info = reader.metadata or {}
-    title = (getattr(info, 'title', None) or info.get('/Title') or "") or ""
-    author = (getattr(info, 'author', None) or info.get('/Author') or "") or ""
-    page_count = len(reader.pages)
-
-    # Text via pdfplumber
-    texts: list[str] = []
-    with pdfplumber.open(path) as pdf:
-        for page in pdf.pages:
-            try:
-                txt = page.extract_text() or ""
-            except Exception:
-                txt = ""
-            if txt:
-                texts.append(txt)
-    content_text = _normalize_text("\n".join(texts))
-
-    # MD5
+def file_md5(path: str) -> str:
     md5_hash = hashlib.md5()
     with open(path, 'rb') as f:
-        for chunk in iter(lambda: f.read(8192), b''):
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
             md5_hash.update(chunk)
-    md5 = md5_hash.hexdigest()
+    return md5_hash.hexdigest()
+
+
+def page_fingerprint(page) -> str:
+    """Hash of what determines a page's text: its content stream, box and rotation.
+
+    Much cheaper than text extraction, since the content is not interpreted.
+    """
+    digest = hashlib.sha1()
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+    digest.update(repr([float(v) for v in page.mediabox]).encode())
+    digest.update(str(page.get("/Rotate", 0)).encode())
+    return digest.hexdigest()
+
+
+def page_layout(page) -> bytes:
+    """Word boxes and tables of a pdfplumber page as zlib-compressed columnar JSON.
+
+    ``{"width", "height", "words": {"text": [...], "x0": [...], "top": [...],
+    "x1": [...], "bottom": [...]}, "tables": [[[cell, ...], ...], ...]}``, with
+    coordinates in PDF points from the top-left corner, rounded to 0.01.
+    Words and tables reuse the characters pdfplumber already parsed for the
+    page text.
+    """
+    words = page.extract_words()
+    columns = {"text": [word["text"] for word in words]}
+    for key in ("x0", "top", "x1", "bottom"):
+        columns[key] = [round(float(word[key]), 2) for word in words]
+    try:
+        tables = page.extract_tables()
+    except Exception:
+        tables = []
+    layout = {
+        "width": round(float(page.width), 2),
+        "height": round(float(page.height), 2),
+        "words": columns,
+        "tables": tables,
+    }
+    return zlib.compress(json.dumps(layout, ensure_ascii=False, separators=(",", ":")).encode())
+
+
+def extract_metadata_and_text(
+    path: str,
+    progress: Optional[ProgressCallback] = None,
+    timings: Optional[Dict[str, object]] = None,
+    previous_pages: Optional[PreviousPages] = None,
+    md5: Optional[str] = None,
+    structured: bool = False,
+) -> Dict[str, object]:
+    """Extract metadata, text and md5 from the PDF at ``path``.
+
+    ``progress`` is called after every page with ``(pages_done, pages_total)``.
+    When ``timings`` is given it is filled with seconds spent per stage
+    (``open``, ``metadata``, ``fingerprint``, ``text``, ``normalize``,
+    ``hash``) and a ``page_seconds`` list with the text extraction time of each
+    extracted page.
+
+    Pages whose fingerprint matches ``previous_pages`` reuse the earlier text
+    instead of being extracted again. The result's ``pages`` lists
+    ``(fingerprint, text, layout)`` per page and ``pages_reused`` how many were
+    reused. ``md5`` may be passed when the caller already hashed the file.
+
+    With ``structured`` the layout of every extracted page is captured from
+    the same parse (see ``page_layout``, timed as ``layout``); otherwise it is
+    None.
+    """
+    timings = {} if timings is None else timings
+    page_seconds: list[float] = []
+    timings["page_seconds"] = page_seconds
+    PdfReader, pdfplumber = load()
+
+    # Metadata via PyPDF2
+    with _timed(timings, "open"):
+        reader = PdfReader(path)
+    with _timed(timings, "metadata"):
+        info = reader.metadata or {}
+        title = (getattr(info, 'title', None) or info.get('/Title') or "") or ""
+        author = (getattr(info, 'author', None) or info.get('/Author') or "") or ""
+        page_count = len(reader.pages)
+    previous_pages = previous_pages or {}
+    with _timed(timings, "fingerprint"):
+        fingerprints = [page_fingerprint(page) for page in reader.pages]
+    changed = [
+        number for number, fingerprint in enumerate(fingerprints, start=1)
+        if previous_pages.get(number, (None,))[0] != fingerprint
+    ]
+    if progress:
+        progress(0, page_count)
+
+    # Text via pdfplumber, only for new or changed pages
+    unchanged = set(range(1, page_count + 1)).difference(changed)
+    texts: List[str] = [
+        previous_pages[number][1] if number in unchanged else ""
+        for number in range(1, page_count + 1)
+    ]
+    layouts: List[Optional[bytes]] = [
+        previous_pages[number][2] if structured and number in unchanged else None
+        for number in range(1, page_count + 1)
+    ]
+    timings.setdefault("text", 0.0)
+    if structured:
+        timings.setdefault("layout", 0.0)
+    done = page_count - len(changed)
+    if changed:
+        with _timed(timings, "open"):
+            pdf = pdfplumber.open(path)
+        with pdf:
+            for number in changed:
+                page_start = time.perf_counter()
+                page = pdf.pages[number - 1]
+                try:
+                    txt = page.extract_text() or ""
+                except Exception:
+                    txt = ""
+                elapsed = time.perf_counter() - page_start
+                # Only extraction counts; progress() writes to the database
+                timings["text"] += elapsed
+                if structured:
+                    layout_start = time.perf_counter()
+                    try:
+                        layouts[number - 1] = page_layout(page)
+                    except Exception:
+                        layouts[number - 1] = None
+                    layout_elapsed = time.perf_counter() - layout_start
+                    timings["layout"] += layout_elapsed
+                    elapsed += layout_elapsed
+                page_seconds.append(elapsed)
+                texts[number - 1] = txt
+                done += 1
+                if progress:
+                    progress(done, page_count)
+    elif progress and page_count:
+        progress(page_count, page_count)
+    with _timed(timings, "normalize"):
+        content_text = _normalize_text("\n".join(text for text in texts if text))
+
+    # MD5
+    if md5 is None:
+        with _timed(timings, "hash"):
+            md5 = file_md5(path)
 
     return {
         "title": title or "",
@@ -48,6 +201,6 @@ def extract_metadata_and_text(path: str) -> Dict[str, object]:
         "page_count": page_count,
         "content_text": content_text,
         "md5": md5,
+        "pages": list(zip(fingerprints, texts, layouts)),
+        "pages_reused": page_count - len(changed),
     }
-
-
@@ -0,0 +1,267 @@
+"""Page preview rendering with a content-addressed on-disk cache.
+
+Previews are JPEGs of one page at one of ``PREVIEW_WIDTHS``. The file name is
+derived from the document's md5, the page, the width and ``RENDERER_VERSION``,
+so a preview never needs invalidation: replaced files get a new md5 and stale
+previews simply age out of the cache, which is kept under
+``PREVIEW_CACHE_MAX_BYTES`` by deleting the least recently used files.
+
+Rendering (pdfium) runs in a spawn-context process pool of ``PREVIEW_WORKERS``
+processes; with 0 workers it runs inline. The pool is rebuilt when it breaks
+(a worker crashed) or the setting changes, and shut down at interpreter exit.
+"""
+from __future__ import annotations
+
+import atexit
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+RENDERER_VERSION = "1"
+PREVIEW_WIDTHS = (128, 256, 512, 1024)
+DEFAULT_WIDTH = 256
+# Tall pages are bounded too: height never exceeds this multiple of the width
+MAX_ASPECT = 4
+JPEG_QUALITY = 80
+RENDER_TIMEOUT = 30
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_in_flight: Dict[str, Future] = {}
+_lock = threading.Lock()
+_bytes_since_eviction = 0
+
+
+class RenderError(Exception):
+    """The page could not be rendered, e.g. because the PDF is corrupt."""
+
+
+def bucket_width(requested: Optional[int]) -> int:
+    """Smallest supported width >= ``requested`` (the largest one if none is)."""
+    if not requested:
+        return DEFAULT_WIDTH
+    for width in PREVIEW_WIDTHS:
+        if width >= requested:
+            return width
+    return PREVIEW_WIDTHS[-1]
+
+
+def preview_root() -> Path:
+    return Path(getattr(settings, "PREVIEW_ROOT", Path(settings.MEDIA_ROOT) / "previews"))
+
+
+def preview_key(file_hash: str, page: int, width: int) -> str:
+    return hashlib.sha256(f"{RENDERER_VERSION}:{file_hash}:{page}:{width}".encode()).hexdigest()
+
+
+def preview_path(key: str) -> Path:
+    return preview_root() / key[:2] / f"{key}.jpg"
+
+
+def _file_md5(path: str) -> str:
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def render_to_file(source: str, page: int, width: int, target: str) -> int:
+    """Render ``page`` (1-based) of ``source`` as a ``width`` px wide JPEG at ``target``.
+
+    Runs in the worker processes; returns the number of bytes written.
+    """
+    import pypdfium2 as pdfium
+
+    try:
+        pdf = pdfium.PdfDocument(source)
+    except pdfium.PdfiumError as exc:
+        # pdfium exceptions do not survive pickling back from the worker reliably
+        raise RenderError(str(exc)) from None
+    try:
+        if not 1 <= page <= len(pdf):
+            raise IndexError(f"page {page} out of range 1..{len(pdf)}")
+        pdf_page = pdf[page - 1]
+        page_width, page_height = pdf_page.get_size()
+        scale = min(width / page_width, MAX_ASPECT * width / page_height)
+        try:
+            image = pdf_page.render(scale=scale).to_pil()
+        except pdfium.PdfiumError as exc:
+            raise RenderError(str(exc)) from None
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        partial = f"{target}.{os.getpid()}.part"
+        image.save(partial, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        os.replace(partial, target)
+        return os.path.getsize(target)
+    finally:
+        pdf.close()
+
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor, _executor_workers
+    workers = getattr(settings, "PREVIEW_WORKERS", 0)
+    with _lock:
+        if _executor is not None and _executor_workers != workers:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+        if workers > 0 and _executor is None:
+            # spawn, not fork: forking a threaded server process can copy held locks
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _executor_workers = workers
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next render starts a fresh one."""
+    global _executor
+    with _lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown() -> None:
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _submit(source: str, page: int, width: int, key: str) -> Future:
+    """Start (or join) the render of ``key``; concurrent requests share one render."""
+    with _lock:
+        future = _in_flight.get(key)
+        if future is not None:
+            return future
+    target = str(preview_path(key))
+    executor = _get_executor()
+    if executor is None:
+        future = Future()
+        try:
+            future.set_result(render_to_file(source, page, width, target))
+        except Exception as exc:
+            future.set_exception(exc)
+        _after_render(future)
+        return future
+    try:
+        submitted = executor.submit(render_to_file, source, page, width, target)
+    except BrokenProcessPool:
+        _discard_executor(executor)
+        executor = _get_executor()
+        submitted = executor.submit(render_to_file, source, page, width, target)
+    with _lock:
+        future = _in_flight.setdefault(key, submitted)
+    if future is submitted:
+        # Registered outside the lock: a future that is already done runs the
+        # callback right here, and _forget takes the lock itself.
+        future.add_done_callback(lambda done: _forget(key, done, executor))
+    else:
+        submitted.cancel()
+    return future
+
+
+def _forget(key: str, future: Future, executor: ProcessPoolExecutor) -> None:
+    with _lock:
+        if _in_flight.get(key) is future:
+            del _in_flight[key]
+    if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+        _discard_executor(executor)
+    _after_render(future)
+
+
+def _after_render(future: Future) -> None:
+    global _bytes_since_eviction
+    if future.cancelled() or future.exception() is not None:
+        return
+    budget = getattr(settings, "PREVIEW_CACHE_MAX_BYTES", 1024 ** 3)
+    with _lock:
+        _bytes_since_eviction += future.result()
+        due = _bytes_since_eviction > budget // 10
+        if due:
+            _bytes_since_eviction = 0
+    if due:
+        evict(budget)
+
+
+def document_hash(document) -> str:
+    """The document's md5, computed and stored once if extraction has not set it yet."""
+    if not document.md5:
+        document.md5 = _file_md5(document.file.path)
+        document.save(update_fields=["md5"])
+    return document.md5
+
+
+def document_preview_key(document, page: int, width: int) -> str:
+    """Cache key of a page preview; raises IndexError for pages outside the document."""
+    if document.page_count is not None and not 1 <= page <= document.page_count:
+        raise IndexError(f"page {page} out of range 1..{document.page_count}")
+    return preview_key(document_hash(document), page, width)
+
+
+def get_preview(document, page: int, width: int) -> Path:
+    """Path of the cached preview, rendering it first if needed.
+
+    Raises IndexError for pages outside the document, RenderError when pdfium
+    cannot render the file and TimeoutError after ``RENDER_TIMEOUT`` seconds.
+    """
+    key = document_preview_key(document, page, width)
+    path = preview_path(key)
+    if path.exists():
+        # mtime doubles as "last used" for eviction
+        os.utime(path)
+        return path
+    _submit(document.file.path, page, width, key).result(timeout=RENDER_TIMEOUT)
+    return path
+
+
+def pregenerate(document) -> None:
+    """Queue the first-page preview of a freshly extracted document."""
+    try:
+        key = preview_key(document.md5, 1, DEFAULT_WIDTH)
+        if not preview_path(key).exists():
+            _submit(document.file.path, 1, DEFAULT_WIDTH, key)
+    except Exception:
+        logger.exception("Could not queue preview for document %s", document.pk)
+
+
+def evict(max_bytes: int) -> int:
+    """Delete least recently used previews until the cache fits ``max_bytes``.
+
+    Returns the number of files removed.
+    """
+    entries = []
+    total = 0
+    for directory in preview_root().glob("*"):
+        if not directory.is_dir():
+            continue
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.endswith(".jpg"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
@@ -0,0 +1,156 @@
+"""Near-duplicate detection: MinHash signatures of extracted text plus an LSH index.
+
+A document's ``content_text`` is lowercased, split into words and shingled
+into overlapping ``SHINGLE_SIZE``-word windows. Its MinHash signature holds
+the minimum of ``NUM_PERM`` random hash functions over the shingle hashes;
+the share of equal positions of two signatures estimates the Jaccard
+similarity of their shingle sets. Both steps run as NumPy array operations,
+so a long document costs a handful of vectorized passes, not a Python loop
+per shingle.
+
+For lookups the signature is cut into ``BANDS`` bands of ``ROWS`` values and
+every band is hashed into a bucket row (``DocumentLSHBand``). Candidates for
+"similar to X" are the documents sharing at least one bucket with X, an
+indexed lookup whose cost depends on the number of near matches rather than
+on the number of documents; they are then ranked by estimated similarity.
+With 16 bands of 8 rows, pairs above ~0.7 similarity are almost always found
+and pairs below ~0.4 rarely become candidates.
+
+NumPy is optional: without it no signatures are computed and
+``similar_documents`` raises ``RuntimeError``.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import zlib
+from typing import List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+
+from ..models import Document, DocumentLSHBand
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - optional dependency
+    numpy = None
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Largest prime below 2**32: hash values and signatures fit in uint32
+PRIME = 4294967291
+# Shingles hashed per block; bounds the (block x NUM_PERM) intermediate array
+BLOCK = 4096
+SEED = 20240501
+
+_WORD = re.compile(r"\w+")
+_coefficients = None
+
+
+def _permutations():
+    global _coefficients
+    if _coefficients is None:
+        rng = numpy.random.default_rng(SEED)
+        # a, b < 2**31 and x < 2**32 keep a * x + b below 2**64
+        a = rng.integers(1, 2 ** 31, size=NUM_PERM, dtype=numpy.uint64)
+        b = rng.integers(0, 2 ** 31, size=NUM_PERM, dtype=numpy.uint64)
+        _coefficients = (a, b)
+    return _coefficients
+
+
+def shingle_hashes(text: str):
+    """Unique 32-bit hashes of the ``SHINGLE_SIZE``-word shingles of ``text``."""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return numpy.empty(0, dtype=numpy.uint64)
+    vocabulary = {}
+    ids = numpy.fromiter(
+        (vocabulary.setdefault(word, zlib.crc32(word.encode())) for word in words),
+        dtype=numpy.uint64,
+        count=len(words),
+    )
+    width = min(SHINGLE_SIZE, len(ids))
+    count = len(ids) - width + 1
+    hashes = numpy.zeros(count, dtype=numpy.uint64)
+    for offset in range(width):
+        hashes = (hashes * numpy.uint64(1000003) + ids[offset:offset + count]) & numpy.uint64(0xFFFFFFFF)
+    return numpy.unique(hashes)
+
+
+def signature(text: str) -> Optional[bytes]:
+    """MinHash signature of ``text`` as ``NUM_PERM`` little-endian uint32, or None without words."""
+    hashes = shingle_hashes(text)
+    if not len(hashes):
+        return None
+    a, b = _permutations()
+    minimum = numpy.full(NUM_PERM, PRIME, dtype=numpy.uint64)
+    for start in range(0, len(hashes), BLOCK):
+        block = hashes[start:start + BLOCK, None]
+        values = (block * a + b) % numpy.uint64(PRIME)
+        numpy.minimum(minimum, values.min(axis=0), out=minimum)
+    return minimum.astype("<u4").tobytes()
+
+
+def band_buckets(sig: bytes) -> List[Tuple[int, int]]:
+    """``(band, bucket)`` pairs of a signature; buckets are signed 64-bit hashes."""
+    size = ROWS * 4
+    return [
+        (band, int.from_bytes(hashlib.blake2b(sig[band * size:(band + 1) * size], digest_size=8).digest(),
+                              "big", signed=True))
+        for band in range(BANDS)
+    ]
+
+
+def estimate(sig_a: bytes, sig_b: bytes) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    a = numpy.frombuffer(sig_a, dtype="<u4")
+    b = numpy.frombuffer(sig_b, dtype="<u4")
+    return float(numpy.count_nonzero(a == b)) / NUM_PERM
+
+
+def store_signature(document: Document, sig: Optional[bytes]) -> None:
+    """Save ``sig`` on ``document`` and replace its LSH bucket rows."""
+    with transaction.atomic():
+        Document.objects.filter(pk=document.pk).update(minhash=sig)
+        document.minhash = sig
+        DocumentLSHBand.objects.filter(document=document).delete()
+        if sig is not None:
+            DocumentLSHBand.objects.bulk_create([
+                DocumentLSHBand(owner_id=document.owner_id, document=document, band=band, bucket=bucket)
+                for band, bucket in band_buckets(sig)
+            ])
+
+
+def index_document(document: Document) -> None:
+    """(Re)compute the signature and LSH buckets of ``document`` from its text."""
+    if numpy is None:
+        return
+    store_signature(document, signature(document.content_text or ""))
+
+
+def similar_documents(document: Document, threshold: float = 0.5, limit: int = 20) -> List[Tuple[int, float]]:
+    """``(document_id, similarity)`` of the owner's documents similar to ``document``, best first."""
+    if numpy is None:
+        raise RuntimeError("numpy is not installed")
+    if not document.minhash:
+        return []
+    sig = bytes(document.minhash)
+    buckets = Q()
+    for band, bucket in band_buckets(sig):
+        buckets |= Q(band=band, bucket=bucket)
+    candidate_ids = (
+        DocumentLSHBand.objects.filter(buckets, owner_id=document.owner_id)
+        .exclude(document_id=document.pk)
+        .values("document_id")
+    )
+    scored = []
+    for pk, minhash in Document.objects.filter(pk__in=candidate_ids).values_list("pk", "minhash"):
+        if minhash:
+            similarity = estimate(sig, bytes(minhash))
+            if similarity >= threshold:
+                scored.append((pk, similarity))
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return scored[:limit]
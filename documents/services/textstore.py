@@ -0,0 +1,159 @@
+"""Compressed storage of extracted text, and the word index used to search it.
+
+Document and page texts are stored as blobs whose first byte names the codec:
+
+* ``0``: UTF-8 as is (empty or very short texts)
+* ``1``: zlib
+* ``2``: zstd
+* ``3``: zstd with a trained dictionary; the next 4 bytes are the
+  ``CompressionDictionary`` id (big-endian)
+
+so blobs written with any setting stay readable after ``TEXT_COMPRESSION``
+changes or a new dictionary is trained. New blobs use ``TEXT_COMPRESSION``
+(``zstd`` or ``zlib``); zstd needs the optional ``zstandard`` package and
+falls back to zlib without it. When a dictionary has been trained
+(``manage.py train_text_dictionary``) zstd blobs use the newest one, which
+mostly helps short texts such as single pages.
+
+Since compressed text cannot be matched with ``LIKE``, ``search_terms``
+builds the separate search column: the distinct lowercased words of the
+text, which is what ``q=`` matches against.
+"""
+from __future__ import annotations
+
+import re
+import struct
+import time
+import zlib
+from typing import Dict, Optional
+
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+RAW, ZLIB, ZSTD, ZSTD_DICT = 0, 1, 2, 3
+# Shorter texts are stored raw: a compressed frame would not be smaller
+MIN_COMPRESS_BYTES = 64
+# How long a process keeps using the newest dictionary before looking again
+DICTIONARY_REFRESH_SECONDS = 60
+
+_WORD = re.compile(r"\w+")
+_dictionaries: Dict[int, "zstandard.ZstdCompressionDict"] = {}
+_current = {"id": None, "checked": 0.0}
+
+
+def codec() -> str:
+    name = getattr(settings, "TEXT_COMPRESSION", "zstd")
+    if name == "zstd" and zstandard is None:
+        return "zlib"
+    return name
+
+
+def _dictionary(dictionary_id: int):
+    if dictionary_id not in _dictionaries:
+        from ..models import CompressionDictionary
+
+        data = CompressionDictionary.objects.values_list("data", flat=True).get(pk=dictionary_id)
+        _dictionaries[dictionary_id] = zstandard.ZstdCompressionDict(bytes(data))
+    return _dictionaries[dictionary_id]
+
+
+def current_dictionary_id() -> Optional[int]:
+    """Id of the newest trained dictionary, re-read every ``DICTIONARY_REFRESH_SECONDS``."""
+    now = time.monotonic()
+    if now - _current["checked"] >= DICTIONARY_REFRESH_SECONDS:
+        from ..models import CompressionDictionary
+
+        _current["id"] = CompressionDictionary.objects.order_by("-id").values_list("id", flat=True).first()
+        _current["checked"] = now
+    return _current["id"]
+
+
+def reset() -> None:
+    """Forget cached dictionaries (after training one, and in tests)."""
+    _dictionaries.clear()
+    _current.update(id=None, checked=0.0)
+
+
+def compress(text: str, method: Optional[str] = None, dictionary_id: Optional[int] = None) -> bytes:
+    """Blob for ``text`` using ``method`` (default: ``TEXT_COMPRESSION``).
+
+    With zstd, ``dictionary_id`` defaults to the newest trained dictionary;
+    pass 0 to compress without one.
+    """
+    data = text.encode()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return bytes([RAW]) + data
+    method = method or codec()
+    level = getattr(settings, "TEXT_COMPRESSION_LEVEL", None)
+    if method == "zlib":
+        return bytes([ZLIB]) + zlib.compress(data, 6 if level is None else level)
+    if method != "zstd":
+        raise ValueError(f"unknown text compression {method!r}")
+    if zstandard is None:
+        raise RuntimeError("zstandard is not installed")
+    level = 9 if level is None else level
+    if dictionary_id is None:
+        dictionary_id = current_dictionary_id()
+    if dictionary_id:
+        compressor = zstandard.ZstdCompressor(level=level, dict_data=_dictionary(dictionary_id))
+        return bytes([ZSTD_DICT]) + struct.pack(">I", dictionary_id) + compressor.compress(data)
+    return bytes([ZSTD]) + zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def decompress(blob) -> str:
+    if not blob:
+        return ""
+    blob = bytes(blob)
+    kind = blob[0]
+    if kind == RAW:
+        return blob[1:].decode()
+    if kind == ZLIB:
+        return zlib.decompress(blob[1:]).decode()
+    if zstandard is None:
+        raise RuntimeError("zstandard is not installed")
+    if kind == ZSTD:
+        return zstandard.ZstdDecompressor().decompress(blob[1:]).decode()
+    if kind == ZSTD_DICT:
+        (dictionary_id,) = struct.unpack(">I", blob[1:5])
+        return zstandard.ZstdDecompressor(dict_data=_dictionary(dictionary_id)).decompress(blob[5:]).decode()
+    raise ValueError(f"unknown text blob type {kind}")
+
+
+def search_terms(text: str) -> str:
+    """Distinct lowercased words of ``text``, space separated, in first-seen order."""
+    return " ".join(dict.fromkeys(word.lower() for word in _WORD.findall(text)))
+
+
+def compressed_text(blob_field: str, search_field: Optional[str] = None) -> property:
+    """Model property for a text stored compressed in ``blob_field``.
+
+    Reading decompresses on first access and caches the result on the
+    instance until the blob changes; assigning compresses right away and, with
+    ``search_field``, refreshes the search terms too. Rows loaded for listings
+    never pay for decompression, and querysets can ``defer()`` the blob.
+    A property (not a custom descriptor) so that model constructors accept it
+    as a keyword argument.
+    """
+    cache_attr = f"_{blob_field}_text"
+
+    def get(instance) -> str:
+        blob = getattr(instance, blob_field)
+        cached = instance.__dict__.get(cache_attr)
+        if cached is None or cached[0] is not blob:
+            cached = (blob, decompress(blob))
+            instance.__dict__[cache_attr] = cached
+        return cached[1]
+
+    def set(instance, value: str) -> None:
+        value = value or ""
+        blob = compress(value)
+        setattr(instance, blob_field, blob)
+        instance.__dict__[cache_attr] = (blob, value)
+        if search_field:
+            setattr(instance, search_field, search_terms(value))
+
+    return property(get, set)
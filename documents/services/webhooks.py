@@ -0,0 +1,219 @@
+"""Webhook notifications through a transactional outbox.
+
+``record`` writes one ``OutboxEvent`` per active endpoint of the owner and
+must be called inside the transaction that makes the event true (jobs call
+it together with the final job status update), so an event exists exactly
+when its cause was committed. ``Dispatcher`` (``manage.py dispatch_webhooks``)
+delivers due events:
+
+* per endpoint, up to ``WEBHOOK_BATCH_SIZE`` events in one POST of
+  ``{"events": [{"id", "type", "created_at", "data"}, ...]}``;
+* signed: ``X-Pdfvault-Timestamp: <unix seconds>`` and
+  ``X-Pdfvault-Signature: sha256=<hex>``, the HMAC-SHA256 of
+  ``"<timestamp>." + body`` keyed with the endpoint's secret;
+* over kept-alive ``http.client`` connections, one per host;
+* any 2xx marks the batch delivered; otherwise it is retried with
+  exponential backoff (``backoff``) and given up after
+  ``WEBHOOK_MAX_ATTEMPTS`` attempts.
+
+Delivery is at least once: a receiver can see an event twice (e.g. when the
+response is lost) and should drop repeated ``id``s. Rows are claimed with a
+lease token in a conditional UPDATE, so several dispatchers may run.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import http.client
+import json
+import logging
+import random
+import time
+import uuid
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import ExtractionJob, OutboxEvent, WebhookEndpoint
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_SUCCEEDED = "extraction.succeeded"
+EXTRACTION_FAILED = "extraction.failed"
+# How long a dispatcher owns claimed rows before another may retry them
+LEASE = timedelta(minutes=5)
+MAX_BACKOFF = 6 * 3600
+USER_AGENT = "pdfvault-webhooks/1"
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def record(owner_id: int, event_type: str, data: Dict[str, object]) -> int:
+    """Queue ``event_type`` for every active endpoint of the owner; returns the rows written."""
+    endpoints = list(WebhookEndpoint.objects.filter(owner_id=owner_id, is_active=True).values_list("pk", flat=True))
+    if not endpoints:
+        return 0
+    event_id = uuid.uuid4()
+    payload = json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(endpoint_id=pk, event_id=event_id, event_type=event_type, payload=payload)
+        for pk in endpoints
+    ])
+    return len(endpoints)
+
+
+def record_job(job: ExtractionJob) -> int:
+    """``record`` the outcome of a finished extraction job."""
+    succeeded = job.status == ExtractionJob.Status.SUCCESS
+    document = job.document
+    data = {
+        "job": job.pk,
+        "document": document.pk,
+        "status": job.status,
+        "finished_at": job.finished_at,
+        "page_count": document.page_count if succeeded else None,
+        "error": None if succeeded else job.error_message,
+    }
+    return record(document.owner_id, EXTRACTION_SUCCEEDED if succeeded else EXTRACTION_FAILED, data)
+
+
+def sign(secret: str, timestamp: int, body: bytes) -> str:
+    return hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+
+
+def backoff(attempts: int) -> float:
+    """Seconds before the next attempt after ``attempts`` failed ones: 10 s doubling, capped, with jitter."""
+    return min(MAX_BACKOFF, 10 * 2 ** (attempts - 1)) * random.uniform(0.8, 1.0)
+
+
+def _message(event: OutboxEvent) -> Dict[str, object]:
+    return {
+        "id": str(event.event_id),
+        "type": event.event_type,
+        "created_at": event.created_at.isoformat(),
+        "data": event.payload,
+    }
+
+
+class Dispatcher:
+    """Delivers due outbox events; keeps one HTTP connection per (scheme, host, port) open between calls."""
+
+    def __init__(self, batch_size: Optional[int] = None, timeout: Optional[float] = None,
+                 max_attempts: Optional[int] = None):
+        self.batch_size = batch_size or _setting("WEBHOOK_BATCH_SIZE", 100)
+        self.timeout = timeout or _setting("WEBHOOK_TIMEOUT", 10)
+        self.max_attempts = max_attempts or _setting("WEBHOOK_MAX_ATTEMPTS", 8)
+        self._connections: Dict[Tuple[str, str, int], http.client.HTTPConnection] = {}
+
+    def close(self) -> None:
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+
+    def _connection(self, scheme: str, host: str, port: Optional[int]) -> http.client.HTTPConnection:
+        key = (scheme, host, port or (443 if scheme == "https" else 80))
+        connection = self._connections.get(key)
+        if connection is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            connection = self._connections[key] = cls(host, key[2], timeout=self.timeout)
+        return connection
+
+    def post(self, url: str, body: bytes, headers: Dict[str, str]) -> int:
+        """POST ``body`` to ``url`` on a pooled connection and return the status code."""
+        parts = urlsplit(url)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        connection = self._connection(parts.scheme, parts.hostname, parts.port)
+        try:
+            return self._request(connection, path, body, headers)
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            # The server dropped the idle keep-alive connection; once more on a new one
+            return self._request(connection, path, body, headers)
+
+    @staticmethod
+    def _request(connection: http.client.HTTPConnection, path: str, body: bytes, headers: Dict[str, str]) -> int:
+        try:
+            connection.request("POST", path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except Exception:
+            # http.client reconnects on the next request
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        return response.status
+
+    def claim(self, now=None) -> List[OutboxEvent]:
+        """Lease up to ``batch_size`` due events of one endpoint; empty when nothing is due."""
+        now = now or timezone.now()
+        due = OutboxEvent.objects.filter(status=OutboxEvent.Status.PENDING, next_attempt_at__lte=now)
+        while True:
+            endpoint_id = due.order_by("next_attempt_at", "id").values_list("endpoint_id", flat=True).first()
+            if endpoint_id is None:
+                return []
+            ids = list(
+                due.filter(endpoint_id=endpoint_id).order_by("id").values_list("pk", flat=True)[:self.batch_size]
+            )
+            lease = uuid.uuid4()
+            # Rows another dispatcher leased meanwhile are no longer due and are skipped
+            if due.filter(pk__in=ids).update(lease=lease, next_attempt_at=now + LEASE):
+                return list(OutboxEvent.objects.filter(lease=lease).select_related("endpoint").order_by("id"))
+
+    def deliver(self, events: List[OutboxEvent]) -> bool:
+        """Send ``events`` (of one endpoint) in one request and record the outcome."""
+        endpoint = events[0].endpoint
+        ids = [event.pk for event in events]
+        rows = OutboxEvent.objects.filter(pk__in=ids, lease=events[0].lease)
+        if not endpoint.is_active:
+            rows.update(status=OutboxEvent.Status.FAILED, lease=None, last_error="endpoint disabled")
+            return False
+        body = json.dumps({"events": [_message(event) for event in events]}, separators=(",", ":")).encode()
+        timestamp = int(time.time())
+        headers = {
+            "Content-Type": "application/json",
+            "User-Agent": USER_AGENT,
+            "X-Pdfvault-Timestamp": str(timestamp),
+            "X-Pdfvault-Signature": f"sha256={sign(endpoint.secret, timestamp, body)}",
+        }
+        try:
+            status = self.post(endpoint.url, body, headers)
+            error = "" if 200 <= status < 300 else f"HTTP {status}"
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+        now = timezone.now()
+        if not error:
+            rows.update(status=OutboxEvent.Status.DELIVERED, delivered_at=now, lease=None,
+                        attempts=F("attempts") + 1, last_error="")
+            return True
+        attempts = max(event.attempts for event in events) + 1
+        logger.warning("Webhook delivery to %s failed (attempt %d): %s", endpoint.url, attempts, error)
+        if attempts >= self.max_attempts:
+            rows.update(status=OutboxEvent.Status.FAILED, lease=None, attempts=F("attempts") + 1, last_error=error)
+        else:
+            rows.update(lease=None, attempts=F("attempts") + 1, last_error=error,
+                        next_attempt_at=now + timedelta(seconds=backoff(attempts)))
+        return False
+
+    def run_once(self) -> int:
+        """Deliver every event that is due now; returns the number of requests made."""
+        requests = 0
+        while True:
+            events = self.claim()
+            if not events:
+                return requests
+            self.deliver(events)
+            requests += 1
+
+
+def purge(days: int) -> int:
+    """Delete delivered events older than ``days`` days; returns the rows deleted."""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboxEvent.objects.filter(status=OutboxEvent.Status.DELIVERED, delivered_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,139 @@
+"""Extraction worker for queued jobs (``async=true`` extracts).
+
+``work`` claims the oldest QUEUED job with a conditional UPDATE (``status``
+still QUEUED), so any number of workers, in any number of processes or
+hosts, can poll the same table without running a job twice, and runs it.
+
+``serve`` is the preforking mode of ``manage.py run_extraction_worker``: the
+parent imports the PDF stack once, freezes the garbage collector's view of
+everything loaded so far and forks the children, which share those pages
+copy-on-write instead of each importing (and holding) its own copy. Dead
+children are replaced; SIGTERM/SIGINT stop the children after their current
+job.
+"""
+from __future__ import annotations
+
+import gc
+import logging
+import os
+import signal
+import time
+from typing import Callable, Dict, Optional
+
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+from ..models import ExtractionJob
+from . import pdf_extractor
+from .jobs import run_extraction
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0
+# Seconds a child must stay up for its exit not to count as a crash loop
+MIN_CHILD_LIFETIME = 5.0
+
+
+def claim_job() -> Optional[ExtractionJob]:
+    """Mark the oldest QUEUED job RUNNING and return it; None if the queue is empty."""
+    queued = ExtractionJob.objects.filter(status=ExtractionJob.Status.QUEUED)
+    while True:
+        pk = queued.order_by("created_at", "id").values_list("pk", flat=True).first()
+        if pk is None:
+            return None
+        claimed = queued.filter(pk=pk).update(status=ExtractionJob.Status.RUNNING, started_at=timezone.now())
+        if claimed:
+            return ExtractionJob.objects.select_related("document").get(pk=pk)
+        # Another worker took it first
+
+
+def work(should_stop: Callable[[], bool] = lambda: False, drain: bool = False,
+         poll_interval: float = POLL_INTERVAL) -> int:
+    """Run queued jobs until ``should_stop()``, or the queue is empty with ``drain``; returns the jobs run."""
+    done = 0
+    while not should_stop():
+        job = claim_job()
+        if job is None:
+            if drain:
+                break
+            time.sleep(poll_interval)
+            continue
+        try:
+            run_extraction(job)
+        except Exception:
+            # run_extraction has already marked the job FAILED
+            logger.exception("Extraction job %s failed", job.pk)
+        done += 1
+    return done
+
+
+def _child(poll_interval: float) -> None:
+    stopping = []
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: stopping.append(True))
+
+    def should_stop() -> bool:
+        # Long-lived process: drop connections that errored or passed CONN_MAX_AGE
+        close_old_connections()
+        return bool(stopping)
+
+    status = 0
+    try:
+        work(should_stop, poll_interval=poll_interval)
+    except BaseException:
+        logger.exception("Extraction worker %s crashed", os.getpid())
+        status = 1
+    finally:
+        connections.close_all()
+        os._exit(status)
+
+
+def _signal(pid: int, signum: int) -> None:
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def serve(workers: int, poll_interval: float = POLL_INTERVAL) -> None:
+    """Preload the PDF stack, fork ``workers`` children running ``work`` and keep them running."""
+    pdf_extractor.load()
+    # Children must open their own database connections
+    connections.close_all()
+    # Objects loaded so far are never collected, so the children's collector
+    # does not write to (and un-share) their pages
+    gc.freeze()
+
+    children: Dict[int, float] = {}
+    stopping = []
+
+    def shutdown(signum, frame) -> None:
+        stopping.append(True)
+        for pid in list(children):
+            _signal(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            _child(poll_interval)
+        children[pid] = time.monotonic()
+
+    for _ in range(workers):
+        spawn()
+    logger.info("Started %d extraction workers: %s", workers, ", ".join(map(str, children)))
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        logger.warning("Extraction worker %s exited with status %s; restarting",
+                       pid, os.waitstatus_to_exitcode(status))
+        if time.monotonic() - started < MIN_CHILD_LIFETIME:
+            time.sleep(MIN_CHILD_LIFETIME)
+        spawn()
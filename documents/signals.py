@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token, invalidate_user
+from .caching import bump_owner_version
+from .models import Document, Folder, Tag
+from .services import lifecycle
+
+
+@receiver(post_delete, sender=Token)
+def drop_cached_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def drop_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+@receiver(post_save, sender=Folder)
+@receiver(post_delete, sender=Folder)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_owner_responses(sender, instance, **kwargs):
+    bump_owner_version(instance.owner_id)
+
+
+@receiver(m2m_changed, sender=Document.tags.through)
+def invalidate_owner_responses_on_tagging(sender, instance, **kwargs):
+    if kwargs["action"] in ("post_add", "post_remove", "post_clear"):
+        # instance is a Document, or a Tag when changed from the reverse side
+        bump_owner_version(instance.owner_id)
+
+
+@receiver(post_save, sender=Document)
+def count_stored_file(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        lifecycle.add_usage(instance.owner_id, instance.file_size, 1)
+
+
+@receiver(post_delete, sender=Document)
+def delete_stored_file(sender, instance, **kwargs):
+    lifecycle.add_usage(instance.owner_id, -instance.file_size, -1, create=False)
+    if instance.file:
+        # Only once the row is really gone; a rolled back delete keeps its file
+        name, storage = instance.file.name, instance.file.storage
+        transaction.on_commit(lambda: storage.delete(name))
@@ -0,0 +1,90 @@
+"""Media storage with a cold tier.
+
+``TieredStorage`` is the default file storage. Files are written under
+``MEDIA_ROOT`` (the hot tier); ``manage.py tier_storage`` moves files of
+documents nobody has accessed for a while to the same relative name under
+``COLD_STORAGE_ROOT``, e.g. a cheaper volume. ``path()`` resolves a name to
+the hot file if there is one and to the cold file otherwise, so
+``FieldFile.path``/``open()`` and everything built on them (download,
+previews, export) read either tier without knowing about it. ``delete()``
+removes both copies.
+"""
+from __future__ import annotations
+
+import errno
+import os
+import shutil
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils._os import safe_join
+
+HOT, COLD = "hot", "cold"
+
+
+def cold_root() -> Optional[str]:
+    root = getattr(settings, "COLD_STORAGE_ROOT", None)
+    return os.fspath(root) if root else None
+
+
+class TieredStorage(FileSystemStorage):
+    def hot_path(self, name: str) -> str:
+        return super().path(name)
+
+    def cold_path(self, name: str) -> Optional[str]:
+        root = cold_root()
+        return safe_join(root, name) if root else None
+
+    def path(self, name: str) -> str:
+        hot = self.hot_path(name)
+        if os.path.lexists(hot):
+            return hot
+        cold = self.cold_path(name)
+        if cold is not None and os.path.lexists(cold):
+            return cold
+        # New files are always written to the hot tier
+        return hot
+
+    def tier_of(self, name: str) -> Optional[str]:
+        """Tier holding ``name``, or None if neither has it."""
+        if os.path.lexists(self.hot_path(name)):
+            return HOT
+        cold = self.cold_path(name)
+        if cold is not None and os.path.lexists(cold):
+            return COLD
+        return None
+
+    def delete(self, name: str) -> None:
+        super().delete(name)
+        cold = self.cold_path(name)
+        if cold is not None:
+            try:
+                os.remove(cold)
+            except FileNotFoundError:
+                pass
+
+    def move(self, name: str, tier: str) -> bool:
+        """Move ``name`` to ``tier``; False if it is not in the other tier.
+
+        Readers never see a partial file: a same-volume move is a rename, and
+        across volumes the copy is renamed into place before the source is
+        removed (until then ``path()`` keeps resolving to the complete source).
+        """
+        hot, cold = self.hot_path(name), self.cold_path(name)
+        if cold is None:
+            raise RuntimeError("COLD_STORAGE_ROOT is not configured")
+        source, target = (hot, cold) if tier == COLD else (cold, hot)
+        if not os.path.exists(source):
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.replace(source, target)
+        except OSError as exc:
+            if exc.errno != errno.EXDEV:
+                raise
+            partial = f"{target}.part"
+            shutil.copy2(source, partial)
+            os.replace(partial, target)
+            os.remove(source)
+        return True
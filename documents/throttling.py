@@ -0,0 +1,187 @@
+"""Per-user rate limits and the in-flight cap for synchronous extractions.
+
+Rates are token buckets per (user, scope): ``THROTTLE_RATES`` maps a scope to
+``"<requests>/<period>"`` (``s``, ``min``, ``h``, ``day``), which is both the
+bucket size, so a client may burst that many requests, and the refill rate.
+A request takes one token; without one it gets 429 with ``Retry-After`` set
+to when the next token will be there. Scopes are ``upload``, ``extract``,
+``download`` and ``search`` (listing with ``q=``/``search=``, and the async
+search view); a scope without a rate is not limited.
+
+Buckets and in-flight counters live in ``THROTTLE_CACHE_ALIAS``. Each
+check is one ``get`` and one ``set`` (like DRF's own throttles, not atomic, so
+concurrent requests may occasionally share a token). The limits hold across
+workers only if they share that cache, e.g. Redis or a file/memcached cache
+on one host; with LocMemCache every process has its own buckets.
+"""
+from __future__ import annotations
+
+import math
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from .models import ExtractionJob
+
+PERIODS = {"s": 1, "sec": 1, "min": 60, "m": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+# In-flight counters expire if a worker dies before releasing its slot
+SLOT_TIMEOUT = 15 * 60
+
+# DocumentViewSet action -> throttle scope
+ACTION_SCOPES = {
+    "create": "upload",
+    "extract": "extract",
+    "download": "download",
+}
+SEARCH_PARAMS = ("q", "search")
+
+
+def _cache():
+    return caches[getattr(settings, "THROTTLE_CACHE_ALIAS", "default")]
+
+
+def parse_rate(rate: Optional[str]) -> Optional[Tuple[int, float]]:
+    """``"30/min"`` -> ``(30, 0.5)``: bucket size and tokens per second."""
+    if not rate:
+        return None
+    count, _, period = rate.partition("/")
+    count = int(count)
+    seconds = PERIODS[period.strip().lower()]
+    return count, count / seconds
+
+
+def take_token(state: Optional[Tuple[float, float]], now: float, capacity: int,
+               refill: float) -> Tuple[Tuple[float, float], float]:
+    """Take a token from a bucket in ``state`` (tokens, updated at).
+
+    Returns the new state and 0 when a token was taken, else the unchanged
+    state and the seconds until one is available.
+    """
+    tokens, updated = state if state is not None else (float(capacity), now)
+    tokens = min(float(capacity), tokens + max(0.0, now - updated) * refill)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / refill
+
+
+def _bucket_key(scope: str, user_id: int) -> str:
+    return f"pdfvault:throttle:{scope}:{user_id}"
+
+
+def _bucket(scope: Optional[str]) -> Optional[Tuple[int, float]]:
+    if scope is None:
+        return None
+    return parse_rate(getattr(settings, "THROTTLE_RATES", {}).get(scope))
+
+
+def check(scope: Optional[str], user_id: int) -> float:
+    """Take a token of ``scope`` for ``user_id``; 0 if allowed, else seconds to wait."""
+    bucket = _bucket(scope)
+    if bucket is None:
+        return 0.0
+    capacity, refill = bucket
+    cache = _cache()
+    key = _bucket_key(scope, user_id)
+    state, wait = take_token(cache.get(key), time.time(), capacity, refill)
+    # Kept until the bucket would be full again anyway
+    cache.set(key, state, math.ceil(capacity / refill) + 1)
+    return wait
+
+
+async def acheck(scope: Optional[str], user_id: int) -> float:
+    """``check`` for async views."""
+    bucket = _bucket(scope)
+    if bucket is None:
+        return 0.0
+    capacity, refill = bucket
+    cache = _cache()
+    key = _bucket_key(scope, user_id)
+    state, wait = take_token(await cache.aget(key), time.time(), capacity, refill)
+    await cache.aset(key, state, math.ceil(capacity / refill) + 1)
+    return wait
+
+
+def retry_after(wait: float) -> str:
+    return str(max(1, math.ceil(wait)))
+
+
+def scope_for(request, view) -> Optional[str]:
+    action = getattr(view, "action", None)
+    if action == "list" and any(request.query_params.get(name) for name in SEARCH_PARAMS):
+        return "search"
+    return getattr(view, "throttle_scopes", {}).get(action)
+
+
+class ActionRateThrottle(BaseThrottle):
+    """Token bucket per user and scope; views opt in with ``throttle_scopes``."""
+
+    def allow_request(self, request, view) -> bool:
+        self._wait = 0.0
+        user = request.user
+        if not (user and user.is_authenticated):
+            return True
+        self._wait = check(scope_for(request, view), user.pk)
+        return self._wait == 0
+
+    def wait(self) -> Optional[float]:
+        return self._wait
+
+
+def _estimated_free_in(user_id: int) -> float:
+    """Seconds until the first running extraction of ``user_id`` should finish, from its progress."""
+    now = timezone.now()
+    estimates = []
+    running = ExtractionJob.objects.filter(
+        document__owner_id=user_id, status=ExtractionJob.Status.RUNNING, started_at__isnull=False,
+    ).values_list("started_at", "pages_done", "pages_total")
+    for started_at, done, total in running:
+        elapsed = (now - started_at).total_seconds()
+        if done and total:
+            estimates.append(max(0.0, elapsed / done * (total - done)))
+    return min(estimates, default=1.0)
+
+
+@contextmanager
+def extraction_slot(user_id: int) -> Iterator[None]:
+    """Hold one of the user's ``EXTRACTION_MAX_IN_FLIGHT`` synchronous extraction slots.
+
+    Raises ``Throttled`` (429) when all are taken, with ``Retry-After``
+    estimated from the progress of the user's running extractions.
+    """
+    limit = getattr(settings, "EXTRACTION_MAX_IN_FLIGHT", None)
+    if not limit:
+        yield
+        return
+    cache = _cache()
+    key = f"pdfvault:extract-in-flight:{user_id}"
+    cache.add(key, 0, SLOT_TIMEOUT)
+    try:
+        in_flight = cache.incr(key)
+    except ValueError:  # expired between add() and incr()
+        cache.add(key, 1, SLOT_TIMEOUT)
+        in_flight = 1
+    if in_flight > limit:
+        _release(cache, key)
+        wait = _estimated_free_in(user_id)
+        raise Throttled(
+            wait=max(1, math.ceil(wait)),
+            detail=f"At most {limit} synchronous extractions may run at once; use async=true for more.",
+        )
+    cache.touch(key, SLOT_TIMEOUT)
+    try:
+        yield
+    finally:
+        _release(cache, key)
+
+
+def _release(cache, key: str) -> None:
+    try:
+        cache.decr(key)
+    except ValueError:  # expired meanwhile
+        pass
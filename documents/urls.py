@@ -1,7 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import FolderViewSet, TagViewSet, DocumentViewSet, ExtractionJobViewSet, AuditLogViewSet
+from .views import (
+    FolderViewSet, TagViewSet, DocumentViewSet, ExtractionJobViewSet, AuditLogViewSet, StorageUsageViewSet,
+    WebhookEndpointViewSet,
+)
 
 router = DefaultRouter()
 router.register(r'folders', FolderViewSet, basename='folder')
@@ -9,6 +12,8 @@ router.register(r'tags', TagViewSet, basename='tag')
 router.register(r'documents', DocumentViewSet, basename='document')
 router.register(r'jobs', ExtractionJobViewSet, basename='job')
 router.register(r'audit-logs', AuditLogViewSet, basename='audit-log')
+router.register(r'storage', StorageUsageViewSet, basename='storage')
+router.register(r'webhooks', WebhookEndpointViewSet, basename='webhook')
 
 urlpatterns = [
     path('', include(router.urls)),
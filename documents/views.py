@@ -1,11 +1,14 @@
-from django.http import FileResponse, Http404
+import zlib
+
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
 from django.utils import timezone
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from .models import Folder, Tag, Document, ExtractionJob, AuditLog
+from . import metrics
+from .models import Folder, Tag, Document, ExtractionJob, AuditLog, WebhookEndpoint
 from .serializers import (
     FolderSerializer,
     TagSerializer,
@@ -14,10 +17,36 @@ from .serializers import (
     DocumentUpdateSerializer,
     ExtractionJobSerializer,
     AuditLogSerializer,
+    WebhookEndpointSerializer,
 )
+from .caching import OwnerCachedResponseMixin
 from .permissions import IsOwner
 from .filters import DocumentFilter
-from .services.pdf_extractor import extract_metadata_and_text
+from .throttling import ACTION_SCOPES, extraction_slot
+from .services import export, lifecycle, listing, previews, similarity
+from .services.jobs import run_extraction
+
+
+MAX_LAYOUT_PAGES = 100
+
+
+def _page_numbers(spec, page_count: int) -> list:
+    """Page numbers of a ``1-3,7`` style range within ``1..page_count``."""
+    if not spec:
+        return list(range(1, min(page_count, MAX_LAYOUT_PAGES) + 1))
+    numbers = set()
+    for part in spec.split(","):
+        first, _, last = part.strip().partition("-")
+        try:
+            start, end = int(first), int(last or first)
+        except ValueError:
+            raise ValueError("pages must look like 1-3,7")
+        if start < 1 or end < start:
+            raise ValueError("pages must look like 1-3,7")
+        numbers.update(range(start, min(end, page_count) + 1))
+        if len(numbers) > MAX_LAYOUT_PAGES:
+            raise ValueError(f"at most {MAX_LAYOUT_PAGES} pages per request")
+    return sorted(numbers)
 
 
 class OwnerQuerySetMixin:
@@ -42,11 +71,14 @@ class TagViewSet(OwnerQuerySetMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
 
 
-class DocumentViewSet(OwnerQuerySetMixin, viewsets.ModelViewSet):
-    queryset = Document.objects.select_related("folder").prefetch_related("tags").all()
+class DocumentViewSet(OwnerQuerySetMixin, OwnerCachedResponseMixin, viewsets.ModelViewSet):
+    # The compressed text is only loaded (and decompressed) when an action reads it
+    queryset = Document.objects.select_related("folder").prefetch_related("tags").defer("content_blob", "search_text")
     permission_classes = [IsAuthenticated, IsOwner]
     filterset_class = DocumentFilter
-    search_fields = ["title", "original_filename", "content_text"]
+    # ActionRateThrottle scopes; list counts as "search" when q= or search= is given
+    throttle_scopes = ACTION_SCOPES
+    search_fields = ["title", "original_filename", "search_text"]
     ordering_fields = ["created_at", "title", "page_count"]
 
     def get_serializer_class(self):
@@ -58,10 +90,27 @@ class DocumentViewSet(OwnerQuerySetMixin, viewsets.ModelViewSet):
             return DocumentUpdateSerializer
         return DocumentDetailSerializer
 
+    def list(self, request, *args, **kwargs):
+        # fields=a,b,c and view=compact are served from values() rows, not the serializer
+        try:
+            representation = listing.parse(request.query_params)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if representation is None:
+            return super().list(request, *args, **kwargs)
+        return self._cached_response(self._sparse_list, request, *representation)
+
+    def _sparse_list(self, request, fields, compact):
+        rows = listing.values(self.filter_queryset(self.get_queryset()), fields, compact)
+        page = self.paginate_queryset(rows)
+        data = listing.render(page if page is not None else rows, fields, compact, request)
+        return self.get_paginated_response(data) if page is not None else Response(data)
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         document = serializer.save()
+        metrics.UPLOAD_BYTES.observe(document.file.size)
         AuditLog.objects.create(
             owner=request.user,
             action=AuditLog.Action.UPLOAD,
@@ -93,47 +142,63 @@ class DocumentViewSet(OwnerQuerySetMixin, viewsets.ModelViewSet):
         )
         super().perform_destroy(instance)
 
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        # "output" rather than "format", which DRF reserves for renderer selection
+        output = request.query_params.get("output", "ndjson")
+        if output not in export.FORMATS:
+            return Response(
+                {"detail": f"output must be one of {', '.join(export.FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if output == "parquet" and not export.PARQUET_AVAILABLE:
+            return Response({"detail": "pyarrow is not installed"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        queryset = self.filter_queryset(self.get_queryset())
+        content_type, extension = export.FORMATS[output]
+        response = StreamingHttpResponse(export.export_chunks(queryset, output), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="documents.{extension}"'
+        return response
+
     @action(detail=True, methods=["post"])
     def extract(self, request, pk=None):
         document = self.get_object()
         async_flag = request.query_params.get("async") == "true"
+        # force=true re-extracts every page even if nothing changed since the last run
+        force = request.query_params.get("force") == "true"
+        # structured=true also stores per-page word boxes and tables (see layout)
+        options = {"structured": True} if request.query_params.get("structured") == "true" else {}
         if async_flag:
-            # Create a queued job and return immediately (optional Celery integration can hook here)
-            job = ExtractionJob.objects.create(document=document, status=ExtractionJob.Status.QUEUED)
+            # Create a queued job and return immediately; manage.py run_extraction_worker runs it
+            job = ExtractionJob.objects.create(
+                document=document, status=ExtractionJob.Status.QUEUED, force=force, options=options,
+            )
             AuditLog.objects.create(
                 owner=request.user,
                 action=AuditLog.Action.EXTRACT,
                 target_type=AuditLog.TargetType.DOCUMENT,
                 target_id=str(document.id),
-                meta={"async": True, "job_id": job.id},
+                meta={"async": True, "job_id": job.id, "force": force, **options},
             )
             return Response(ExtractionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
-        # Synchronous processing
-        job = ExtractionJob.objects.create(document=document, status=ExtractionJob.Status.RUNNING, started_at=timezone.now())
-        try:
-            data = extract_metadata_and_text(document.file.path)
-            for field, value in data.items():
-                setattr(document, field, value)
-            document.is_processed = True
-            document.save(update_fields=["title", "author", "page_count", "content_text", "md5", "is_processed", "updated_at"])
-            job.status = ExtractionJob.Status.SUCCESS
-            job.finished_at = timezone.now()
-            job.save(update_fields=["status", "finished_at"])
-            AuditLog.objects.create(
-                owner=request.user,
-                action=AuditLog.Action.EXTRACT,
-                target_type=AuditLog.TargetType.DOCUMENT,
-                target_id=str(document.id),
-                meta={"async": False, "job_id": job.id},
+        # Synchronous processing, limited per user (429 once all slots are taken)
+        with extraction_slot(request.user.pk):
+            job = ExtractionJob.objects.create(
+                document=document, status=ExtractionJob.Status.RUNNING, started_at=timezone.now(), force=force,
+                options=options,
             )
-            return Response(DocumentDetailSerializer(document, context={"request": request}).data)
-        except Exception as exc:
-            job.status = ExtractionJob.Status.FAILED
-            job.error_message = str(exc)
-            job.finished_at = timezone.now()
-            job.save(update_fields=["status", "error_message", "finished_at"])
-            return Response({"detail": "Extraction failed", "error": str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            try:
+                run_extraction(job)
+            except Exception as exc:
+                return Response({"detail": "Extraction failed", "error": str(exc)},
+                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        AuditLog.objects.create(
+            owner=request.user,
+            action=AuditLog.Action.EXTRACT,
+            target_type=AuditLog.TargetType.DOCUMENT,
+            target_id=str(document.id),
+            meta={"async": False, "job_id": job.id, "force": force, **options},
+        )
+        return Response(DocumentDetailSerializer(document, context={"request": request}).data)
 
     @action(detail=True, methods=["get"], url_path="download")
     def download(self, request, pk=None):
@@ -147,10 +212,107 @@ class DocumentViewSet(OwnerQuerySetMixin, viewsets.ModelViewSet):
             target_id=str(document.id),
             meta={"filename": document.original_filename},
         )
+        lifecycle.record_access(document.pk)
         response = FileResponse(open(document.file.path, 'rb'), as_attachment=True, filename=document.original_filename)
         return response
 
 
+    @action(detail=True, methods=["get"])
+    def layout(self, request, pk=None):
+        """Word boxes and tables of ``?pages=1-3,7`` (default: all, at most 100) from a structured extraction.
+
+        The stored per-page JSON is decompressed and concatenated as is; the
+        PDF is not opened.
+        """
+        document = self.get_object()
+        if not (document.is_processed and document.extraction_options.get("structured")):
+            return Response({"detail": "Document was not extracted with structured=true"},
+                            status=status.HTTP_409_CONFLICT)
+        try:
+            numbers = _page_numbers(request.query_params.get("pages"), document.page_count or 0)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        rows = document.pages.filter(number__in=numbers).order_by("number").values_list("number", "layout")
+        parts = [
+            b'{"number":%d,%s' % (number, zlib.decompress(layout)[1:])
+            for number, layout in rows if layout is not None
+        ]
+        body = b'{"document":%d,"pages":[%s]}' % (document.id, b",".join(parts))
+        return HttpResponse(body, content_type="application/json")
+
+    @action(detail=True, methods=["get"])
+    def similar(self, request, pk=None):
+        """Near-duplicates of this document, by estimated text similarity (0..1)."""
+        document = self.get_object()
+        if similarity.numpy is None:
+            return Response({"detail": "numpy is not installed"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        try:
+            threshold = float(request.query_params.get("threshold", 0.5))
+            limit = min(int(request.query_params.get("limit", 20)), 100)
+        except ValueError:
+            return Response({"detail": "threshold must be a number and limit an integer"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        matches = similarity.similar_documents(document, threshold=threshold, limit=max(limit, 0))
+        rows = {
+            row["id"]: row
+            for row in Document.objects.filter(pk__in=[pk for pk, _ in matches]).values(
+                "id", "title", "original_filename",
+            )
+        }
+        return Response([{**rows[pk], "similarity": score} for pk, score in matches])
+
+    @action(detail=True, methods=["get"], url_path=r"pages/(?P<page>\d+)/preview")
+    def preview(self, request, pk=None, page=None):
+        document = self.get_object()
+        if not document.file:
+            raise Http404
+        try:
+            requested = int(request.query_params.get("w", 0))
+        except ValueError:
+            return Response({"detail": "w must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        width = previews.bucket_width(requested)
+        try:
+            key = previews.document_preview_key(document, int(page), width)
+        except IndexError:
+            raise Http404
+        # The URL is not content-addressed, so clients must revalidate; the
+        # ETag is the content key and is answered before anything is rendered.
+        etag = f'"{key}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag in (tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        lifecycle.record_access(document.pk)
+        try:
+            path = previews.get_preview(document, int(page), width)
+        except IndexError:
+            raise Http404
+        except TimeoutError:
+            return Response({"detail": "Preview rendering timed out"}, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            headers={"Retry-After": "5"})
+        except previews.RenderError as exc:
+            return Response({"detail": "Preview rendering failed", "error": str(exc)},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        response = FileResponse(open(path, 'rb'), content_type="image/jpeg")
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+
+class WebhookEndpointViewSet(OwnerQuerySetMixin, viewsets.ModelViewSet):
+    """Endpoints notified of the user's finished extractions (see services.webhooks)."""
+    serializer_class = WebhookEndpointSerializer
+    permission_classes = [IsAuthenticated, IsOwner]
+    queryset = WebhookEndpoint.objects.all()
+
+
+class StorageUsageViewSet(viewsets.ViewSet):
+    """The user's stored bytes and documents, and their quota (null = unlimited)."""
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        return Response(lifecycle.usage(request.user.pk))
+
+
 class ExtractionJobViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ExtractionJobSerializer
     permission_classes = [IsAuthenticated]
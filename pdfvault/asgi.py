@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pdfvault.settings')
+# Serve download, job polling and search from documents.async_views
+os.environ.setdefault('PDFVAULT_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
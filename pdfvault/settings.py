@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -47,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'documents.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,9 +58,12 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'documents.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'pdfvault.urls'
+# Mount documents.async_views (set by pdfvault/asgi.py; pointless under WSGI)
+ASYNC_VIEWS = os.environ.get('PDFVAULT_ASYNC_VIEWS') == '1'
 
 TEMPLATES = [
     {
@@ -79,12 +86,83 @@ WSGI_APPLICATION = 'pdfvault.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# PDFVAULT_DB selects the profile: 'sqlite' (default) or 'postgres'.
+# Any other value is a configuration error.
+
+DB_PROFILE = os.environ.get('PDFVAULT_DB', 'sqlite')
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('PDFVAULT_DB_NAME', 'pdfvault'),
+            'USER': os.environ.get('PDFVAULT_DB_USER', 'pdfvault'),
+            'PASSWORD': os.environ.get('PDFVAULT_DB_PASSWORD', ''),
+            'HOST': os.environ.get('PDFVAULT_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('PDFVAULT_DB_PORT', '5432'),
+            # Persistent connections, checked before reuse
+            'CONN_MAX_AGE': int(os.environ.get('PDFVAULT_DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('PDFVAULT_DB_POOL_SIZE'):
+        # psycopg 3 connection pool (pip install "psycopg[pool]"); Django
+        # requires persistent connections to be disabled when pooling.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('PDFVAULT_DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ['PDFVAULT_DB_POOL_SIZE']),
+            'timeout': 10,
+        }
+elif DB_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('PDFVAULT_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Seconds a writer waits for the lock instead of failing with
+                # "database is locked".
+                'timeout': 20,
+                # Take the write lock at BEGIN so read-then-write transactions
+                # cannot deadlock on lock upgrade (which SQLite does not retry).
+                'transaction_mode': 'IMMEDIATE',
+                # WAL lets readers run concurrently with the single writer.
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA busy_timeout=20000;'
+                    'PRAGMA mmap_size=268435456;'
+                ),
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"PDFVAULT_DB must be 'sqlite' or 'postgres', not {DB_PROFILE!r}")
+
+
+# Cache
+# Per-owner response caching and its version counters must be shared by all
+# worker processes: with the process-local LocMemCache the response cache is
+# switched off (RESPONSE_CACHE_ENABLED = None means "only for shared backends").
+
+if os.environ.get('PDFVAULT_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['PDFVAULT_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
+
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_ENABLED = None
+RESPONSE_CACHE_TIMEOUT = 300
 
 
 # Password validation
@@ -131,15 +209,63 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Media (file uploads)
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
+STORAGES = {
+    'default': {'BACKEND': 'documents.storage.TieredStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+# Cold tier for documents not accessed in COLD_TIER_AFTER_DAYS (manage.py tier_storage); unset disables it
+COLD_STORAGE_ROOT = os.environ.get('PDFVAULT_COLD_STORAGE_ROOT') or None
+COLD_TIER_AFTER_DAYS = int(os.environ.get('PDFVAULT_COLD_TIER_AFTER_DAYS', '90'))
+# Default per-owner storage quota in bytes (0 = unlimited); StorageUsage.quota_bytes overrides it
+STORAGE_QUOTA_BYTES = int(os.environ.get('PDFVAULT_STORAGE_QUOTA_BYTES', '0'))
+
+# /metrics access: client addresses/networks, or 'Authorization: Bearer <token>'
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('PDFVAULT_METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+METRICS_TOKEN = os.environ.get('PDFVAULT_METRICS_TOKEN', '')
+METRICS_QUEUE_CACHE_SECONDS = 15
+
+# Per-job peak of Python allocations in ExtractionJob.stats (tracemalloc; slows extraction)
+EXTRACTION_TRACE_MEMORY = os.environ.get('PDFVAULT_EXTRACTION_TRACE_MEMORY', '1') == '1'
+
+# Stored document/page text (documents.services.textstore): 'zstd' (needs zstandard, else zlib) or 'zlib'
+TEXT_COMPRESSION = os.environ.get('PDFVAULT_TEXT_COMPRESSION', 'zstd')
+TEXT_COMPRESSION_LEVEL = int(os.environ['PDFVAULT_TEXT_COMPRESSION_LEVEL']) if os.environ.get('PDFVAULT_TEXT_COMPRESSION_LEVEL') else None
+
+# Page previews (documents.services.previews)
+PREVIEW_ROOT = Path(os.environ.get('PDFVAULT_PREVIEW_ROOT', BASE_DIR / 'previews'))
+PREVIEW_CACHE_MAX_BYTES = int(os.environ.get('PDFVAULT_PREVIEW_CACHE_MAX_BYTES', 1024 ** 3))
+PREVIEW_WORKERS = int(os.environ.get('PDFVAULT_PREVIEW_WORKERS', '2'))
+
+# Per-user token buckets, "<requests>/<s|min|h|day>" (documents.throttling); empty disables a scope
+THROTTLE_RATES = {
+    'upload': os.environ.get('PDFVAULT_THROTTLE_UPLOAD', '120/min'),
+    'extract': os.environ.get('PDFVAULT_THROTTLE_EXTRACT', '60/min'),
+    'download': os.environ.get('PDFVAULT_THROTTLE_DOWNLOAD', '600/min'),
+    'search': os.environ.get('PDFVAULT_THROTTLE_SEARCH', '600/min'),
+}
+THROTTLE_CACHE_ALIAS = 'default'
+# Synchronous extractions one user may run at once (0 = unlimited)
+EXTRACTION_MAX_IN_FLIGHT = int(os.environ.get('PDFVAULT_EXTRACTION_MAX_IN_FLIGHT', '2'))
+
+# Webhook delivery (manage.py dispatch_webhooks): events per request, request
+# timeout in seconds, attempts before an event is given up, and days
+# delivered events are kept
+WEBHOOK_BATCH_SIZE = int(os.environ.get('PDFVAULT_WEBHOOK_BATCH_SIZE', '100'))
+WEBHOOK_TIMEOUT = float(os.environ.get('PDFVAULT_WEBHOOK_TIMEOUT', '10'))
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('PDFVAULT_WEBHOOK_MAX_ATTEMPTS', '8'))
+WEBHOOK_RETENTION_DAYS = int(os.environ.get('PDFVAULT_WEBHOOK_RETENTION_DAYS', '7'))
 
 # DRF configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'documents.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'documents.throttling.ActionRateThrottle',
+    ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
@@ -148,6 +274,20 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Token -> user memoization (documents.authentication.CachedTokenAuthentication)
+TOKEN_AUTH_CACHE = {
+    'TTL': 30,
+    'MAX_ENTRIES': 10000,
+    'SHARED_CACHE': os.environ.get('PDFVAULT_TOKEN_CACHE_ALIAS') or None,
+}
+
+# Request profiling (documents.middleware.ProfilingMiddleware).
+# Disabled unless a sample rate or a header token is configured.
+PROFILING_SAMPLE_RATE = float(os.environ.get('PDFVAULT_PROFILE_SAMPLE_RATE', '0'))
+PROFILING_HEADER_TOKEN = os.environ.get('PDFVAULT_PROFILE_TOKEN', '')
+PROFILING_PROFILER = os.environ.get('PDFVAULT_PROFILER', '')  # '', 'cprofile' or 'pyinstrument'
+PROFILING_DIR = Path(os.environ.get('PDFVAULT_PROFILE_DIR', BASE_DIR / 'profiles'))
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'PDF Vault API',
     'DESCRIPTION': 'Upload, extract, and archive PDFs with search and audit logs.',
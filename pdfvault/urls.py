@@ -21,6 +21,8 @@ from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from rest_framework.authtoken.views import obtain_auth_token
 
+from documents.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     # API includes
@@ -30,7 +32,13 @@ urlpatterns = [
     # Schema and docs
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
 ]
 
+if settings.ASYNC_VIEWS:
+    # Async download / job polling / search take precedence over the DRF routes
+    urlpatterns.insert(1, path('api/', include('documents.async_urls')))
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,34 @@
+import pytest
+from django.core.cache import caches
+
+from documents.authentication import get_local_cache
+from documents.services import textstore
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    # Primary keys are reused between tests, so owner-scoped entries must not leak
+    for cache in caches.all():
+        cache.clear()
+    get_local_cache().clear()
+    # Compression dictionaries are rolled back with each test's transaction
+    textstore.reset()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def _media_root(settings, tmp_path):
+    # Uploads must not land in the repository's media/ directory
+    settings.MEDIA_ROOT = tmp_path / "media"
+
+
+@pytest.fixture(autouse=True)
+def _preview_root(settings, tmp_path):
+    settings.PREVIEW_ROOT = tmp_path / "previews"
+    # Render inline; tests that need the process pool opt in
+    settings.PREVIEW_WORKERS = 0
+
+
+@pytest.fixture(autouse=True)
+def _cold_storage_root(settings, tmp_path):
+    settings.COLD_STORAGE_ROOT = tmp_path / "cold"
@@ -0,0 +1,101 @@
+import importlib
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import AsyncClient
+from django.urls import clear_url_caches, resolve
+from rest_framework.test import APIClient
+from PyPDF2 import PdfWriter
+
+from documents.models import AuditLog, Document
+
+
+def _make_pdf(path, title="Async"):
+    writer = PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    writer.add_metadata({"/Title": title})
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+@pytest.fixture
+def async_urls(settings):
+    import pdfvault.urls
+
+    settings.ASYNC_VIEWS = True
+    importlib.reload(pdfvault.urls)
+    clear_url_caches()
+    yield
+    settings.ASYNC_VIEWS = False
+    importlib.reload(pdfvault.urls)
+    clear_url_caches()
+
+
+def _setup(tmp_path, username="alice"):
+    User.objects.create_user(username=username, password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": username, "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    p = tmp_path / f'{username}.pdf'
+    _make_pdf(p)
+    with open(p, 'rb') as f:
+        doc_id = client.post('/api/documents/', {"file": f}).data['id']
+    return token, doc_id, client
+
+
+def _get(token, url, **params):
+    return async_to_sync(AsyncClient().get)(url, params, headers={"Authorization": f"Token {token}"})
+
+
+@pytest.mark.django_db
+def test_async_download_job_and_search(async_urls, tmp_path):
+    token, doc_id, client = _setup(tmp_path)
+    assert resolve(f'/api/documents/{doc_id}/download/').func.__module__ == 'documents.async_views'
+
+    resp = _get(token, f'/api/documents/{doc_id}/download/')
+    assert resp.status_code == 200
+    assert resp.is_async
+    body = async_to_sync(lambda: _collect(resp))()
+    assert body.startswith(b'%PDF')
+    assert int(resp['Content-Length']) == len(body)
+    assert 'attachment' in resp['Content-Disposition']
+    assert AuditLog.objects.filter(action=AuditLog.Action.DOWNLOAD, target_id=str(doc_id)).exists()
+
+    job_id = client.post(f'/api/documents/{doc_id}/extract/?async=true').data['id']
+    job = _get(token, f'/api/jobs/{job_id}/')
+    assert job.status_code == 200
+    assert job.json()['status'] == 'QUEUED'
+
+    Document.objects.filter(pk=doc_id).update(title="Quarterly report")
+    assert [row['id'] for row in _get(token, '/api/documents/search/', q='quarterly').json()] == [doc_id]
+    assert _get(token, '/api/documents/search/', q='nothing').json() == []
+
+
+@pytest.mark.django_db
+def test_async_views_enforce_token_and_owner(async_urls, tmp_path):
+    token, doc_id, _ = _setup(tmp_path)
+    bob_token, _, _ = _setup(tmp_path, "bob")
+    assert _get('wrong', f'/api/documents/{doc_id}/download/').status_code == 401
+    assert _get(bob_token, f'/api/documents/{doc_id}/download/').status_code == 404
+    assert _get(bob_token, '/api/documents/search/').json() != []  # bob's own document only
+    assert all(row['id'] != doc_id for row in _get(bob_token, '/api/documents/search/').json())
+
+
+async def _collect(response):
+    return b''.join([chunk async for chunk in response.streaming_content])
+
+
+@pytest.mark.django_db
+def test_async_views_share_the_rate_limits(async_urls, settings, tmp_path):
+    settings.THROTTLE_RATES = {"download": "1/min", "search": "2/min"}
+    token, doc_id, client = _setup(tmp_path)
+
+    assert _get(token, f'/api/documents/{doc_id}/download/').status_code == 200
+    resp = _get(token, f'/api/documents/{doc_id}/download/')
+    assert resp.status_code == 429
+    assert 55 <= int(resp['Retry-After']) <= 60
+
+    assert _get(token, '/api/documents/search/', q='x').status_code == 200
+    assert _get(token, '/api/documents/search/', q='x').status_code == 200
+    assert _get(token, '/api/documents/search/', q='x').status_code == 429
@@ -0,0 +1,76 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from documents.authentication import CachedTokenAuthentication, get_local_cache
+
+
+def _token_queries(client):
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get('/api/folders/')
+    assert resp.status_code == 200
+    return sum('authtoken_token' in q['sql'] for q in ctx.captured_queries)
+
+
+def _client(username="alice"):
+    user = User.objects.create_user(username=username, password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": username, "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return user, client
+
+
+@pytest.mark.django_db
+def test_token_resolution_is_cached():
+    _, client = _client()
+    assert _token_queries(client) == 1
+    assert _token_queries(client) == 0
+
+
+@pytest.mark.django_db
+def test_deleted_token_is_rejected():
+    user, client = _client()
+    _token_queries(client)
+    Token.objects.filter(user=user).delete()
+    assert client.get('/api/folders/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_deactivated_user_is_rejected():
+    user, client = _client()
+    _token_queries(client)
+    user.is_active = False
+    user.save()
+    assert client.get('/api/folders/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_cached_users_are_fresh_instances_without_password():
+    user, client = _client()
+    key = Token.objects.get(user=user).key
+    _token_queries(client)
+    snapshot = get_local_cache().get(key)
+    assert 'password' not in snapshot
+
+    first, _ = CachedTokenAuthentication().authenticate_credentials(key)
+    second, _ = CachedTokenAuthentication().authenticate_credentials(key)
+    assert first is not second
+    assert first.pk == user.pk
+    assert 'password' in first.get_deferred_fields()
+    assert first.check_password('pass')  # loaded on demand
+
+
+@pytest.mark.django_db
+def test_shared_cache_revocation_reaches_every_worker(settings):
+    settings.TOKEN_AUTH_CACHE = {"SHARED_CACHE": "default"}
+    user, client = _client()
+    assert _token_queries(client) == 1
+    assert _token_queries(client) == 0
+    assert get_local_cache().get(Token.objects.get(user=user).key) is None
+
+    user.is_active = False
+    user.save()
+    assert client.get('/api/folders/').status_code == 401
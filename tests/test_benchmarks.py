@@ -0,0 +1,49 @@
+import pytest
+
+from benchmarks.corpus import make_pdf
+from benchmarks.harness import compare, percentile
+from benchmarks.run import SCENARIOS, build_parser, run
+from documents.services.pdf_extractor import extract_metadata_and_text
+
+
+def test_synthetic_pdf_has_extractable_text(tmp_path):
+    path = tmp_path / 'bench.pdf'
+    path.write_bytes(make_pdf(pages=2, words_per_page=50, title="Synthetic"))
+    data = extract_metadata_and_text(str(path))
+    assert data['page_count'] == 2
+    assert data['title'] == "Synthetic"
+    assert len(data['content_text'].split()) == 100
+
+
+def test_percentile_and_baseline_compare():
+    assert percentile([0.3, 0.1, 0.2, 0.4], 50) == 0.2
+    assert percentile([0.3, 0.1, 0.2, 0.4], 95) == 0.4
+    regressions = compare({"search": {"p95_ms": 130}, "list": {"p95_ms": 100}},
+                          {"search": {"p95_ms": 100}, "list": {"p95_ms": 100}})
+    assert regressions == ["search: p95_ms 100 -> 130 (+30%)"]
+
+
+@pytest.mark.django_db
+def test_benchmark_run_smoke(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    options = build_parser().parse_args([
+        "--iterations", "2", "--documents", "20", "--users", "2", "--audit-rows", "10",
+        "--pages", "1", "--corpus-size", "2",
+    ])
+    results = run(options)
+    assert set(results) == set(SCENARIOS)
+    for result in results.values():
+        assert result["n"] == 2
+        assert result["p50_ms"] <= result["p99_ms"]
+
+
+@pytest.mark.django_db
+def test_text_storage_benchmark_smoke():
+    from benchmarks import text_storage
+
+    corpus = text_storage.synthetic_corpus(documents=12, pages=2, words_per_page=200)
+    results = text_storage.run(corpus, iterations=2)
+    assert results["pages"] == 24
+    assert results["raw"]["ratio"] == 1.0
+    assert results["zlib"]["ratio"] > 1.5
+    assert results["zlib"]["read"]["n"] == 2
@@ -0,0 +1,66 @@
+import runpy
+import threading
+from pathlib import Path
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connections, transaction
+
+WRITERS = 8
+WRITES_PER_WRITER = 25
+
+
+@pytest.fixture
+def stress_alias(tmp_path, django_db_blocker):
+    """A file-backed copy of the default database settings (the test database is in memory)."""
+    default = connections.settings['default']
+    if default['ENGINE'] != 'django.db.backends.sqlite3':
+        pytest.skip("SQLite profile only")
+    alias = 'stress'
+    connections.settings[alias] = {**default, 'NAME': str(tmp_path / 'stress.sqlite3'), 'TEST': {}}
+    with django_db_blocker.unblock():
+        with connections[alias].cursor() as cursor:
+            cursor.execute("CREATE TABLE stress_row (id INTEGER PRIMARY KEY, writer INTEGER, seen INTEGER)")
+        yield alias
+        connections[alias].close()
+    del connections.settings[alias]
+
+
+def _writer(alias, writer, errors):
+    try:
+        for _ in range(WRITES_PER_WRITER):
+            try:
+                # Read-then-write, like an audit row following a document update
+                with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                    cursor.execute("SELECT COUNT(*) FROM stress_row")
+                    seen = cursor.fetchone()[0]
+                    cursor.execute("INSERT INTO stress_row (writer, seen) VALUES (%s, %s)", [writer, seen])
+            except OperationalError as exc:
+                errors.append(str(exc))
+    finally:
+        connections[alias].close()
+
+
+def test_concurrent_writers_do_not_hit_database_locked(stress_alias):
+    with connections[stress_alias].cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode")
+        assert cursor.fetchone()[0] == 'wal'
+
+    errors = []
+    threads = [threading.Thread(target=_writer, args=(stress_alias, n, errors)) for n in range(WRITERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with connections[stress_alias].cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM stress_row")
+        assert cursor.fetchone()[0] == WRITERS * WRITES_PER_WRITER
+
+
+def test_unknown_database_profile_is_rejected(monkeypatch):
+    monkeypatch.setenv('PDFVAULT_DB', 'mysql')
+    settings_file = Path(__file__).resolve().parent.parent / 'pdfvault' / 'settings.py'
+    with pytest.raises(ImproperlyConfigured, match="'mysql'"):
+        runpy.run_path(str(settings_file))
@@ -0,0 +1,87 @@
+import io
+import json
+import zipfile
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from PyPDF2 import PdfWriter
+
+from documents.models import Document, Tag
+
+
+def _make_pdf(path, title):
+    writer = PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    writer.add_metadata({"/Title": title})
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def _setup(tmp_path):
+    user = User.objects.create_user(username="alice", password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": "alice", "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    ids = []
+    for i in range(3):
+        p = tmp_path / f'doc{i}.pdf'
+        _make_pdf(p, f'Title {i}')
+        with open(p, 'rb') as f:
+            ids.append(client.post('/api/documents/', {"file": f}).data['id'])
+    client.post(f'/api/documents/{ids[0]}/extract/')
+    doc = Document.objects.get(pk=ids[1])
+    doc.content_text = "hello world"
+    doc.save()
+    doc.tags.add(Tag.objects.create(owner=user, name="ml"))
+    other = User.objects.create_user(username="bob", password="pass")
+    Document.objects.create(owner=other, original_filename="secret.pdf", content_text="secret")
+    return client, ids
+
+
+@pytest.mark.django_db
+def test_ndjson_export_streams_records_with_text_and_tags(tmp_path):
+    client, ids = _setup(tmp_path)
+    resp = client.get('/api/documents/export/')
+    assert resp.status_code == 200
+    assert resp.streaming
+    assert resp['Content-Type'] == 'application/x-ndjson'
+    rows = [json.loads(line) for line in b''.join(resp.streaming_content).splitlines()]
+    assert [row['id'] for row in rows] == ids
+    assert rows[1]['content_text'] == 'hello world'
+    assert rows[1]['tags'] == ['ml']
+    assert rows[0]['title'] == 'Title 0'
+
+    filtered = client.get('/api/documents/export/', {"processed": "true"})
+    assert [json.loads(line)['id'] for line in b''.join(filtered.streaming_content).splitlines()] == [ids[0]]
+    assert client.get('/api/documents/export/', {"output": "csv"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_zip_export_contains_pdfs_and_manifest(tmp_path):
+    client, ids = _setup(tmp_path)
+    resp = client.get('/api/documents/export/', {"output": "zip", "tag": "ml"})
+    assert resp.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(resp.streaming_content)))
+    names = archive.namelist()
+    assert names == [f'{ids[1]}-doc1.pdf', 'manifest.ndjson']
+    assert archive.read(names[0]).startswith(b'%PDF')
+    assert json.loads(archive.read('manifest.ndjson'))['path'] == names[0]
+
+
+@pytest.mark.django_db
+def test_export_command(tmp_path):
+    _, ids = _setup(tmp_path)
+    out = tmp_path / 'export.ndjson'
+    call_command('export_documents', owner='alice', out=str(out), filter=['q=hello'], chunk_size=1)
+    assert [json.loads(line)['id'] for line in out.read_text().splitlines()] == [ids[1]]
+
+
+@pytest.mark.django_db
+def test_parquet_export(tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    client, ids = _setup(tmp_path)
+    resp = client.get('/api/documents/export/', {"output": "parquet"})
+    table = parquet.read_table(io.BytesIO(b''.join(resp.streaming_content)))
+    assert table.column('id').to_pylist() == ids
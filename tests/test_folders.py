@@ -0,0 +1,80 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from documents.models import Document, Folder
+
+
+def _client(username="alice"):
+    user = User.objects.create_user(username=username, password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": username, "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return user, client
+
+
+def _folder(client, name, parent=None):
+    resp = client.post('/api/folders/', {"name": name, "parent": parent}, format='json')
+    assert resp.status_code == 201, resp.data
+    return resp.data
+
+
+def _document_ids(client, **params):
+    return sorted(row['id'] for row in client.get('/api/documents/', params).data)
+
+
+@pytest.mark.django_db
+def test_nested_folders_and_subtree_filter():
+    user, client = _client()
+    root = _folder(client, "root")
+    child = _folder(client, "child", root['id'])
+    grandchild = _folder(client, "grandchild", child['id'])
+    sibling = _folder(client, "sibling")
+    assert grandchild['path'] == f"/{root['id']}/{child['id']}/{grandchild['id']}/"
+
+    docs = {
+        name: Document.objects.create(owner=user, original_filename=f"{name}.pdf", folder_id=folder['id']).id
+        for name, folder in [("root", root), ("child", child), ("grandchild", grandchild), ("sibling", sibling)]
+    }
+    assert _document_ids(client, folder=root['id']) == [docs["root"]]
+    assert _document_ids(client, folder=root['id'], include_descendants='true') == sorted(
+        [docs["root"], docs["child"], docs["grandchild"]]
+    )
+    assert _document_ids(client, folder=child['id'], include_descendants='true') == sorted(
+        [docs["child"], docs["grandchild"]]
+    )
+
+
+@pytest.mark.django_db
+def test_moving_a_subtree_is_a_bounded_number_of_statements():
+    user, client = _client()
+    root = _folder(client, "root")
+    child = _folder(client, "child", root['id'])
+    for i in range(20):
+        _folder(client, f"leaf-{i}", child['id'])
+    target = _folder(client, "target")
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.patch(f"/api/folders/{child['id']}/", {"parent": target['id']}, format='json')
+    assert resp.status_code == 200
+    assert resp.data['path'] == f"/{target['id']}/{child['id']}/"
+    updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+    assert len(updates) == 2  # the folder row, then all paths of the subtree
+    prefix = f"/{target['id']}/{child['id']}/"
+    assert Folder.objects.filter(path__startswith=prefix).count() == 21
+    assert not Folder.objects.filter(path__startswith=f"/{root['id']}/{child['id']}/").exists()
+
+
+@pytest.mark.django_db
+def test_folder_cannot_move_into_own_subtree_or_foreign_folder():
+    _, client = _client()
+    root = _folder(client, "root")
+    child = _folder(client, "child", root['id'])
+    assert client.patch(f"/api/folders/{root['id']}/", {"parent": child['id']}, format='json').status_code == 400
+    assert client.patch(f"/api/folders/{root['id']}/", {"parent": root['id']}, format='json').status_code == 400
+
+    _, bob = _client("bob")
+    bobs = _folder(bob, "bobs")
+    assert client.patch(f"/api/folders/{root['id']}/", {"parent": bobs['id']}, format='json').status_code == 400
@@ -0,0 +1,61 @@
+import pytest
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from PyPDF2 import PdfWriter
+
+from documents.models import Document, ExtractionJob
+
+
+def _make_pdf(path, widths):
+    writer = PdfWriter()
+    for width in widths:
+        writer.add_blank_page(width=width, height=792)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def _client():
+    User.objects.create_user(username="alice", password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": "alice", "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return client
+
+
+def _last_stats(doc_id):
+    return ExtractionJob.objects.filter(document_id=doc_id).order_by('-id').first().stats
+
+
+@pytest.mark.django_db
+def test_reextraction_skips_unchanged_files_and_pages(tmp_path):
+    client = _client()
+    p = tmp_path / 'a.pdf'
+    _make_pdf(p, [612, 600])
+    with open(p, 'rb') as f:
+        doc_id = client.post('/api/documents/', {"file": f}).data['id']
+
+    resp = client.post(f'/api/documents/{doc_id}/extract/')
+    assert resp.status_code == 200
+    assert resp.data['extractor_version']
+    assert _last_stats(doc_id)['pages_reused'] == 0
+    document = Document.objects.get(pk=doc_id)
+    assert list(document.pages.values_list('number', flat=True)) == [1, 2]
+
+    assert client.post(f'/api/documents/{doc_id}/extract/').status_code == 200
+    assert _last_stats(doc_id)['skipped'] is True
+
+    # Replace the file in place: page 1 unchanged, page 2 changed, page 3 new
+    _make_pdf(document.file.path, [612, 500, 400])
+    assert client.post(f'/api/documents/{doc_id}/extract/').status_code == 200
+    stats = _last_stats(doc_id)
+    assert (stats['skipped'], stats['pages_reused'], len(stats['page_seconds'])) == (False, 1, 2)
+    assert document.pages.count() == 3
+    assert Document.objects.get(pk=doc_id).page_count == 3
+
+    _make_pdf(document.file.path, [612])
+    assert client.post(f'/api/documents/{doc_id}/extract/').status_code == 200
+    assert document.pages.count() == 1
+
+    assert client.post(f'/api/documents/{doc_id}/extract/?force=true').status_code == 200
+    stats = _last_stats(doc_id)
+    assert (stats['skipped'], stats['pages_reused']) == (False, 0)
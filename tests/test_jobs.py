@@ -32,3 +32,26 @@ def test_extract_async_creates_job(tmp_path):
     assert len(jobs.data) >= 1
 
 
+@pytest.mark.django_db
+def test_extract_sync_records_progress_and_stage_timings(tmp_path):
+    User.objects.create_user(username="alice", password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": "alice", "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+    p = tmp_path / 'a.pdf'
+    _make_pdf(p)
+    with open(p, 'rb') as f:
+        doc_id = client.post('/api/documents/', {"file": f}).data['id']
+
+    assert client.post(f'/api/documents/{doc_id}/extract/').status_code == 200
+    job = client.get('/api/jobs/').data[0]
+    assert job['status'] == 'SUCCESS'
+    assert job['pages_done'] == job['pages_total'] == 1
+    stages = job['stats']['stages']
+    for stage in ("open", "metadata", "text", "normalize", "hash", "db_write"):
+        assert stages[stage] >= 0
+    assert len(job['stats']['page_seconds']) == 1
+    assert job['stats']['peak_traced_kb'] > 0
+
+
@@ -0,0 +1,123 @@
+import pytest
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+
+from documents.models import DocumentPage
+
+
+def _make_pdf(path, pages):
+    """Write a PDF whose pages hold a 2x2 table of ``(cells, caption)``."""
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    add(b"")  # catalog, filled in below
+    add(b"")  # page tree
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    kids = []
+    for cells, caption in pages:
+        ops = [f"BT /F1 12 Tf 72 720 Td ({caption}) Tj ET"]
+        # Grid lines: x = 72, 222, 372 and y = 600, 630, 660
+        for x in (72, 222, 372):
+            ops.append(f"{x} 600 m {x} 660 l S")
+        for y in (600, 630, 660):
+            ops.append(f"72 {y} m 372 {y} l S")
+        for row, y in ((0, 640), (1, 610)):
+            for col, x in ((0, 80), (1, 230)):
+                ops.append(f"BT /F1 10 Tf {x} {y} Td ({cells[row][col]}) Tj ET")
+        stream = "\n".join(ops).encode()
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        kids.append(add(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (font, content)
+        ))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, 'wb') as f:
+        f.write(bytes(out))
+
+
+def _client():
+    User.objects.create_user(username="alice", password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": "alice", "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return client
+
+
+def _upload(client, tmp_path):
+    p = tmp_path / 'ledger.pdf'
+    _make_pdf(p, [
+        ([["Item", "Amount"], ["Rent", "1200"]], "January"),
+        ([["Item", "Amount"], ["Power", "90"]], "February"),
+        ([["Item", "Amount"], ["Water", "30"]], "March"),
+    ])
+    with open(p, 'rb') as f:
+        return client.post('/api/documents/', {"file": f}).data['id']
+
+
+@pytest.mark.django_db
+def test_structured_extraction_serves_tables_and_words(tmp_path):
+    client = _client()
+    doc_id = _upload(client, tmp_path)
+
+    assert client.post(f'/api/documents/{doc_id}/extract/').status_code == 200
+    assert client.get(f'/api/documents/{doc_id}/layout/').status_code == 409
+    assert not DocumentPage.objects.filter(document_id=doc_id, layout__isnull=False).exists()
+
+    resp = client.post(f'/api/documents/{doc_id}/extract/?structured=true')
+    assert resp.status_code == 200
+    job = client.get('/api/jobs/').data[0]
+    assert job['options'] == {"structured": True}
+    assert not job['stats']['skipped']
+    assert 'layout' in job['stats']['stages']
+
+    resp = client.get(f'/api/documents/{doc_id}/layout/?pages=2-3')
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data['document'] == doc_id
+    assert [page['number'] for page in data['pages']] == [2, 3]
+    page = data['pages'][0]
+    assert (page['width'], page['height']) == (612, 792)
+    assert page['tables'] == [[["Item", "Amount"], ["Power", "90"]]]
+    words = page['words']
+    assert "February" in words['text']
+    index = words['text'].index("February")
+    assert words['x0'][index] == pytest.approx(72, abs=0.5)
+    assert len(words['x0']) == len(words['top']) == len(words['x1']) == len(words['bottom']) == len(words['text'])
+
+    assert [p['number'] for p in client.get(f'/api/documents/{doc_id}/layout/').json()['pages']] == [1, 2, 3]
+    assert [p['number'] for p in client.get(f'/api/documents/{doc_id}/layout/?pages=3,1,9').json()['pages']] == [1, 3]
+    assert client.get(f'/api/documents/{doc_id}/layout/?pages=3-1').status_code == 400
+    assert client.get(f'/api/documents/{doc_id}/layout/?pages=a').status_code == 400
+
+
+@pytest.mark.django_db
+def test_structured_reextraction_reuses_unchanged_layouts(tmp_path):
+    client = _client()
+    doc_id = _upload(client, tmp_path)
+    client.post(f'/api/documents/{doc_id}/extract/?structured=true')
+    before = {p.number: bytes(p.layout) for p in DocumentPage.objects.filter(document_id=doc_id)}
+
+    client.post(f'/api/documents/{doc_id}/extract/?structured=true')
+    job = client.get('/api/jobs/').data[0]
+    assert job['stats']['skipped']
+
+    # Switching back to plain text extraction drops the layouts
+    client.post(f'/api/documents/{doc_id}/extract/')
+    assert not DocumentPage.objects.filter(document_id=doc_id, layout__isnull=False).exists()
+    client.post(f'/api/documents/{doc_id}/extract/?structured=true')
+    after = {p.number: bytes(p.layout) for p in DocumentPage.objects.filter(document_id=doc_id)}
+    assert after == before
@@ -0,0 +1,73 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from benchmarks.seed import seed
+from documents.models import Document
+from documents.services import listing
+
+
+def _client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+    return client
+
+
+@pytest.mark.django_db
+def test_full_view_from_values_matches_the_serializer():
+    data = seed(users=1, documents=12, tags=4, folders=2, audit_rows=0, words=5)
+    client = _client(data.token)
+    Document.objects.filter(pk=data.document_ids[0]).update(folder=None)
+
+    expected = client.get('/api/documents/').data
+    response = client.get('/api/documents/', {"view": "full"})
+    assert response.status_code == 200
+    assert response.json() == [dict(row) for row in expected]
+    assert any(row['tags'] for row in response.json())
+    assert any(row['folder'] is None for row in response.json())
+
+
+@pytest.mark.django_db
+def test_sparse_fields_and_compact_view():
+    data = seed(users=1, documents=6, tags=3, folders=2, audit_rows=0, words=5)
+    client = _client(data.token)
+    full = {row['id']: row for row in client.get('/api/documents/').data}
+
+    rows = client.get('/api/documents/', {"fields": "title,id", "ordering": "title"}).json()
+    assert [list(row) for row in rows] == [["id", "title"]] * 6
+    assert [row['title'] for row in rows] == sorted(row['title'] for row in full.values())
+
+    rows = client.get('/api/documents/', {"view": "compact", "fields": "id,folder,tags"}).json()
+    for row in rows:
+        assert row['folder'] == (full[row['id']]['folder'] or {}).get('id')
+        assert row['tags'] == [tag['id'] for tag in full[row['id']]['tags']]
+
+    # Filters apply as usual
+    tag = data.tag_names[0]
+    filtered = client.get('/api/documents/', {"tag": tag, "fields": "id"}).json()
+    assert sorted(row['id'] for row in filtered) == sorted(
+        row['id'] for row in full.values() if tag in [t['name'] for t in row['tags']]
+    )
+
+
+@pytest.mark.django_db
+def test_unknown_field_or_view_is_rejected():
+    data = seed(users=1, documents=1, tags=1, folders=1, audit_rows=0, words=5)
+    client = _client(data.token)
+    response = client.get('/api/documents/', {"fields": "id,content_text"})
+    assert response.status_code == 400
+    assert "content_text" in response.data['detail']
+    assert client.get('/api/documents/', {"view": "tiny"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_query_count_does_not_grow_with_rows():
+    data = seed(users=1, documents=40, tags=5, folders=3, audit_rows=0, words=5)
+    client = _client(data.token)
+    client.get('/api/documents/', {"view": "compact"})  # warm the token cache
+    with CaptureQueriesContext(connection) as ctx:
+        assert len(client.get('/api/documents/', {"view": "compact"}).json()) == 40
+    # documents and tags; no per-row queries
+    assert len([q for q in ctx.captured_queries if q["sql"].startswith("SELECT")]) <= 2
+    assert listing.parse({}) is None
@@ -0,0 +1,73 @@
+import pytest
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from PyPDF2 import PdfWriter
+
+pytest.importorskip("prometheus_client")
+
+
+def _make_pdf(path):
+    writer = PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_reports_requests_uploads_and_jobs(tmp_path):
+    User.objects.create_user(username="alice", password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": "alice", "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+    p = tmp_path / 'a.pdf'
+    _make_pdf(p)
+    with open(p, 'rb') as f:
+        doc_id = client.post('/api/documents/', {"file": f}).data['id']
+    client.post(f'/api/documents/{doc_id}/extract/')
+    client.post(f'/api/documents/{doc_id}/extract/?async=true')
+
+    resp = APIClient().get('/metrics')
+    assert resp.status_code == 200
+    body = resp.content.decode()
+    assert 'pdfvault_http_request_duration_seconds_bucket{' in body
+    assert 'route="document-extract"' in body
+    assert 'pdfvault_upload_bytes_count' in body
+    assert 'pdfvault_extraction_duration_seconds_count{status="SUCCESS"}' in body
+    assert 'pdfvault_extraction_pages_per_second_count' in body
+    assert 'pdfvault_extraction_jobs{status="QUEUED"} 1.0' in body
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_requires_allowed_ip_or_token(settings):
+    settings.METRICS_TOKEN = 's3cret'
+    remote = {'REMOTE_ADDR': '203.0.113.9'}
+    assert APIClient().get('/metrics', **remote).status_code == 403
+    assert APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer wrong', **remote).status_code == 403
+    assert APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret', **remote).status_code == 200
+
+    settings.METRICS_ALLOWED_IPS = ['203.0.113.0/24']
+    assert APIClient().get('/metrics', **remote).status_code == 200
+    assert APIClient().get('/metrics').status_code == 403  # 127.0.0.1 no longer listed
+
+
+@pytest.mark.django_db
+def test_shared_token_cache_hits_are_counted_as_hits(settings):
+    from prometheus_client import REGISTRY
+
+    from documents.authentication import get_local_cache
+
+    settings.TOKEN_AUTH_CACHE = {"SHARED_CACHE": "default"}
+    User.objects.create_user(username="alice", password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": "alice", "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+    def count(result):
+        return REGISTRY.get_sample_value('pdfvault_cache_requests_total', {'cache': 'token_auth', 'result': result}) or 0
+
+    client.get('/api/folders/')
+    get_local_cache().clear()  # as if another worker served the next request
+    hits, misses = count('hit'), count('miss')
+    client.get('/api/folders/')
+    assert (count('hit') - hits, count('miss') - misses) == (1, 0)
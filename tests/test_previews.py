@@ -0,0 +1,114 @@
+import os
+import threading
+from concurrent.futures import Future
+
+import pytest
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from PyPDF2 import PdfWriter
+
+from documents.services import previews
+
+
+def _make_pdf(path, pages=1):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=612, height=792)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def _client(username="alice"):
+    User.objects.create_user(username=username, password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": username, "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return client
+
+
+@pytest.mark.django_db
+def test_first_page_preview_is_pregenerated_and_cached(settings, tmp_path):
+    client = _client()
+    p = tmp_path / 'a.pdf'
+    _make_pdf(p, pages=2)
+    with open(p, 'rb') as f:
+        doc_id = client.post('/api/documents/', {"file": f}).data['id']
+    client.post(f'/api/documents/{doc_id}/extract/')
+    assert len(list(settings.PREVIEW_ROOT.rglob('*.jpg'))) == 1
+
+    resp = client.get(f'/api/documents/{doc_id}/pages/1/preview/?w=200')
+    assert resp.status_code == 200
+    assert resp['Content-Type'] == 'image/jpeg'
+    assert resp['Cache-Control'] == 'private, no-cache'
+    assert b''.join(resp.streaming_content)[:2] == b'\xff\xd8'
+    assert len(list(settings.PREVIEW_ROOT.rglob('*.jpg'))) == 1  # w=200 -> 256, already rendered
+
+    again = client.get(f'/api/documents/{doc_id}/pages/1/preview/?w=200', HTTP_IF_NONE_MATCH=resp['ETag'])
+    assert again.status_code == 304
+    # Revalidation is answered from the key alone, without rendering
+    for path in settings.PREVIEW_ROOT.rglob('*.jpg'):
+        path.unlink()
+    assert client.get(f'/api/documents/{doc_id}/pages/1/preview/?w=200', HTTP_IF_NONE_MATCH=resp['ETag']).status_code == 304
+    assert not list(settings.PREVIEW_ROOT.rglob('*.jpg'))
+
+    assert client.get(f'/api/documents/{doc_id}/pages/2/preview/?w=2000').status_code == 200
+    assert client.get(f'/api/documents/{doc_id}/pages/3/preview/').status_code == 404
+    assert _client("bob").get(f'/api/documents/{doc_id}/pages/1/preview/').status_code == 404
+
+
+def test_bucket_width_and_eviction(settings, tmp_path):
+    settings.PREVIEW_ROOT = tmp_path
+    assert previews.bucket_width(None) == previews.DEFAULT_WIDTH
+    assert previews.bucket_width(100) == 128
+    assert previews.bucket_width(5000) == 1024
+
+    for i, name in enumerate(["aa" + "0" * 62, "ab" + "0" * 62, "ac" + "0" * 62]):
+        path = previews.preview_path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+    assert previews.evict(250) == 1
+    assert not previews.preview_path("aa" + "0" * 62).exists()
+
+
+@pytest.mark.django_db
+def test_render_in_worker_pool(settings, tmp_path):
+    settings.PREVIEW_WORKERS = 1
+    client = _client()
+    p = tmp_path / 'a.pdf'
+    _make_pdf(p)
+    with open(p, 'rb') as f:
+        doc_id = client.post('/api/documents/', {"file": f}).data['id']
+    assert client.get(f'/api/documents/{doc_id}/pages/1/preview/?w=128').status_code == 200
+    previews.shutdown()
+
+
+@pytest.mark.django_db
+def test_unextracted_document_is_hashed_once_and_corrupt_file_is_422(tmp_path):
+    client = _client()
+    p = tmp_path / 'broken.pdf'
+    p.write_bytes(b'%PDF-1.4\nnot really a pdf')
+    with open(p, 'rb') as f:
+        doc_id = client.post('/api/documents/', {"file": f}).data['id']
+    resp = client.get(f'/api/documents/{doc_id}/pages/1/preview/')
+    assert resp.status_code == 422
+    from documents.models import Document
+    assert Document.objects.get(pk=doc_id).md5
+
+
+def test_submit_does_not_deadlock_on_completed_future(monkeypatch, tmp_path):
+    class DoneExecutor:
+        def submit(self, fn, *args):
+            future = Future()
+            future.set_result(0)
+            return future
+
+    monkeypatch.setattr(previews, "_get_executor", lambda: DoneExecutor())
+    results = []
+    thread = threading.Thread(target=lambda: results.append(previews._submit("x.pdf", 1, 128, "ab" + "0" * 62)))
+    thread.daemon = True
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert results[0].result() == 0
+    assert previews._in_flight == {}
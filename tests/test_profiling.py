@@ -0,0 +1,41 @@
+import pytest
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+
+
+def _client(username="alice"):
+    User.objects.create_user(username=username, password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": username, "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return client
+
+
+@pytest.mark.django_db
+def test_profiling_disabled_by_default():
+    resp = _client().get('/api/documents/', HTTP_X_PROFILE="anything")
+    assert resp.status_code == 200
+    assert 'Server-Timing' not in resp
+
+
+@pytest.mark.django_db
+def test_header_triggered_profile(settings, tmp_path):
+    settings.PROFILING_HEADER_TOKEN = "secret"
+    settings.PROFILING_PROFILER = "cprofile"
+    settings.PROFILING_DIR = tmp_path
+    client = _client()
+
+    assert 'Server-Timing' not in client.get('/api/documents/')
+    assert 'Server-Timing' not in client.get('/api/documents/', HTTP_X_PROFILE="wrong")
+
+    resp = client.get('/api/documents/', HTTP_X_PROFILE="secret")
+    assert resp.status_code == 200
+    timing = resp['Server-Timing']
+    assert 'sql;dur=' in timing and 'queries"' in timing
+    assert 'serialize;dur=' in timing
+    assert 'view;dur=' in timing
+    assert list(tmp_path.glob('*.prof'))
+
+    client.get('/api/documents/', HTTP_X_PROFILE="secret")
+    client.get('/api/documents/', HTTP_X_PROFILE="secret")
+    assert len(list(tmp_path.glob('*.prof'))) == 3
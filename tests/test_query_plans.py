@@ -0,0 +1,63 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from benchmarks.seed import seed
+
+pytestmark = pytest.mark.skipif(connection.vendor != "sqlite", reason="EXPLAIN QUERY PLAN is SQLite syntax")
+
+# (url, index the main documents/jobs/audit query must use, or None)
+ENDPOINTS = [
+    ("/api/documents/", "idx_doc_owner_created"),
+    ("/api/documents/?processed=true", "idx_doc_owner_proc_created"),
+    ("/api/documents/?processed=false", "idx_doc_owner_proc_created"),
+    ("/api/documents/?folder={folder}", "idx_doc_owner_folder_created"),
+    ("/api/documents/?folder={folder}&include_descendants=true", "idx_folder_owner_path"),
+    ("/api/documents/?created_after=2020-01-01", "idx_doc_owner_created"),
+    ("/api/documents/?ordering=title", "idx_doc_owner_title"),
+    ("/api/documents/?ordering=-page_count", "idx_doc_owner_pages"),
+    ("/api/documents/?tag=tag-1", None),
+    ("/api/documents/?q=invoice", None),
+    ("/api/documents/{document}/", None),
+    ("/api/jobs/", "idx_job_document_created"),
+    ("/api/audit-logs/", "idx_audit_owner_created"),
+    ("/api/folders/", "idx_folder_owner_created"),
+    ("/api/tags/", None),
+]
+
+
+def _plan(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[3] for row in cursor.fetchall()]
+
+
+def _full_scans(plan):
+    return [
+        step for step in plan
+        if step.startswith("SCAN ") and " USING " not in step and "CONSTANT ROW" not in step
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url,index", ENDPOINTS)
+def test_endpoint_queries_use_indexes(url, index):
+    data = seed(users=2, documents=30, tags=5, folders=3, audit_rows=30, words=5)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {data.token}")
+    url = url.format(folder=data.folder_ids[0], document=data.document_ids[0])
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get(url).status_code == 200
+
+    # SQLite's captured SQL has the parameters inlined, so it can be explained as is
+    plans = []
+    for query in ctx.captured_queries:
+        if query["sql"].startswith("SELECT"):
+            plans.append(_plan(query["sql"], ()))
+    assert plans
+    for plan in plans:
+        assert not _full_scans(plan), plan
+    if index:
+        assert any(index in step for plan in plans for step in plan), plans
@@ -0,0 +1,85 @@
+import pytest
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from PyPDF2 import PdfWriter
+
+
+def _make_pdf(path):
+    writer = PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+@pytest.fixture(autouse=True)
+def _response_cache(settings):
+    # LocMemCache is process-local, so the cache is off by default in tests
+    settings.RESPONSE_CACHE_ENABLED = True
+
+
+def _client(username):
+    User.objects.create_user(username=username, password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": username, "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return client
+
+
+@pytest.mark.django_db
+def test_list_and_detail_revalidate_with_etag(tmp_path):
+    client = _client("alice")
+    p = tmp_path / 'a.pdf'
+    _make_pdf(p)
+    with open(p, 'rb') as f:
+        doc_id = client.post('/api/documents/', {"file": f}).data['id']
+
+    for url in ('/api/documents/', f'/api/documents/{doc_id}/'):
+        first = client.get(url)
+        assert first.status_code == 200
+        etag = first['ETag']
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        assert client.get(url).data == first.data
+
+    etag = client.get('/api/documents/')['ETag']
+    client.patch(f'/api/documents/{doc_id}/', {"title": "Renamed"})
+    resp = client.get('/api/documents/', HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    assert resp.data[0]['title'] == "Renamed"
+
+
+@pytest.mark.django_db
+def test_tag_rename_invalidates_document_list(tmp_path):
+    client = _client("alice")
+    tag_id = client.post('/api/tags/', {"name": "old"}).data['id']
+    p = tmp_path / 'a.pdf'
+    _make_pdf(p)
+    with open(p, 'rb') as f:
+        client.post('/api/documents/', {"file": f, "tags": [tag_id]})
+
+    assert client.get('/api/documents/').data[0]['tags'][0]['name'] == "old"
+    client.patch(f'/api/tags/{tag_id}/', {"name": "new"})
+    assert client.get('/api/documents/').data[0]['tags'][0]['name'] == "new"
+
+
+@pytest.mark.django_db
+def test_cached_responses_are_owner_scoped(tmp_path):
+    alice = _client("alice")
+    bob = _client("bob")
+    p = tmp_path / 'a.pdf'
+    _make_pdf(p)
+    with open(p, 'rb') as f:
+        alice.post('/api/documents/', {"file": f})
+
+    etag = alice.get('/api/documents/')['ETag']
+    resp = bob.get('/api/documents/', HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    assert resp.data == []
+
+
+@pytest.mark.django_db
+def test_process_local_cache_disables_response_cache(settings):
+    settings.RESPONSE_CACHE_ENABLED = None
+    client = _client("carol")
+    resp = client.get('/api/documents/')
+    assert resp.status_code == 200
+    assert 'ETag' not in resp
@@ -0,0 +1,102 @@
+import random
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from documents.models import Document, DocumentLSHBand
+
+numpy = pytest.importorskip("numpy")
+
+from documents.services import similarity  # noqa: E402
+
+WORDS = ("contract party payment invoice term notice clause agreement service fee "
+         "delivery period liability law court month year signed date amount").split()
+
+
+def _text(seed, words=400):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _client():
+    user = User.objects.create_user(username="alice", password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": "alice", "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return user, client
+
+
+def _document(owner, text, name):
+    doc = Document.objects.create(owner=owner, original_filename=name, content_text=text, is_processed=True)
+    similarity.index_document(doc)
+    return doc
+
+
+def test_signature_estimates_jaccard():
+    base = _text(1)
+    rescanned = base.replace("invoice", "lnvoice", 3)
+    assert similarity.signature(base) == similarity.signature(base.upper())
+    assert similarity.estimate(similarity.signature(base), similarity.signature(rescanned)) > 0.8
+    assert similarity.estimate(similarity.signature(base), similarity.signature(_text(2))) < 0.2
+    assert similarity.signature("   ") is None
+
+
+@pytest.mark.django_db
+def test_similar_endpoint_finds_near_duplicates_of_the_owner():
+    user, client = _client()
+    original = _document(user, _text(1), "contract.pdf")
+    # The same contract re-scanned: a few OCR differences, different bytes
+    rescan = _document(user, _text(1).replace("payment", "paymcnt", 2), "contract-scan.pdf")
+    _document(user, _text(2), "other.pdf")
+    other_user = User.objects.create_user(username="bob", password="pass")
+    _document(other_user, _text(1), "bobs-copy.pdf")
+
+    assert DocumentLSHBand.objects.filter(document=original).count() == similarity.BANDS
+    resp = client.get(f'/api/documents/{original.id}/similar/')
+    assert resp.status_code == 200
+    assert [row['id'] for row in resp.data] == [rescan.id]
+    assert resp.data[0]['original_filename'] == "contract-scan.pdf"
+    assert 0.8 < resp.data[0]['similarity'] < 1
+
+    assert client.get(f'/api/documents/{original.id}/similar/?threshold=1').data == []
+    assert client.get(f'/api/documents/{original.id}/similar/?limit=x').status_code == 400
+
+
+@pytest.mark.django_db
+def test_similar_is_empty_without_signature_and_reindexes_on_change():
+    user, client = _client()
+    doc = Document.objects.create(owner=user, original_filename="a.pdf")
+    assert client.get(f'/api/documents/{doc.id}/similar/').data == []
+
+    twin = _document(user, _text(3), "b.pdf")
+    doc.content_text = _text(3)
+    similarity.index_document(doc)
+    assert [row['id'] for row in client.get(f'/api/documents/{doc.id}/similar/').data] == [twin.id]
+
+    doc.content_text = ""
+    similarity.index_document(doc)
+    assert doc.minhash is None
+    assert not DocumentLSHBand.objects.filter(document=doc).exists()
+    assert client.get(f'/api/documents/{twin.id}/similar/').data == []
+
+
+@pytest.mark.django_db
+def test_candidate_lookup_uses_the_bucket_index():
+    if connection.vendor != "sqlite":
+        pytest.skip("EXPLAIN QUERY PLAN is SQLite syntax")
+    user, client = _client()
+    doc = _document(user, _text(1), "a.pdf")
+    for seed in range(2, 12):
+        _document(user, _text(seed), f"{seed}.pdf")
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get(f'/api/documents/{doc.id}/similar/').status_code == 200
+    lookups = [query["sql"] for query in ctx.captured_queries if "documents_documentlshband" in query["sql"]]
+    assert lookups
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {lookups[0]}")
+        plan = [row[3] for row in cursor.fetchall()]
+    assert any("idx_lsh_owner_band_bucket" in step for step in plan), plan
@@ -0,0 +1,137 @@
+import io
+import os
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+from rest_framework.test import APIClient
+from PyPDF2 import PdfWriter
+
+from documents.models import Document, StorageUsage
+
+
+def _make_pdf(path, pages=1):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=612, height=792)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def _client(username="alice"):
+    user = User.objects.create_user(username=username, password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": username, "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return user, client
+
+
+def _upload(client, tmp_path, name="a.pdf", pages=1):
+    p = tmp_path / name
+    _make_pdf(p, pages)
+    with open(p, 'rb') as f:
+        return client.post('/api/documents/', {"file": f})
+
+
+@pytest.mark.django_db
+def test_usage_is_counted_on_upload_and_delete_and_file_is_removed(tmp_path, django_capture_on_commit_callbacks):
+    user, client = _client()
+    first = _upload(client, tmp_path, "a.pdf").data
+    second = _upload(client, tmp_path, "b.pdf", pages=3).data
+    sizes = [Document.objects.get(pk=row['id']).file_size for row in (first, second)]
+    assert all(sizes) and first['file_size'] == sizes[0]
+
+    assert client.get('/api/storage/').data == {"bytes": sum(sizes), "documents": 2, "quota_bytes": None}
+
+    path = Document.objects.get(pk=first['id']).file.path
+    with django_capture_on_commit_callbacks(execute=True):
+        assert client.delete(f"/api/documents/{first['id']}/").status_code == 204
+    assert not os.path.exists(path)
+    assert client.get('/api/storage/').data["bytes"] == sizes[1]
+    assert StorageUsage.objects.get(owner=user).documents == 1
+
+
+@pytest.mark.django_db
+def test_upload_over_quota_is_rejected(tmp_path, settings):
+    user, client = _client()
+    first = _upload(client, tmp_path)
+    assert first.status_code == 201
+    settings.STORAGE_QUOTA_BYTES = first.data['file_size'] + 10
+
+    response = _upload(client, tmp_path, "b.pdf")
+    assert response.status_code == 400
+    assert "quota" in str(response.data['file'][0]).lower()
+
+    # A per-owner quota overrides the default; 0 means unlimited
+    StorageUsage.objects.filter(owner=user).update(quota_bytes=0)
+    assert _upload(client, tmp_path, "b.pdf").status_code == 201
+    assert client.get('/api/storage/').data["quota_bytes"] is None
+
+
+@pytest.mark.django_db
+def test_reconcile_reports_and_deletes_orphans_and_recounts(tmp_path, settings):
+    user, client = _client()
+    doc_id = _upload(client, tmp_path).data['id']
+    orphan = tmp_path / "media" / "documents" / "stray" / "old.pdf"
+    orphan.parent.mkdir(parents=True)
+    orphan.write_bytes(b"%PDF-1.4 orphan")
+    StorageUsage.objects.filter(owner=user).update(bytes=1, documents=7)
+
+    out = io.StringIO()
+    call_command("reconcile_storage", min_age=0, batch_size=1, stdout=out)
+    assert f"orphan {orphan}" in out.getvalue()
+    assert orphan.exists()
+    # Recent files may belong to an upload that has not committed yet
+    out = io.StringIO()
+    call_command("reconcile_storage", delete=True, stdout=out)
+    assert orphan.exists() and "deleted 0 orphaned files" in out.getvalue()
+
+    out = io.StringIO()
+    call_command("reconcile_storage", delete=True, min_age=0, recount=True, stdout=out)
+    assert not orphan.exists()
+    assert "deleted 1 orphaned files" in out.getvalue()
+    assert os.path.exists(Document.objects.get(pk=doc_id).file.path)
+    usage = StorageUsage.objects.get(owner=user)
+    assert (usage.bytes, usage.documents) == (Document.objects.get(pk=doc_id).file_size, 1)
+
+    os.remove(Document.objects.get(pk=doc_id).file.path)
+    out = io.StringIO()
+    call_command("reconcile_storage", stdout=out)
+    assert f"missing document #{doc_id}" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_idle_documents_move_to_cold_tier_and_back_on_access(tmp_path, settings):
+    _, client = _client()
+    doc_id = _upload(client, tmp_path).data['id']
+    original = open(Document.objects.get(pk=doc_id).file.path, 'rb').read()
+    Document.objects.filter(pk=doc_id).update(last_accessed_at=timezone.now() - timedelta(days=100))
+
+    out = io.StringIO()
+    call_command("tier_storage", days=90, dry_run=True, stdout=out)
+    assert Document.objects.get(pk=doc_id).tier == "hot"
+    call_command("tier_storage", days=90, stdout=out)
+    document = Document.objects.get(pk=doc_id)
+    assert document.tier == "cold"
+    assert document.file.path.startswith(str(tmp_path / "cold"))
+    assert not os.path.exists(tmp_path / "media" / document.file.name)
+
+    response = client.get(f'/api/documents/{doc_id}/download/')
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content) == original
+    assert Document.objects.get(pk=doc_id).last_accessed_at > timezone.now() - timedelta(minutes=1)
+
+    call_command("tier_storage", days=90, stdout=out)
+    document = Document.objects.get(pk=doc_id)
+    assert document.tier == "hot"
+    assert document.file.path.startswith(str(tmp_path / "media"))
+
+
+@pytest.mark.django_db
+def test_tier_storage_requires_cold_root(settings):
+    settings.COLD_STORAGE_ROOT = None
+    with pytest.raises(CommandError):
+        call_command("tier_storage", stdout=io.StringIO())
@@ -0,0 +1,100 @@
+import io
+import random
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from documents.models import CompressionDictionary, Document, DocumentPage
+from documents.services import textstore
+
+WORDS = "invoice contract payment amount total customer supplier agreement clause term quarter".split()
+
+
+def _text(seed, words=300):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _client():
+    user = User.objects.create_user(username="alice", password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": "alice", "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return user, client
+
+
+@pytest.mark.parametrize("method", ["zlib", "zstd"])
+def test_codecs_round_trip(method):
+    if method == "zstd" and textstore.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    text = _text(1) + " çğışöü"
+    blob = textstore.compress(text, method=method, dictionary_id=0)
+    assert len(blob) < len(text.encode()) / 2
+    assert textstore.decompress(blob) == text
+    assert textstore.compress("short", method=method)[0] == textstore.RAW
+    assert textstore.decompress(b"") == ""
+
+
+@pytest.mark.django_db
+def test_document_text_is_stored_compressed_and_read_lazily(settings):
+    settings.TEXT_COMPRESSION = "zlib"
+    user, client = _client()
+    text = "Quarterly Invoice\n" + _text(2)
+    doc = Document.objects.create(owner=user, original_filename="a.pdf", content_text=text)
+    DocumentPage.objects.create(document=doc, number=1, fingerprint="x", text=text)
+
+    loaded = Document.objects.get(pk=doc.pk)
+    assert bytes(loaded.content_blob)[0] == textstore.ZLIB
+    assert len(loaded.content_blob) < len(text.encode()) / 2
+    assert loaded.search_text.split()[:2] == ["quarterly", "invoice"]
+    assert "_content_blob_text" not in loaded.__dict__
+    assert loaded.content_text == text
+    assert DocumentPage.objects.get(document=doc).text == text
+
+    # Assigning replaces blob, cached text and search terms together
+    loaded.content_text = "Annual report"
+    loaded.save()
+    assert Document.objects.get(pk=doc.pk).content_text == "Annual report"
+    assert Document.objects.get(pk=doc.pk).search_text == "annual report"
+
+
+@pytest.mark.django_db
+def test_search_matches_words_of_compressed_text():
+    user, client = _client()
+    hit = Document.objects.create(owner=user, original_filename="a.pdf",
+                                  content_text="The Supplier shall deliver the goods. Payment within 30 days.")
+    Document.objects.create(owner=user, original_filename="b.pdf", content_text="Nothing relevant here")
+
+    for q in ["supplier", "SUPPL", "payment supplier", "30"]:
+        assert [row['id'] for row in client.get('/api/documents/', {"q": q}).data] == [hit.id], q
+    assert client.get('/api/documents/', {"q": "supplier nothing"}).data == []
+    assert [row['id'] for row in client.get('/api/documents/', {"search": "deliver"}).data] == [hit.id]
+
+
+@pytest.mark.django_db
+def test_trained_dictionary_is_used_for_new_and_recompressed_text(settings):
+    pytest.importorskip("zstandard")
+    settings.TEXT_COMPRESSION = "zstd"
+    user = User.objects.create_user(username="alice", password="pass")
+    doc = Document.objects.create(owner=user, original_filename="a.pdf", content_text=_text(0, 2000))
+    for number in range(1, 201):
+        DocumentPage.objects.create(document=doc, number=number, fingerprint=str(number), text=_text(number, 80))
+    assert bytes(Document.objects.get(pk=doc.pk).content_blob)[0] == textstore.ZSTD
+
+    call_command("train_text_dictionary", size=4096, recompress=True, stdout=io.StringIO())
+    dictionary = CompressionDictionary.objects.get()
+    assert dictionary.samples == 200
+
+    blob = bytes(Document.objects.get(pk=doc.pk).content_blob)
+    assert blob[0] == textstore.ZSTD_DICT
+    assert Document.objects.get(pk=doc.pk).content_text == _text(0, 2000)
+    page = DocumentPage.objects.get(document=doc, number=7)
+    assert bytes(page.text_blob)[0] == textstore.ZSTD_DICT
+    assert page.text == _text(7, 80)
+
+    # Other processes pick the dictionary up on their own; here the cache is fresh
+    textstore.reset()
+    new = DocumentPage.objects.create(document=doc, number=201, fingerprint="n", text=_text(201, 80))
+    assert bytes(new.text_blob)[0] == textstore.ZSTD_DICT
@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APIClient
+from PyPDF2 import PdfWriter
+
+from documents.models import Document, ExtractionJob
+from documents.throttling import extraction_slot, parse_rate, take_token
+
+
+def _make_pdf(path):
+    writer = PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def _client(username="alice"):
+    User.objects.create_user(username=username, password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": username, "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return client
+
+
+def _upload(client, tmp_path):
+    p = tmp_path / 'a.pdf'
+    _make_pdf(p)
+    with open(p, 'rb') as f:
+        return client.post('/api/documents/', {"file": f}).data['id']
+
+
+def test_token_bucket_refills_and_reports_the_wait():
+    capacity, refill = parse_rate("6/min")
+    assert (capacity, refill) == (6, 0.1)
+    state = None
+    for _ in range(6):
+        state, wait = take_token(state, 100.0, capacity, refill)
+        assert wait == 0
+    state, wait = take_token(state, 100.0, capacity, refill)
+    assert wait == pytest.approx(10)
+    state, wait = take_token(state, 105.0, capacity, refill)
+    assert wait == pytest.approx(5)
+    state, wait = take_token(state, 110.0, capacity, refill)
+    assert wait == 0
+    # Idle time never fills the bucket past its size
+    state, _ = take_token(state, 10_000.0, capacity, refill)
+    assert state[0] == capacity - 1
+
+
+@pytest.mark.django_db
+def test_actions_are_throttled_per_user_and_scope(settings, tmp_path):
+    settings.THROTTLE_RATES = {"download": "2/min", "search": "1/h", "upload": "", "extract": None}
+    client = _client()
+    doc_id = _upload(client, tmp_path)
+
+    assert client.get(f'/api/documents/{doc_id}/download/').status_code == 200
+    assert client.get(f'/api/documents/{doc_id}/download/').status_code == 200
+    resp = client.get(f'/api/documents/{doc_id}/download/')
+    assert resp.status_code == 429
+    assert 25 <= int(resp['Retry-After']) <= 30
+
+    # Other scopes and plain listings are unaffected
+    assert client.get(f'/api/documents/{doc_id}/').status_code == 200
+    assert client.get('/api/documents/').status_code == 200
+    assert client.get('/api/documents/?q=x').status_code == 200
+    resp = client.get('/api/documents/?search=x')
+    assert resp.status_code == 429
+    assert 3590 <= int(resp['Retry-After']) <= 3600
+    assert client.get('/api/documents/').status_code == 200
+
+    # Buckets are per user
+    other = _client("bob")
+    other_doc = _upload(other, tmp_path)
+    assert other.get(f'/api/documents/{other_doc}/download/').status_code == 200
+
+
+@pytest.mark.django_db
+def test_sync_extractions_are_capped_per_user(settings, tmp_path):
+    settings.EXTRACTION_MAX_IN_FLIGHT = 1
+    client = _client()
+    doc_id = _upload(client, tmp_path)
+    user = User.objects.get(username="alice")
+
+    # Another request of the user is extracting: started 10 s ago, 1 of 3 pages done
+    ExtractionJob.objects.create(
+        document=Document.objects.get(pk=doc_id), status=ExtractionJob.Status.RUNNING,
+        started_at=timezone.now() - timedelta(seconds=10), pages_done=1, pages_total=3,
+    )
+    with extraction_slot(user.pk):
+        resp = client.post(f'/api/documents/{doc_id}/extract/')
+        assert resp.status_code == 429
+        assert 19 <= int(resp['Retry-After']) <= 21
+        assert ExtractionJob.objects.count() == 1
+        # Queued extractions do not take a slot
+        assert client.post(f'/api/documents/{doc_id}/extract/?async=true').status_code == 202
+
+        other = _client("bob")
+        assert other.post(f'/api/documents/{_upload(other, tmp_path)}/extract/').status_code == 200
+
+    assert client.post(f'/api/documents/{doc_id}/extract/').status_code == 200
+    assert client.post(f'/api/documents/{doc_id}/extract/').status_code == 200
@@ -0,0 +1,174 @@
+import hashlib
+import hmac
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+from PyPDF2 import PdfWriter
+
+from documents.models import ExtractionJob, OutboxEvent, WebhookEndpoint
+from documents.services import webhooks
+
+
+def _make_pdf(path):
+    writer = PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def _client(username="alice"):
+    user = User.objects.create_user(username=username, password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": username, "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return user, client
+
+
+@pytest.fixture
+def receiver():
+    """Local HTTP/1.1 server recording webhook requests; ``statuses`` are answered in order, then 204."""
+    received = []
+    statuses = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            received.append({"headers": dict(self.headers), "body": body, "client_port": self.client_address[1]})
+            self.send_response(statuses.pop(0) if statuses else 204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}/hooks?source=pdfvault"
+    server.received, server.statuses = received, statuses
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _verify(secret, request):
+    timestamp = request["headers"]["X-Pdfvault-Timestamp"]
+    expected = hmac.new(secret.encode(), f"{timestamp}.".encode() + request["body"], hashlib.sha256).hexdigest()
+    return request["headers"]["X-Pdfvault-Signature"] == f"sha256={expected}"
+
+
+@pytest.mark.django_db
+def test_finished_extraction_is_delivered_signed(tmp_path, receiver):
+    user, client = _client()
+    response = client.post('/api/webhooks/', {"url": receiver.url})
+    assert response.status_code == 201
+    secret = response.data['secret']
+    assert len(secret) == 64
+
+    p = tmp_path / 'a.pdf'
+    _make_pdf(p)
+    with open(p, 'rb') as f:
+        doc_id = client.post('/api/documents/', {"file": f}).data['id']
+    assert client.post(f'/api/documents/{doc_id}/extract/').status_code == 200
+    event = OutboxEvent.objects.get()
+    assert event.status == OutboxEvent.Status.PENDING
+    assert event.event_type == webhooks.EXTRACTION_SUCCEEDED
+
+    dispatcher = webhooks.Dispatcher()
+    try:
+        assert dispatcher.run_once() == 1
+    finally:
+        dispatcher.close()
+    [request] = receiver.received
+    assert _verify(secret, request)
+    [message] = json.loads(request["body"])["events"]
+    job = ExtractionJob.objects.get()
+    assert message["id"] == str(event.event_id)
+    assert message["data"] == {
+        "job": job.pk, "document": doc_id, "status": "SUCCESS",
+        "finished_at": message["data"]["finished_at"], "page_count": 1, "error": None,
+    }
+    event.refresh_from_db()
+    assert event.status == OutboxEvent.Status.DELIVERED and event.attempts == 1
+
+
+@pytest.mark.django_db
+def test_events_are_batched_over_one_kept_alive_connection(receiver):
+    user, _ = _client()
+    WebhookEndpoint.objects.create(owner=user, url=receiver.url)
+    for number in range(5):
+        webhooks.record(user.pk, "test.event", {"number": number})
+
+    dispatcher = webhooks.Dispatcher(batch_size=2)
+    try:
+        assert dispatcher.run_once() == 3
+    finally:
+        dispatcher.close()
+    batches = [[m["data"]["number"] for m in json.loads(r["body"])["events"]] for r in receiver.received]
+    assert batches == [[0, 1], [2, 3], [4]]
+    assert len({request["client_port"] for request in receiver.received}) == 1
+    assert not OutboxEvent.objects.exclude(status=OutboxEvent.Status.DELIVERED).exists()
+
+
+@pytest.mark.django_db
+def test_failed_delivery_is_retried_with_backoff_then_given_up(receiver):
+    user, _ = _client()
+    WebhookEndpoint.objects.create(owner=user, url=receiver.url)
+    webhooks.record(user.pk, "test.event", {})
+    receiver.statuses.extend([500, 503])
+    dispatcher = webhooks.Dispatcher(max_attempts=3)
+    try:
+        assert dispatcher.run_once() == 1
+        event = OutboxEvent.objects.get()
+        assert event.status == OutboxEvent.Status.PENDING and event.attempts == 1
+        assert event.last_error == "HTTP 500" and event.lease is None
+        assert event.next_attempt_at > timezone.now() + timedelta(seconds=7)
+        # Not due yet
+        assert dispatcher.run_once() == 0
+
+        OutboxEvent.objects.update(next_attempt_at=timezone.now())
+        assert dispatcher.run_once() == 1
+        OutboxEvent.objects.update(next_attempt_at=timezone.now())
+        assert dispatcher.run_once() == 1
+    finally:
+        dispatcher.close()
+    event = OutboxEvent.objects.get()
+    assert (event.status, event.attempts) == (OutboxEvent.Status.DELIVERED, 3)
+    assert len(receiver.received) == 3
+
+    webhooks.record(user.pk, "test.event", {})
+    receiver.statuses.append(500)
+    dispatcher = webhooks.Dispatcher(max_attempts=1)
+    try:
+        dispatcher.run_once()
+    finally:
+        dispatcher.close()
+    assert OutboxEvent.objects.latest("id").status == OutboxEvent.Status.FAILED
+
+
+@pytest.mark.django_db
+def test_events_are_only_written_with_their_transaction():
+    user, client = _client()
+    other, _ = _client("bob")
+    WebhookEndpoint.objects.create(owner=user, url="http://127.0.0.1:9/")
+    WebhookEndpoint.objects.create(owner=user, url="http://127.0.0.1:9/off", is_active=False)
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            webhooks.record(user.pk, "test.event", {})
+            raise RuntimeError("job update failed")
+    assert not OutboxEvent.objects.exists()
+
+    assert webhooks.record(user.pk, "test.event", {}) == 1
+    assert webhooks.record(other.pk, "test.event", {}) == 0
+    assert len(client.get('/api/webhooks/').data) == 2
+    assert client.post('/api/webhooks/', {"url": "ftp://example.com/"}).status_code == 400
@@ -0,0 +1,72 @@
+import io
+import os
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from PyPDF2 import PdfWriter
+
+from benchmarks import startup
+from documents.models import Document, ExtractionJob
+from documents.services import worker
+
+
+def _make_pdf(path):
+    writer = PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def _client():
+    User.objects.create_user(username="alice", password="pass")
+    client = APIClient()
+    token = client.post('/api/token-auth/', {"username": "alice", "password": "pass"}).data['token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    return client
+
+
+def _queue(client, tmp_path, name):
+    p = tmp_path / name
+    _make_pdf(p)
+    with open(p, 'rb') as f:
+        doc_id = client.post('/api/documents/', {"file": f}).data['id']
+    return doc_id, client.post(f'/api/documents/{doc_id}/extract/?async=true').data['id']
+
+
+def test_web_boot_does_not_import_the_pdf_stack():
+    result = startup.run_once(startup.SCENARIOS["web_boot"])
+    loaded = result["output"].strip().splitlines()[-1]
+    for module in ("pdfplumber", "pdfminer", "PyPDF2", "pyarrow"):
+        assert f'"{module}"' not in loaded
+    assert result["max_rss_kb"] > 0
+
+
+@pytest.mark.django_db
+def test_claim_job_takes_each_queued_job_once(tmp_path):
+    client = _client()
+    _, first = _queue(client, tmp_path, "a.pdf")
+    _, second = _queue(client, tmp_path, "b.pdf")
+
+    job = worker.claim_job()
+    assert job.pk == first
+    assert job.status == ExtractionJob.Status.RUNNING and job.started_at is not None
+    assert worker.claim_job().pk == second
+    assert worker.claim_job() is None
+
+
+@pytest.mark.django_db
+def test_worker_command_drains_the_queue(tmp_path):
+    client = _client()
+    doc_id, ok = _queue(client, tmp_path, "a.pdf")
+    broken_id, broken = _queue(client, tmp_path, "b.pdf")
+    os.remove(Document.objects.get(pk=broken_id).file.path)
+
+    out = io.StringIO()
+    call_command("run_extraction_worker", workers=0, drain=True, stdout=out)
+    assert "ran 2 jobs" in out.getvalue()
+    assert ExtractionJob.objects.get(pk=ok).status == ExtractionJob.Status.SUCCESS
+    assert Document.objects.get(pk=doc_id).is_processed
+    assert ExtractionJob.objects.get(pk=broken).status == ExtractionJob.Status.FAILED
+    assert client.get(f'/api/jobs/{ok}/').data['pages_done'] == 1